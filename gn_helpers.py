@@ -6,6 +6,7 @@
 
 The main functions are ToGNString() and FromGNString(), to convert between
 serialized GN veriables and Python variables.
+WriteGN() is a variant of ToGNString() that streams its output to a file.
 
 To use in an arbitrary Python file in the build:
 
@@ -20,10 +21,15 @@ Where the sequence of parameters to join is the relative path from your source
 file to the build directory.
 """
 
+import codecs
+import hashlib
+import itertools
 import json
+import marshal
 import os
 import re
 import sys
+import tempfile
 
 
 _CHROMIUM_ROOT = os.path.join(os.path.dirname(__file__), os.pardir)
@@ -31,24 +37,185 @@ _CHROMIUM_ROOT = os.path.join(os.path.dirname(__file__), os.pardir)
 BUILD_VARS_FILENAME = 'build_vars.json'
 IMPORT_RE = re.compile(r'^import\("//(\S+)"\)')
 
+# Regular expressions used by GNValueParser to consume whole tokens at once
+# instead of walking the input one character at a time.
+# Comments always run up to the end of the line, even when used as part of a
+# larger expression that might otherwise backtrack into them.
+_COMMENT_AND_WHITESPACE = r'(?:[ \t\n]+|#[^\n]*(?![^\n]))*'
+_COMMENT_AND_WHITESPACE_RE = re.compile(_COMMENT_AND_WHITESPACE)
+# The body of a string, up to (but not including) the closing quote. A
+# backslash always escapes the following character for the purpose of finding
+# the end of the string.
+_STRING_BODY_RE = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.DOTALL)
+# A backslash followed by a character GN escapes. A backslash at the very end
+# of the input is dropped. Splitting on this and joining the pieces, which
+# include the captured characters, unescapes a string.
+_UNESCAPE_RE = re.compile(r'\\([$"\\]|\Z)')
+_NUMBER_RE = re.compile(r'[-0-9][0-9]*')
+_IDENT_TAIL_RE = re.compile(r'[A-Za-z0-9_]*')
+# A value that needs no recursion: a string, a number or a boolean. Numbers
+# must not be followed by anything that could continue them.
+_SCALAR = (r'(?:"(?P<string>[^"\\]*(?:\\.[^"\\]*)*)"'
+           r'|(?P<number>-?[0-9]+)(?![0-9]|[^\x00-\x7f])'
+           r'|(?P<constant>true|false))')
+# A complete scalar list item together with the whitespace, comments and
+# comma following it.
+_LIST_ITEM_RE = re.compile(
+    _SCALAR + _COMMENT_AND_WHITESPACE + r'(?P<comma>,?)' +
+    _COMMENT_AND_WHITESPACE, re.DOTALL)
+# A complete assignment of a scalar value, followed by whitespace and
+# comments.
+_ASSIGNMENT_RE = re.compile(
+    r'(?P<ident>[A-Za-z_][A-Za-z0-9_]*)' + _COMMENT_AND_WHITESPACE + '=' +
+    _COMMENT_AND_WHITESPACE + _SCALAR + _COMMENT_AND_WHITESPACE, re.DOTALL)
+
 
 class GNError(Exception):
-  pass
+  def __init__(self, message, offset=None):
+    super(GNError, self).__init__(message)
+    # Byte offset into the (UTF-8 encoded) input at which the error was
+    # detected, if known.
+    self.offset = offset
+
+
+# Maps each byte of UTF-8 encoded text, decoded as Latin-1 so that every byte
+# becomes one code point, to its GN escaped form.
+_GN_ESCAPE_TABLE = tuple(
+    '\\' + chr(code) if code in (34, 36, 92) else  # For '"', '$', or '\\'.
+    chr(code) if 32 <= code < 127 else
+    '$0x%02X' % code
+    for code in range(256))
+
+# Matches strings that need no escaping at all: printable ASCII without '"',
+# '$' or '\\'.
+_GN_PLAIN_STRING_RE = re.compile(r'[ !#%-\[\]-~]*\Z')
+
+
+def _EscapeGNString(s):
+  """Returns |s| with GN escaping applied, without the surrounding quotes."""
+  if _GN_PLAIN_STRING_RE.match(s):
+    return s
+  return s.encode('utf-8').decode('latin-1').translate(_GN_ESCAPE_TABLE)
+
+
+if sys.version_info.major < 3:
+  _basestring_compat = basestring
+else:
+  _basestring_compat = str
+
+_Intern = intern if sys.version_info.major < 3 else sys.intern
+
+
+# Emits all output tokens of a value without intervening whitespaces.
+#
+# Nested lists and scopes are expanded using an explicit stack of iterators
+# instead of recursion, so values can be nested arbitrarily deep and each
+# token is yielded only once, no matter how deep it is nested. The iterators
+# yield output tokens as strings and values still to be expanded as (value,
+# level) tuples.
+def _GenerateTokens(v, level):
+  stack = [iter([(v, level)])]
+  while stack:
+    for entry in stack[-1]:
+      if not isinstance(entry, tuple):
+        yield entry
+        continue
+      v, level = entry
 
+      if isinstance(v, _basestring_compat):
+        yield '"' + _EscapeGNString(v) + '"'
 
-# Computes ASCII code of an element of encoded Python 2 str / Python 3 bytes.
-_Ord = ord if sys.version_info.major < 3 else lambda c: c
+      elif isinstance(v, bool):
+        yield 'true' if v else 'false'
 
+      elif isinstance(v, int):
+        yield str(v)
+
+      elif isinstance(v, (list, tuple)):
+        stack.append(_ListEntries(v, level))
+        break
 
-def _TranslateToGnChars(s):
-  for decoded_ch in s.encode('utf-8'):  # str in Python 2, bytes in Python 3.
-    code = _Ord(decoded_ch)  # int
-    if code in (34, 36, 92):  # For '"', '$', or '\\'.
-      yield '\\' + chr(code)
-    elif 32 <= code < 127:
-      yield chr(code)
+      elif isinstance(v, dict):
+        stack.append(_ScopeEntries(v, level))
+        break
+
+      else:  # Not supporting float: Add only when needed.
+        raise GNError('Unsupported type when printing to GN.')
     else:
-      yield '$0x%02X' % code
+      stack.pop()
+
+
+def _ListEntries(v, level):
+  """Yields the _GenerateTokens() entries of the list |v|."""
+  yield '['
+  for i, item in enumerate(v):
+    if i > 0:
+      yield ','
+    yield (item, level + 1)
+  yield ']'
+
+
+def _ScopeEntries(v, level):
+  """Yields the _GenerateTokens() entries of the dict |v|."""
+  if level > 0:
+    yield '{'
+  for key in sorted(v):
+    if not isinstance(key, _basestring_compat):
+      raise GNError('Dictionary key is not a string.')
+    if not key or key[0].isdigit() or not key.replace('_', '').isalnum():
+      raise GNError('Dictionary key is not a valid GN identifier.')
+    yield key  # No quotations.
+    yield '='
+    yield (v[key], level + 1)
+  if level > 0:
+    yield '}'
+
+
+def _CanStart(tok):
+  return tok and tok not in ',}]='
+
+
+def _CanEnd(tok):
+  return tok and tok not in ',{[='
+
+
+# Adds whitespaces, trying to keep everything (except dicts) in 1 line.
+def _PlainGlue(gen):
+  prev_tok = None
+  for i, tok in enumerate(gen):
+    if i > 0:
+      if _CanEnd(prev_tok) and _CanStart(tok):
+        yield '\n'  # New dict item.
+      elif prev_tok == '[' and tok == ']':
+        yield '  '  # Special case for [].
+      elif tok != ',':
+        yield ' '
+    yield tok
+    prev_tok = tok
+
+
+# Adds whitespaces so non-empty lists can span multiple lines, with indent.
+def _PrettyGlue(gen):
+  prev_tok = None
+  level = 0
+  for i, tok in enumerate(gen):
+    if i > 0:
+      if _CanEnd(prev_tok) and _CanStart(tok):
+        yield '\n' + '  ' * level  # New dict item.
+      elif tok == '=' or prev_tok in '=':
+        yield ' '  # Separator before and after '=', on same line.
+    if tok in ']}':
+      level -= 1
+    # Exclude '[]' and '{}' cases.
+    if int(prev_tok == '[') + int(tok == ']') == 1 or \
+       int(prev_tok == '{') + int(tok == '}') == 1:
+      yield '\n' + '  ' * level
+    yield tok
+    if tok in '[{':
+      level += 1
+    if tok == ',':
+      yield '\n' + '  ' * level
+    prev_tok = tok
 
 
 def ToGNString(value, pretty=False):
@@ -65,99 +232,49 @@ def ToGNString(value, pretty=False):
   Raises:
     GNError: |value| cannot be printed to GN.
   """
-
-  if sys.version_info.major < 3:
-    basestring_compat = basestring
-  else:
-    basestring_compat = str
-
-  # Emits all output tokens without intervening whitespaces.
-  def GenerateTokens(v, level):
-    if isinstance(v, basestring_compat):
-      yield '"' + ''.join(_TranslateToGnChars(v)) + '"'
-
-    elif isinstance(v, bool):
-      yield 'true' if v else 'false'
-
-    elif isinstance(v, int):
-      yield str(v)
-
-    elif isinstance(v, list):
-      yield '['
-      for i, item in enumerate(v):
-        if i > 0:
-          yield ','
-        for tok in GenerateTokens(item, level + 1):
-          yield tok
-      yield ']'
-
-    elif isinstance(v, dict):
-      if level > 0:
-        yield '{'
-      for key in sorted(v):
-        if not isinstance(key, basestring_compat):
-          raise GNError('Dictionary key is not a string.')
-        if not key or key[0].isdigit() or not key.replace('_', '').isalnum():
-          raise GNError('Dictionary key is not a valid GN identifier.')
-        yield key  # No quotations.
-        yield '='
-        for tok in GenerateTokens(v[key], level + 1):
-          yield tok
-      if level > 0:
-        yield '}'
-
-    else:  # Not supporting float: Add only when needed.
-      raise GNError('Unsupported type when printing to GN.')
-
-  can_start = lambda tok: tok and tok not in ',}]='
-  can_end = lambda tok: tok and tok not in ',{[='
-
-  # Adds whitespaces, trying to keep everything (except dicts) in 1 line.
-  def PlainGlue(gen):
-    prev_tok = None
-    for i, tok in enumerate(gen):
-      if i > 0:
-        if can_end(prev_tok) and can_start(tok):
-          yield '\n'  # New dict item.
-        elif prev_tok == '[' and tok == ']':
-          yield '  '  # Special case for [].
-        elif tok != ',':
-          yield ' '
-      yield tok
-      prev_tok = tok
-
-  # Adds whitespaces so non-empty lists can span multiple lines, with indent.
-  def PrettyGlue(gen):
-    prev_tok = None
-    level = 0
-    for i, tok in enumerate(gen):
-      if i > 0:
-        if can_end(prev_tok) and can_start(tok):
-          yield '\n' + '  ' * level  # New dict item.
-        elif tok == '=' or prev_tok in '=':
-          yield ' '  # Separator before and after '=', on same line.
-      if tok in ']}':
-        level -= 1
-      # Exclude '[]' and '{}' cases.
-      if int(prev_tok == '[') + int(tok == ']') == 1 or \
-         int(prev_tok == '{') + int(tok == '}') == 1:
-        yield '\n' + '  ' * level
-      yield tok
-      if tok in '[{':
-        level += 1
-      if tok == ',':
-        yield '\n' + '  ' * level
-      prev_tok = tok
-
-  token_gen = GenerateTokens(value, 0)
-  ret = ''.join((PrettyGlue if pretty else PlainGlue)(token_gen))
+  token_gen = _GenerateTokens(value, 0)
+  ret = ''.join((_PrettyGlue if pretty else _PlainGlue)(token_gen))
   # Add terminating '\n' for dict |value| or multi-line output.
   if isinstance(value, dict) or '\n' in ret:
     return ret + '\n'
   return ret
 
 
-def FromGNString(input_string):
+# Number of output pieces WriteGN() joins before writing them out.
+_WRITE_BATCH_SIZE = 4096
+
+
+def WriteGN(value, fp, pretty=False):
+  """Writes the GN equivalent of a Python value to a file object.
+
+  The output is identical to ToGNString(value, pretty), but is written to |fp|
+  in batches while it's being generated, so the whole text is never held in
+  memory at once.
+
+  Args:
+    value: The Python value to convert.
+    fp: A file object opened for writing text.
+    pretty: Whether to pretty print. See ToGNString().
+
+  Raises:
+    GNError: |value| cannot be printed to GN. Part of the output might have
+        been written to |fp| already.
+  """
+  glued = (_PrettyGlue if pretty else _PlainGlue)(_GenerateTokens(value, 0))
+  multi_line = False
+  while True:
+    # Output pieces are never empty, so an empty chunk means we're done.
+    chunk = ''.join(itertools.islice(glued, _WRITE_BATCH_SIZE))
+    if not chunk:
+      break
+    multi_line = multi_line or '\n' in chunk
+    fp.write(chunk)
+  # Add terminating '\n' for dict |value| or multi-line output.
+  if isinstance(value, dict) or multi_line:
+    fp.write('\n')
+
+
+def FromGNString(input_string, intern=False, compact=False):
   """Converts the input string from a GN serialized value to Python values.
 
   For details on supported types see GNValueParser.Parse() below.
@@ -193,12 +310,21 @@ def FromGNString(input_string):
   using string interpolation on a list (as in the top example) the embedded
   strings will be quoted and escaped according to GN rules so the list can be
   re-parsed to get the same result.
+
+
+  A NOTE ON MEMORY USE:
+
+  Tools holding many parsed values at once can pass |intern| to have all
+  strings interned, so that equal strings (e.g. the same source paths in
+  different lists) share one object, even across calls. With |compact|, lists
+  that only contain strings are returned as (read-only) tuples, which need
+  less memory than lists. ToGNString() accepts tuples as lists.
   """
-  parser = GNValueParser(input_string)
+  parser = GNValueParser(input_string, intern=intern, compact=compact)
   return parser.Parse()
 
 
-def FromGNArgs(input_string):
+def FromGNArgs(input_string, cache_dir=None, intern=False, compact=False):
   """Converts a string with a bunch of gn arg assignments into a Python dict.
 
   Given a whitespace-separated list of
@@ -214,9 +340,35 @@ def FromGNArgs(input_string):
 
   This routine is meant to handle only the simple sorts of values that
   arise in parsing --args.
+
+  If |cache_dir| is given, the result is cached in that directory and reused
+  for as long as |input_string| and the files it imports are unchanged.
+
+  |intern| and |compact| reduce the memory use of the result, see
+  FromGNString().
+  """
+  parser = GNValueParser(input_string, intern=intern, compact=compact)
+  return parser.ParseArgs(cache_dir=cache_dir)
+
+
+def IterGNList(fp_or_str):
+  """Parses a GN list incrementally, yielding each item once it's parsed.
+
+  This gives the same items as FromGNString() would return for a list, but
+  the list itself is never built. File objects are read in chunks, so huge
+  lists (e.g. exec_script outputs naming 100k+ files) can be streamed into a
+  set or filter without holding all of the input or the items in memory.
+
+  Args:
+    fp_or_str: The serialized GN list, either as a string or as a file object.
+        Files opened in binary mode are decoded as UTF-8.
+
+  Raises:
+    GNError: The input is not a valid GN list. The error's |offset| is the
+        byte offset into the input at which the error was detected. Items
+        before that point have been yielded already.
   """
-  parser = GNValueParser(input_string)
-  return parser.ParseArgs()
+  return _IncrementalListParser(fp_or_str).IterItems()
 
 
 def UnescapeGNString(value):
@@ -228,30 +380,120 @@ def UnescapeGNString(value):
 
   Args:
     value: Input string to unescape.
+
+  Returns:
+    The unescaped string. |value| itself is returned if it contains no
+    backslashes.
   """
-  result = ''
-  i = 0
-  while i < len(value):
-    if value[i] == '\\':
-      if i < len(value) - 1:
-        next_char = value[i + 1]
-        if next_char in ('$', '"', '\\'):
-          # These are the escaped characters GN supports.
-          result += next_char
-          i += 1
-        else:
-          # Any other backslash is a literal.
-          result += '\\'
-    else:
-      result += value[i]
-    i += 1
-  return result
+  if '\\' not in value:
+    return value
+  # Only \$, \" and \\ are escapes GN supports; any other backslash is a
+  # literal.
+  return ''.join(_UNESCAPE_RE.split(value))
 
 
 def _IsDigitOrMinus(char):
   return char in '-0123456789'
 
 
+def _HashText(text):
+  if not isinstance(text, bytes):  # Python 2 reads files as bytes already.
+    text = text.encode('utf-8', 'surrogatepass')
+  return hashlib.sha256(text).hexdigest()
+
+
+# Contents of imported files, keyed by path. Each value is a tuple of
+# ((mtime, size), contents), reused for as long as the file is unchanged.
+_imported_file_cache = {}
+
+
+def _ReadImportedFile(path):
+  """Returns the contents of |path|, reusing a cached copy when possible."""
+  try:
+    st = os.stat(path)
+    version = (st.st_mtime, st.st_size)
+  except OSError:
+    version = None  # Let open() report the error (if there is one).
+  cached = _imported_file_cache.get(path)
+  if version is not None and cached is not None and cached[0] == version:
+    return cached[1]
+  with open(path) as f:
+    contents = f.read()
+  if version is not None:
+    _imported_file_cache[path] = (version, contents)
+  return contents
+
+
+# Changes whenever the format of args cache entries or the results of
+# ParseArgs() change.
+_ARGS_CACHE_VERSION = 1
+
+
+def _LoadArgsCacheEntry(cache_path):
+  """Returns the ParseArgs() result cached at |cache_path|.
+
+  Returns:
+    A tuple of (imports, result), see _StoreArgsCacheEntry(), or None if
+    there's no usable entry or any file imported when it was created has
+    changed since. Files are only hashed again if their mtime or size differ
+    from when the entry was written.
+  """
+  try:
+    with open(cache_path, 'rb') as f:
+      version, imports, result = marshal.loads(f.read())
+  except (EnvironmentError, EOFError, ValueError, TypeError):
+    return None
+  if version != _ARGS_CACHE_VERSION:
+    return None
+  for path, file_version, digest in imports:
+    try:
+      st = os.stat(path)
+    except OSError:
+      return None
+    if (st.st_mtime, st.st_size) != file_version and \
+       _HashText(_ReadImportedFile(path)) != digest:
+      return None
+  return imports, result
+
+
+def _StoreArgsCacheEntry(cache_path, imports, result):
+  """Atomically writes a ParseArgs() result to |cache_path|.
+
+  Args:
+    cache_path: Path of the entry to write.
+    imports: List of (path, (mtime, size), digest) tuples describing the
+        imported files |result| depends on, in the order of imported_files.
+    result: The result of ParseArgs().
+
+  Failing to write the entry isn't an error; the result is just not cached.
+  """
+  try:
+    data = marshal.dumps((_ARGS_CACHE_VERSION, imports, result))
+  except ValueError:
+    return  # Nested too deeply to be stored; just don't cache it.
+  cache_dir = os.path.dirname(cache_path)
+  # os.replace() is Python 3 only. os.rename() replaces files as well, except
+  # on Windows, where the entry then just isn't updated.
+  replace = getattr(os, 'replace', os.rename)
+  try:
+    if not os.path.isdir(cache_dir):
+      try:
+        os.makedirs(cache_dir)
+      except OSError:
+        if not os.path.isdir(cache_dir):  # Not created by someone else.
+          raise
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir)
+    try:
+      with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+      replace(tmp_path, cache_path)
+    finally:
+      if os.path.exists(tmp_path):
+        os.unlink(tmp_path)
+  except OSError:
+    pass
+
+
 class GNValueParser(object):
   """Duplicates GN parsing of values and converts to Python types.
 
@@ -261,10 +503,16 @@ class GNValueParser(object):
   functions directly. All functions throw GNError on invalid input.
   """
 
-  def __init__(self, string, checkout_root=_CHROMIUM_ROOT):
+  def __init__(self, string, checkout_root=_CHROMIUM_ROOT, intern=False,
+               compact=False):
     self.input = string
     self.cur = 0
     self.checkout_root = checkout_root
+    # See FromGNString() for these two.
+    self.intern = intern
+    self.compact = compact
+    # Files spliced in by ReplaceImports(), directly or indirectly.
+    self.imported_files = []
 
   def IsDone(self):
     return self.cur == len(self.input)
@@ -272,44 +520,60 @@ class GNValueParser(object):
   def ReplaceImports(self):
     """Replaces import(...) lines with the contents of the imports.
 
-    Recurses on itself until there are no imports remaining, in the case of
-    nested imports.
+    Nested imports are replaced as well. Every imported file is read and
+    expanded only once, no matter how often it's imported, and the result is
+    put together in a single pass.
+
+    Returns:
+      The list of imported files, in the order they were first encountered.
+      It's also kept in |self.imported_files|, e.g. for writing depfiles.
+
+    Raises:
+      GNError: An import line is malformed or the imports form a cycle.
+    """
+    self.imported_files = []
+    self.input = self._ExpandImports(self.input, [], {})
+    return self.imported_files
+
+  def _ExpandImports(self, text, import_stack, expanded):
+    """Returns |text| with all import(...) lines replaced recursively.
+
+    Args:
+      text: The text to expand.
+      import_stack: The files currently being expanded, outermost first.
+      expanded: Dictionary mapping the files expanded so far to their
+          expanded contents.
     """
-    lines = self.input.splitlines()
-    if not any(line.startswith('import(') for line in lines):
-      return
-    for line in lines:
+    if 'import(' not in text:
+      return text
+    pieces = []
+    for line in text.splitlines(True):
       if not line.startswith('import('):
+        pieces.append(line)
         continue
-      regex_match = IMPORT_RE.match(line)
+      # Only the import statement is replaced, the line break is kept.
+      statement = line.splitlines()[0]
+      regex_match = IMPORT_RE.match(statement)
       if not regex_match:
-        raise GNError('Not a valid import string: %s' % line)
-      import_path = os.path.join(self.checkout_root, regex_match.group(1))
-      with open(import_path) as f:
-        imported_args = f.read()
-      self.input = self.input.replace(line, imported_args)
-    # Call ourselves again if we've just replaced an import() with additional
-    # imports.
-    self.ReplaceImports()
-
-
-  def _ConsumeWhitespace(self):
-    while not self.IsDone() and self.input[self.cur] in ' \t\n':
-      self.cur += 1
+        raise GNError('Not a valid import string: %s' % statement)
+      import_path = os.path.normpath(
+          os.path.join(self.checkout_root, regex_match.group(1)))
+      if import_path in import_stack:
+        cycle = import_stack[import_stack.index(import_path):] + [import_path]
+        raise GNError('Import cycle: %s' % ' -> '.join(cycle))
+      if import_path not in expanded:
+        self.imported_files.append(import_path)
+        expanded[import_path] = self._ExpandImports(
+            _ReadImportedFile(import_path), import_stack + [import_path],
+            expanded)
+      pieces.append(expanded[import_path])
+      pieces.append(line[len(statement):])
+    return ''.join(pieces)
 
   def ConsumeCommentAndWhitespace(self):
-    self._ConsumeWhitespace()
-
-    # Consume each comment, line by line.
-    while not self.IsDone() and self.input[self.cur] == '#':
-      # Consume the rest of the comment, up until the end of the line.
-      while not self.IsDone() and self.input[self.cur] != '\n':
-        self.cur += 1
-      # Move the cursor to the next line (if there is one).
-      if not self.IsDone():
-        self.cur += 1
-
-      self._ConsumeWhitespace()
+    # A comment runs up to the end of its line; the newline itself is then
+    # consumed as whitespace.
+    self.cur = _COMMENT_AND_WHITESPACE_RE.match(self.input, self.cur).end()
 
   def Parse(self):
     """Converts a string representing a printed GN value to the Python type.
@@ -338,20 +602,35 @@ class GNValueParser(object):
       raise GNError("Trailing input after parsing:\n  " + self.input[self.cur:])
     return result
 
-  def ParseArgs(self):
+  def ParseArgs(self, cache_dir=None):
     """Converts a whitespace-separated list of ident=literals to a dict.
 
     See additional usage notes on FromGNArgs(), above.
 
+    Args:
+      cache_dir: Optional directory to cache the result in. The cache key is
+          a hash of the input and the checkout root; entries are only used
+          if every file imported by the input still has the same contents.
+
     Raises:
       GNError: Parse fails.
     """
+    if cache_dir:
+      return self._ParseArgsCached(cache_dir)
+
     d = {}
 
     self.ReplaceImports()
     self.ConsumeCommentAndWhitespace()
 
     while not self.IsDone():
+      # Fast path: assignments of scalar values are matched in a single call.
+      match = _ASSIGNMENT_RE.match(self.input, self.cur)
+      if match:
+        d[self._String(match.group('ident'))] = self._ScalarValue(match)
+        self.cur = match.end()
+        continue
+
       ident = self._ParseIdent()
       self.ConsumeCommentAndWhitespace()
       if self.input[self.cur] != '=':
@@ -364,45 +643,185 @@ class GNValueParser(object):
 
     return d
 
+  def _ParseArgsCached(self, cache_dir):
+    key = _HashText('%s\0%d%d\0%s' % (os.path.abspath(self.checkout_root),
+                                       self.intern, self.compact, self.input))
+    cache_path = os.path.join(cache_dir, key + '.args')
+    entry = _LoadArgsCacheEntry(cache_path)
+    if entry is not None:
+      imports, result = entry
+      self.imported_files = [path for path, _, _ in imports]
+      return result
+
+    result = self.ParseArgs()
+    imports = []
+    for path in self.imported_files:
+      if path not in _imported_file_cache:
+        return result  # Couldn't stat it, so changes can't be detected.
+      file_version, contents = _imported_file_cache[path]
+      imports.append((path, file_version, _HashText(contents)))
+    _StoreArgsCacheEntry(cache_path, imports, result)
+    return result
+
   def _ParseAllowTrailing(self):
-    """Internal version of Parse() that doesn't check for trailing stuff."""
+    """Internal version of Parse() that doesn't check for trailing stuff.
+
+    Lists and scopes are parsed using an explicit stack instead of recursion,
+    so values can be nested arbitrarily deep.
+    """
+    # The lists and scopes being parsed, innermost last. Lists are tracked as
+    # [items, whether the last item was followed by a comma], scopes as
+    # [dict, identifier the value being parsed is assigned to].
+    stack = []
+    while True:
+      self.ConsumeCommentAndWhitespace()
+      if self.IsDone():
+        raise GNError("Expected input to parse.")
+
+      next_char = self.input[self.cur]
+      if next_char == '[':
+        self.cur += 1
+        self.ConsumeCommentAndWhitespace()
+        if self.IsDone():
+          raise GNError('Unterminated list:\n  ' + self.input)
+        stack.append([[], True])
+      elif next_char == '{':
+        self.cur += 1
+        self.ConsumeCommentAndWhitespace()
+        if self.IsDone():
+          raise GNError('Unterminated scope:\n ' + self.input)
+        stack.append([{}, None])
+      else:
+        if _IsDigitOrMinus(next_char):
+          value = self.ParseNumber()
+        elif next_char == '"':
+          value = self.ParseString()
+        elif self._ConstantFollows('true'):
+          value = True
+        elif self._ConstantFollows('false'):
+          value = False
+        else:
+          raise GNError("Unexpected token: " + self.input[self.cur:])
+        if not stack:
+          return value
+        self._AddNestedValue(stack[-1], value)
+
+      # Continue with the innermost list or scope until it either ends or
+      # another nested value needs to be parsed.
+      while True:
+        frame = stack[-1]
+        if isinstance(frame[0], list):
+          if not self._ParseListItems(frame):
+            break
+          value = self._List(frame[0])
+        else:
+          if not self._ParseScopeItems(frame):
+            break
+          value = frame[0]
+        stack.pop()
+        if not stack:
+          return value
+        self._AddNestedValue(stack[-1], value)
+
+  def _AddNestedValue(self, frame, value):
+    """Adds a value parsed by _ParseAllowTrailing() to its list or scope."""
     self.ConsumeCommentAndWhitespace()
-    if self.IsDone():
-      raise GNError("Expected input to parse.")
+    if isinstance(frame[0], list):
+      frame[0].append(value)
+      if self.IsDone():
+        raise GNError('Unterminated list:\n  ' + self.input)
 
-    next_char = self.input[self.cur]
-    if next_char == '[':
-      return self.ParseList()
-    elif next_char == '{':
-      return self.ParseScope()
-    elif _IsDigitOrMinus(next_char):
-      return self.ParseNumber()
-    elif next_char == '"':
-      return self.ParseString()
-    elif self._ConstantFollows('true'):
-      return True
-    elif self._ConstantFollows('false'):
-      return False
+      # Consume comma if there is one.
+      frame[1] = self.input[self.cur] == ','
+      if frame[1]:
+        # Consume comma.
+        self.cur += 1
+        self.ConsumeCommentAndWhitespace()
     else:
-      raise GNError("Unexpected token: " + self.input[self.cur:])
+      frame[0][frame[1]] = value
+
+  def _ParseListItems(self, frame):
+    """Parses list items up to the end of the list or the next nested value.
+
+    Args:
+      frame: The [items, previous_had_trailing_comma] of the list, as tracked
+          by _ParseAllowTrailing().
+
+    Returns:
+      True if the end of the list was reached, False if the next item needs
+      to be parsed by _ParseAllowTrailing().
+    """
+    items = frame[0]
+    while not self.IsDone():
+      if self.input[self.cur] == ']':
+        self.cur += 1  # Skip over ']'.
+        return True
+
+      if not frame[1]:
+        raise GNError('List items not separated by comma.')
+
+      # Fast path: scalar items are matched together with the whitespace,
+      # comments and comma following them in a single call.
+      match = _LIST_ITEM_RE.match(self.input, self.cur)
+      if not match:
+        return False
+      items.append(self._ScalarValue(match))
+      frame[1] = bool(match.group('comma'))
+      self.cur = match.end()
+
+    raise GNError('Unterminated list:\n  ' + self.input)
+
+  def _ParseScopeItems(self, frame):
+    """Parses assignments up to the end of the scope or the next nested value.
+
+    Args:
+      frame: The [dict, identifier] of the scope, as tracked by
+          _ParseAllowTrailing(). The identifier is updated when a nested
+          value follows.
+
+    Returns:
+      True if the end of the scope was reached, False if the value of
+      the identifier needs to be parsed by _ParseAllowTrailing().
+    """
+    scope_result = frame[0]
+    while not self.IsDone():
+      if self.input[self.cur] == '}':
+        self.cur += 1
+        return True
+
+      match = _ASSIGNMENT_RE.match(self.input, self.cur)
+      if match:
+        scope_result[self._String(match.group('ident'))] = \
+            self._ScalarValue(match)
+        self.cur = match.end()
+        continue
+
+      frame[1] = self._ParseIdent()
+      self.ConsumeCommentAndWhitespace()
+      if self.input[self.cur] != '=':
+        raise GNError("Unexpected token: " + self.input[self.cur:])
+      self.cur += 1
+      self.ConsumeCommentAndWhitespace()
+      return False
+
+    raise GNError('Unterminated scope:\n ' + self.input)
 
   def _ParseIdent(self):
-    ident = ''
+    begin = self.cur
 
     next_char = self.input[self.cur]
     if not next_char.isalpha() and not next_char=='_':
       raise GNError("Expected an identifier: " + self.input[self.cur:])
 
-    ident += next_char
-    self.cur += 1
-
+    # Runs of ASCII identifier characters are consumed in one go, anything
+    # else (e.g. non-ASCII letters) one character at a time.
+    self.cur = _IDENT_TAIL_RE.match(self.input, self.cur + 1).end()
     next_char = self.input[self.cur]
     while next_char.isalpha() or next_char.isdigit() or next_char=='_':
-      ident += next_char
-      self.cur += 1
+      self.cur = _IDENT_TAIL_RE.match(self.input, self.cur + 1).end()
       next_char = self.input[self.cur]
 
-    return ident
+    return self._String(self.input[begin:self.cur])
 
   def ParseNumber(self):
     self.ConsumeCommentAndWhitespace()
@@ -411,9 +830,11 @@ class GNValueParser(object):
 
     begin = self.cur
 
-    # The first character can include a negative sign.
-    if not self.IsDone() and _IsDigitOrMinus(self.input[self.cur]):
-      self.cur += 1
+    # The first character can include a negative sign. Runs of ASCII digits
+    # are consumed in one go, any other digits one character at a time.
+    match = _NUMBER_RE.match(self.input, self.cur)
+    if match:
+      self.cur = match.end()
     while not self.IsDone() and self.input[self.cur].isdigit():
       self.cur += 1
 
@@ -433,88 +854,53 @@ class GNValueParser(object):
     self.cur += 1  # Skip over quote.
 
     begin = self.cur
-    while not self.IsDone() and self.input[self.cur] != '"':
-      if self.input[self.cur] == '\\':
-        self.cur += 1  # Skip over the backslash.
-        if self.IsDone():
-          raise GNError('String ends in a backslash in:\n  ' + self.input)
-      self.cur += 1
-
-    if self.IsDone():
+    end = _STRING_BODY_RE.match(self.input, begin).end()
+    # The body can only stop short of the closing quote at the end of the
+    # input, or right before a trailing backslash.
+    if end < len(self.input) and self.input[end] == '\\':
+      raise GNError('String ends in a backslash in:\n  ' + self.input)
+    if end == len(self.input):
       raise GNError('Unterminated string:\n  ' + self.input[begin:])
 
-    end = self.cur
-    self.cur += 1  # Consume trailing ".
+    self.cur = end + 1  # Consume trailing ".
 
-    return UnescapeGNString(self.input[begin:end])
+    return self._String(UnescapeGNString(self.input[begin:end]))
 
   def ParseList(self):
     self.ConsumeCommentAndWhitespace()
     if self.IsDone():
       raise GNError('Expected list but got nothing.')
 
-    # Skip over opening '['.
     if self.input[self.cur] != '[':
       raise GNError('Expected [ for list but got:\n  ' + self.input[self.cur:])
-    self.cur += 1
-    self.ConsumeCommentAndWhitespace()
-    if self.IsDone():
-      raise GNError('Unterminated list:\n  ' + self.input)
-
-    list_result = []
-    previous_had_trailing_comma = True
-    while not self.IsDone():
-      if self.input[self.cur] == ']':
-        self.cur += 1  # Skip over ']'.
-        return list_result
-
-      if not previous_had_trailing_comma:
-        raise GNError('List items not separated by comma.')
-
-      list_result += [ self._ParseAllowTrailing() ]
-      self.ConsumeCommentAndWhitespace()
-      if self.IsDone():
-        break
-
-      # Consume comma if there is one.
-      previous_had_trailing_comma = self.input[self.cur] == ','
-      if previous_had_trailing_comma:
-        # Consume comma.
-        self.cur += 1
-        self.ConsumeCommentAndWhitespace()
-
-    raise GNError('Unterminated list:\n  ' + self.input)
+    return self._ParseAllowTrailing()
+
+  def _String(self, value):
+    return _Intern(value) if self.intern else value
+
+  def _List(self, items):
+    if self.compact and all(
+        isinstance(item, _basestring_compat) for item in items):
+      return tuple(items)
+    return items
+
+  def _ScalarValue(self, match):
+    """Converts the scalar matched by _LIST_ITEM_RE or _ASSIGNMENT_RE."""
+    string, number, constant = match.group('string', 'number', 'constant')
+    if string is not None:
+      return self._String(UnescapeGNString(string))
+    if number is not None:
+      return int(number)
+    return constant == 'true'
 
   def ParseScope(self):
     self.ConsumeCommentAndWhitespace()
     if self.IsDone():
       raise GNError('Expected scope but got nothing.')
 
-    # Skip over opening '{'.
     if self.input[self.cur] != '{':
       raise GNError('Expected { for scope but got:\n ' + self.input[self.cur:])
-    self.cur += 1
-    self.ConsumeCommentAndWhitespace()
-    if self.IsDone():
-      raise GNError('Unterminated scope:\n ' + self.input)
-
-    scope_result = {}
-    while not self.IsDone():
-      if self.input[self.cur] == '}':
-        self.cur += 1
-        return scope_result
-
-      ident = self._ParseIdent()
-      self.ConsumeCommentAndWhitespace()
-      if self.input[self.cur] != '=':
-        raise GNError("Unexpected token: " + self.input[self.cur:])
-      self.cur += 1
-      self.ConsumeCommentAndWhitespace()
-      val = self._ParseAllowTrailing()
-      self.ConsumeCommentAndWhitespace()
-      scope_result[ident] = val
-
-    raise GNError('Unterminated scope:\n ' + self.input)
+    return self._ParseAllowTrailing()
 
   def _ConstantFollows(self, constant):
     """Checks and maybe consumes a string constant at current input location.
@@ -527,15 +913,133 @@ class GNValueParser(object):
       input. In this case, the string is consumed as a side effect. Otherwise,
       returns False and the current position is unchanged.
     """
-    end = self.cur + len(constant)
-    if end > len(self.input):
-      return False  # Not enough room.
-    if self.input[self.cur:end] == constant:
-      self.cur = end
+    if self.input.startswith(constant, self.cur):
+      self.cur += len(constant)
       return True
     return False
 
 
+# Minimum number of characters _IncrementalListParser reads at once.
+_ITER_CHUNK_SIZE = 64 * 1024
+
+
+class _IncrementalListParser(GNValueParser):
+  """Implements IterGNList().
+
+  |self.input| only holds a window of the whole input, starting at the item
+  being parsed. Whenever a token might continue past the end of that window,
+  more input is read and the token is parsed again.
+  """
+
+  def __init__(self, fp_or_str):
+    if isinstance(fp_or_str, _basestring_compat):
+      GNValueParser.__init__(self, fp_or_str)
+      self.fp = None
+    else:
+      GNValueParser.__init__(self, '')
+      self.fp = fp_or_str
+      self.decoder = codecs.getincrementaldecoder('utf-8')()
+    # Byte offset of |self.input| into the whole input.
+    self.window_offset = 0
+
+  def _ByteOffset(self):
+    consumed = self.input[:self.cur].encode('utf-8', 'surrogatepass')
+    return self.window_offset + len(consumed)
+
+  def _Error(self, message):
+    offset = self._ByteOffset()
+    return GNError('%s (at byte %d)' % (message, offset), offset)
+
+  def _ReadMore(self):
+    """Drops consumed input and appends the next chunk to the window."""
+    self.window_offset = self._ByteOffset()
+    self.input = self.input[self.cur:]
+    self.cur = 0
+    # Read at least as much as is buffered already, so that re-parsing a
+    # huge item takes amortized linear time.
+    data = self.fp.read(max(_ITER_CHUNK_SIZE, len(self.input)))
+    if not data:
+      self.fp = None
+    if not isinstance(data, _basestring_compat):
+      # Might be empty if the chunk ends inside a multi-byte character.
+      data = self.decoder.decode(data, final=not data)
+    self.input += data
+
+  def _AtWindowEnd(self, pos):
+    """Returns whether |pos| is at the end of the window but not the input."""
+    return pos == len(self.input) and self.fp is not None
+
+  def _ConsumeCommentAndWhitespaceAcrossChunks(self):
+    # A run reaching the end of the window is consumed again from its start
+    # once more input is available, as it might end inside a comment.
+    end = _COMMENT_AND_WHITESPACE_RE.match(self.input, self.cur).end()
+    while self._AtWindowEnd(end):
+      self._ReadMore()
+      end = _COMMENT_AND_WHITESPACE_RE.match(self.input, self.cur).end()
+    self.cur = end
+
+  def _ParseItem(self):
+    """Parses the next list item, reading more input as necessary.
+
+    Returns:
+      A tuple of the item and whether a comma follows it.
+    """
+    while True:
+      match = _LIST_ITEM_RE.match(self.input, self.cur)
+      if match and not self._AtWindowEnd(match.end()):
+        self.cur = match.end()
+        return self._ScalarValue(match), bool(match.group('comma'))
+      if match:
+        self._ReadMore()
+        continue
+
+      # Nested and invalid items go through the regular parser. Its errors
+      # only count once all of the input is available.
+      begin = self.cur
+      try:
+        item = self._ParseAllowTrailing()
+        self.ConsumeCommentAndWhitespace()
+        if not self._AtWindowEnd(self.cur):
+          break
+      except (GNError, IndexError) as e:
+        if self.fp is None:
+          if isinstance(e, IndexError):
+            raise self._Error('Unterminated list.')
+          raise self._Error(str(e))
+      self.cur = begin
+      self._ReadMore()
+
+    has_comma = self.cur < len(self.input) and self.input[self.cur] == ','
+    if has_comma:
+      self.cur += 1
+    return item, has_comma
+
+  def IterItems(self):
+    self._ConsumeCommentAndWhitespaceAcrossChunks()
+    if self.IsDone():
+      raise self._Error('Expected list but got nothing.')
+    if self.input[self.cur] != '[':
+      raise self._Error('Expected [ for list.')
+    self.cur += 1
+
+    previous_had_trailing_comma = True
+    while True:
+      self._ConsumeCommentAndWhitespaceAcrossChunks()
+      if self.IsDone():
+        raise self._Error('Unterminated list.')
+      if self.input[self.cur] == ']':
+        self.cur += 1
+        break
+      if not previous_had_trailing_comma:
+        raise self._Error('List items not separated by comma.')
+      item, previous_had_trailing_comma = self._ParseItem()
+      yield item
+
+    self._ConsumeCommentAndWhitespaceAcrossChunks()
+    if not self.IsDone():
+      raise self._Error('Trailing input after parsing.')
+
+
 def ReadBuildVars(output_directory):
   """Parses $output_directory/build_vars.json into a dict."""
   with open(os.path.join(output_directory, BUILD_VARS_FILENAME)) as f:
@@ -0,0 +1,451 @@
+#!/usr/bin/env python
+# Copyright 2026 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Measures the throughput of the gn_helpers parsing and printing functions.
+
+The inputs are synthetic, but shaped like the generated args and exec_script
+outputs seen in real builds: long lists of source paths, args files with many
+assignments and imports, deeply nested scopes and long escaped strings.
+
+Run with:
+  python gn_helpers_benchmark.py [--size=MB] [--string-size=MB] [--repeat=N]
+      [--memory] [--json=FILE] [--baseline=FILE [--threshold=FRACTION]]
+      [benchmark ...]
+
+--json writes the results (operations per second and memory use of every
+benchmark) to FILE, or to stdout if FILE is '-'. Such a file can later be
+passed as --baseline, in which case the script fails if any benchmark got
+slower or uses more memory than the baseline by more than the threshold.
+"""
+
+from __future__ import print_function
+
+import argparse
+import atexit
+import collections
+import functools
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+import gn_helpers
+
+
+def _MakeSourceList(size):
+  """Returns a serialized GN list of source paths of about |size| bytes."""
+  items = []
+  total = 0
+  i = 0
+  while total < size:
+    item = '"//third_party/module_%d/src/dir_%d/source_file_%d.cc"' % (
+        i % 97, i % 13, i)
+    items.append(item)
+    total += len(item) + 2
+    i += 1
+  return '[ ' + ', '.join(items) + ' ]'
+
+
+def _MakeArgs(size):
+  """Returns an args.gn-like string of about |size| bytes."""
+  lines = ['# Generated args.']
+  total = 0
+  i = 0
+  while total < size:
+    kind = i % 4
+    if kind == 0:
+      line = 'use_feature_%d = true  # Comment.' % i
+    elif kind == 1:
+      line = 'level_%d = %d' % (i, i * 7)
+    elif kind == 2:
+      line = 'path_%d = "//out/gen/dir_%d/file \\"%d\\".txt"' % (i, i % 13, i)
+    else:
+      line = 'list_%d = [\n  "a_%d.cc",\n  "b_%d.cc",\n  %d,\n]' % (i, i, i, i)
+    lines.append(line)
+    total += len(line) + 1
+    i += 1
+  return '\n'.join(lines) + '\n'
+
+
+def _MakeSourceLists(size):
+  """Returns a serialized GN list of short source lists of about |size| bytes.
+
+  Like the output of a script describing many targets, the same paths show up
+  in several lists.
+  """
+  lists = []
+  total = 0
+  i = 0
+  while total < size:
+    items = ', '.join('"//base/module_%d/file_%d.cc"' % (i % 97, (i + j) % 50)
+                      for j in range(8))
+    lists.append('[ ' + items + ' ]')
+    total += len(lists[-1]) + 2
+    i += 1
+  return '[ ' + ', '.join(lists) + ' ]'
+
+
+def _MakeLongList(length):
+  """Returns a serialized GN list of |length| short strings and numbers."""
+  items = []
+  for i in range(length):
+    items.append('"f%d.cc"' % i if i % 4 else str(i))
+  return '[ ' + ', '.join(items) + ' ]'
+
+
+def _MakeNestedValue(depth):
+  """Returns a serialized GN list of values nested |depth| levels deep.
+
+  Lists and scopes alternate, the way generated per-target descriptions nest.
+  The list holds enough copies to make it about 1 MB.
+  """
+  value = '"leaf"'
+  for level in range(depth):
+    if level % 2:
+      value = '{\n  deps = %s\n  testonly = true\n}' % value
+    else:
+      value = '[ %s, %d ]' % (value, level)
+  return '[ ' + ', '.join([value] * (1024 * 1024 // len(value) + 1)) + ' ]'
+
+
+# Args files together with the files they import, in a temporary checkout.
+_ArgsWithImports = collections.namedtuple('_ArgsWithImports',
+                                          ['root', 'text', 'size'])
+
+
+def _MakeArgsWithImports(size):
+  """Returns an _ArgsWithImports of about |size| bytes in total.
+
+  The args import 20 files of equal size, which all import a shared one.
+  """
+  root = tempfile.mkdtemp(prefix='gn_helpers_benchmark')
+  atexit.register(shutil.rmtree, root, True)
+  os.mkdir(os.path.join(root, 'args'))
+  part = size // 22
+  with open(os.path.join(root, 'args', 'shared.gni'), 'w') as f:
+    f.write(_MakeArgs(part).replace('_', '_shared_'))
+  lines = []
+  for i in range(20):
+    with open(os.path.join(root, 'args', 'part_%d.gni' % i), 'w') as f:
+      f.write('import("//args/shared.gni")\n')
+      f.write(_MakeArgs(part).replace('_', '_%d_' % i))
+    lines.append('import("//args/part_%d.gni")' % i)
+  text = '\n'.join(lines) + '\n' + _MakeArgs(part)
+  return _ArgsWithImports(root, text, len(text) + 21 * part)
+
+
+def _ReplaceImports(args):
+  # Imported files are cached by gn_helpers, but a build script typically
+  # reads them just once.
+  gn_helpers._imported_file_cache.clear()
+  gn_helpers.GNValueParser(args.text, checkout_root=args.root).ReplaceImports()
+
+
+def _FromGNArgsWithImports(args):
+  gn_helpers._imported_file_cache.clear()
+  return gn_helpers.GNValueParser(args.text,
+                                  checkout_root=args.root).ParseArgs()
+
+
+def _MakeEncodedSourceList(size):
+  """Returns _MakeSourceList(size) as UTF-8 encoded bytes."""
+  return _MakeSourceList(size).encode('utf-8')
+
+
+def _IterGNList(data):
+  for _ in gn_helpers.IterGNList(io.BytesIO(data)):
+    pass
+
+
+def _MakeEscapedString(size):
+  """Returns a GN-escaped string body (no quotes) of about |size| bytes.
+
+  This is what a long list interpolated into a string ("--values=$list")
+  looks like after GN has escaped it.
+  """
+  item = '\\"//out/gen/\\$root/dir\\\\file.cc\\", '
+  return item * (size // len(item) + 1)
+
+
+def _MakePlainString(size):
+  """Returns a string body without any backslashes of about |size| bytes."""
+  item = '//out/gen/root/dir/file.cc '
+  return item * (size // len(item) + 1)
+
+
+def _MakeQuotedString(size):
+  """Returns a serialized GN string of about |size| bytes."""
+  return '"' + _MakeEscapedString(size) + '"'
+
+
+def _MakeScopes(size):
+  """Returns a dict of scopes whose GN form is about |size| bytes."""
+  scopes = {}
+  total = 0
+  i = 0
+  while total < size:
+    sources = ['//module_%d/src/file_%d.cc' % (i, j) for j in range(20)]
+    scopes['target_%d' % i] = {
+        'sources': sources,
+        'deps': [':dep_%d' % (i - 1)] if i else [],
+        'testonly': i % 2 == 0,
+    }
+    total += sum(len(source) + 4 for source in sources) + 60
+    i += 1
+  return scopes
+
+
+def _MakePathList(size):
+  """Returns a list of paths whose GN form is about |size| bytes.
+
+  Most paths need no escaping; every tenth contains characters that do.
+  """
+  paths = []
+  total = 0
+  i = 0
+  while total < size:
+    if i % 10:
+      path = '//third_party/module_%d/src/source_file_%d.cc' % (i % 97, i)
+    else:
+      path = u'//gen/$root/"quoted"/\u2713 file_%d.cc' % i
+    paths.append(path)
+    total += len(path) + 4
+    i += 1
+  return paths
+
+
+def _ParseToValue(make_input):
+  """Returns an input generator for the value parsed from |make_input|."""
+  return lambda size: gn_helpers.FromGNString(make_input(size))
+
+
+def _WriteToGNString(value):
+  with open(os.devnull, 'w') as f:
+    f.write(gn_helpers.ToGNString(value, pretty=True))
+
+
+def _WriteGN(value):
+  with open(os.devnull, 'w') as f:
+    gn_helpers.WriteGN(value, f, pretty=True)
+
+
+def _InputSize(data):
+  """Returns the size of a benchmark input in bytes."""
+  if isinstance(data, (str, bytes)):
+    return len(data)
+  if isinstance(data, _ArgsWithImports):
+    return data.size
+  return len(gn_helpers.ToGNString(data))
+
+
+def _Measure(func, arg, repeat):
+  """Returns the best wall time of |repeat| calls to |func|(|arg|)."""
+  best = None
+  for _ in range(repeat):
+    start = timeit.default_timer()
+    func(arg)
+    elapsed = timeit.default_timer() - start
+    if best is None or elapsed < best:
+      best = elapsed
+  return best
+
+
+def _MeasureMemory(func, arg):
+  """Returns the peak and retained memory of |func|(|arg|), in bytes.
+
+  The retained memory is what is still allocated while the result is alive,
+  i.e. what a tool holding on to the parsed value pays for it.
+  """
+  import tracemalloc  # Python 3 only.
+
+  tracemalloc.start()
+  try:
+    result = func(arg)
+    current, peak = tracemalloc.get_traced_memory()
+    del result
+    return peak, current
+  finally:
+    tracemalloc.stop()
+
+
+# Tuples of (benchmark name, function, input generator, input size option).
+# The sizes of the 'size' and 'string_size' options are given in MB.
+_BENCHMARKS = [
+    ('FromGNString', gn_helpers.FromGNString, _MakeSourceList, 'size'),
+    ('FromGNString_lists', gn_helpers.FromGNString, _MakeSourceLists, 'size'),
+    ('FromGNString_intern',
+     functools.partial(gn_helpers.FromGNString, intern=True), _MakeSourceLists,
+     'size'),
+    ('FromGNString_compact',
+     functools.partial(gn_helpers.FromGNString, intern=True, compact=True),
+     _MakeSourceLists, 'size'),
+    ('FromGNString_long_list', gn_helpers.FromGNString, _MakeLongList,
+     'list_length'),
+    ('FromGNString_nested', gn_helpers.FromGNString, _MakeNestedValue,
+     'depth'),
+    ('FromGNArgs', gn_helpers.FromGNArgs, _MakeArgs, 'size'),
+    ('FromGNArgs_imports', _FromGNArgsWithImports, _MakeArgsWithImports,
+     'size'),
+    ('ReplaceImports', _ReplaceImports, _MakeArgsWithImports, 'size'),
+    ('IterGNList', _IterGNList, _MakeEncodedSourceList, 'size'),
+    ('UnescapeGNString', gn_helpers.UnescapeGNString, _MakeEscapedString,
+     'string_size'),
+    ('UnescapeGNString_plain', gn_helpers.UnescapeGNString, _MakePlainString,
+     'string_size'),
+    ('FromGNString_string', gn_helpers.FromGNString, _MakeQuotedString,
+     'string_size'),
+    ('ToGNString_list', gn_helpers.ToGNString, _MakePathList, 'size'),
+    ('ToGNString_long_list', gn_helpers.ToGNString,
+     _ParseToValue(_MakeLongList), 'list_length'),
+    ('ToGNString_nested', gn_helpers.ToGNString,
+     _ParseToValue(_MakeNestedValue), 'depth'),
+    ('ToGNString', _WriteToGNString, _MakeScopes, 'size'),
+    ('WriteGN', _WriteGN, _MakeScopes, 'size'),
+]
+
+
+# Memory use is only considered a regression if it grows by at least this
+# many bytes, as small allocations vary between runs.
+_MEMORY_SLACK = 64 * 1024
+
+
+def _Compare(results, baseline, threshold):
+  """Returns a list of regressions of |results| against |baseline|.
+
+  Args:
+    results: The 'benchmarks' dictionary of the current run.
+    baseline: The 'benchmarks' dictionary of the baseline.
+    threshold: The allowed relative regression of each metric, e.g. 0.1.
+  """
+  regressions = []
+  for name, metrics in sorted(results.items()):
+    if name not in baseline:
+      continue
+    old = baseline[name]
+    if metrics['ops_per_sec'] < old['ops_per_sec'] * (1 - threshold):
+      regressions.append('%s: %.3f ops/sec, baseline %.3f ops/sec' % (
+          name, metrics['ops_per_sec'], old['ops_per_sec']))
+    for metric in ('peak_memory_bytes', 'retained_memory_bytes'):
+      if metric not in metrics or metric not in old:
+        continue
+      if (metrics[metric] > old[metric] * (1 + threshold) and
+          metrics[metric] - old[metric] >= _MEMORY_SLACK):
+        regressions.append('%s: %s is %d, baseline %d' % (
+            name, metric, metrics[metric], old[metric]))
+  return regressions
+
+
+def main():
+  parser = argparse.ArgumentParser(
+      description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument('--size', type=float, default=4,
+                      help='Approximate input size in MB (default: %(default)s)')
+  parser.add_argument('--string-size', type=float, default=1,
+                      help=('Approximate size of single strings in MB '
+                            '(default: %(default)s)'))
+  parser.add_argument('--list-length', type=int, default=100000,
+                      help=('Number of items in long lists '
+                            '(default: %(default)s)'))
+  parser.add_argument('--depth', type=int, default=100,
+                      help=('Nesting depth of nested values '
+                            '(default: %(default)s)'))
+  parser.add_argument('--repeat', type=int, default=3,
+                      help='Runs per benchmark; the best one is reported')
+  parser.add_argument('--memory', action='store_true',
+                      help=('Also report the peak memory use of each '
+                            'benchmark and the memory held by its result'))
+  parser.add_argument('--json', metavar='FILE',
+                      help="Write the results as JSON to FILE ('-' for stdout)")
+  parser.add_argument('--baseline', metavar='FILE',
+                      help=('Fail if the results regress compared to the '
+                            'JSON results in FILE'))
+  parser.add_argument('--threshold', type=float, default=0.1,
+                      help=('Allowed relative regression of each metric '
+                            'against the baseline (default: %(default)s)'))
+  parser.add_argument('benchmarks', nargs='*',
+                      help='Benchmarks to run (default: all)')
+  args = parser.parse_args()
+
+  known = set(name for name, _, _, _ in _BENCHMARKS)
+  unknown = [name for name in args.benchmarks if name not in known]
+  if unknown:
+    parser.error('Unknown benchmarks: %s' % ', '.join(unknown))
+
+  options = {
+      'size': args.size,
+      'string_size': args.string_size,
+      'list_length': args.list_length,
+      'depth': args.depth,
+  }
+  baseline = None
+  if args.baseline:
+    with open(args.baseline) as f:
+      baseline = json.load(f)
+    if baseline['options'] != options:
+      parser.error('The baseline was recorded with different options: %s' %
+                   baseline['options'])
+
+  # Progress goes to stderr if the JSON results go to stdout.
+  log = sys.stderr if args.json == '-' else sys.stdout
+  measure_memory = args.memory or args.json or args.baseline
+  results = {}
+  for name, func, make_input, size_option in _BENCHMARKS:
+    if args.benchmarks and name not in args.benchmarks:
+      continue
+    size = options[size_option]
+    if size_option in ('size', 'string_size'):
+      size = int(size * 1024 * 1024)
+    data = make_input(size)
+    # Some benchmarks finish faster than the timer resolution.
+    elapsed = max(_Measure(func, data, args.repeat), 1e-9)
+    input_bytes = _InputSize(data)
+    megabytes = input_bytes / (1024.0 * 1024.0)
+    metrics = {
+        'input_bytes': input_bytes,
+        'seconds': elapsed,
+        'ops_per_sec': 1 / elapsed,
+    }
+    line = '%s: %.1f MB in %.3f s (%.1f MB/s)' % (name, megabytes, elapsed,
+                                                  megabytes / elapsed)
+    if measure_memory:
+      peak, retained = _MeasureMemory(func, data)
+      metrics['peak_memory_bytes'] = peak
+      metrics['retained_memory_bytes'] = retained
+      line += ', peak memory %.1f MB, retained %.1f MB' % (
+          peak / (1024.0 * 1024.0), retained / (1024.0 * 1024.0))
+    print(line, file=log)
+    results[name] = metrics
+
+  if args.json:
+    output = {
+        'options': options,
+        'python': '%d.%d.%d' % sys.version_info[:3],
+        'benchmarks': results,
+    }
+    if args.json == '-':
+      json.dump(output, sys.stdout, indent=2, sort_keys=True)
+      print()
+    else:
+      with open(args.json, 'w') as f:
+        json.dump(output, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+  if baseline is not None:
+    regressions = _Compare(results, baseline['benchmarks'], args.threshold)
+    if regressions:
+      print('Regressions of more than %d%% against %s:' % (
+          args.threshold * 100, args.baseline), file=log)
+      for regression in regressions:
+        print('  ' + regression, file=log)
+      return 1
+    print('No regressions against %s.' % args.baseline, file=log)
+  return 0
+
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -2,7 +2,11 @@
 # Use of this source code is governed by a BSD-style license that can be
 # found in the LICENSE file.
 
+import io
+import os
+import shutil
 import sys
+import tempfile
 import textwrap
 import unittest
 
@@ -17,6 +21,7 @@ class UnitTest(unittest.TestCase):
         ('\\$"$\\', '"\\\\\\$\\"\\$\\\\"', '"\\\\\\$\\"\\$\\\\"'),
         (' \t\r\n', '" $0x09$0x0D$0x0A"', '" $0x09$0x0D$0x0A"'),
         (u'\u2713', '"$0xE2$0x9C$0x93"', '"$0xE2$0x9C$0x93"'),
+        (u'a\xe9\x7f~', '"a$0xC3$0xA9$0x7F~"', '"a$0xC3$0xA9$0x7F~"'),
         ([], '[  ]', '[]'), ([1], '[ 1 ]', '[\n  1\n]\n'),
         ([3, 1, 4, 1], '[ 3, 1, 4, 1 ]', '[\n  3,\n  1,\n  4,\n  1\n]\n'),
         (['a', True, 2], '[ "a", true, 2 ]', '[\n  "a",\n  true,\n  2\n]\n'),
@@ -74,12 +79,31 @@ class UnitTest(unittest.TestCase):
       out_pretty = gn_helpers.ToGNString(obj, pretty=True)
       self.assertEqual(exp_pretty, out_pretty)
 
+  def test_WriteGN(self):
+    # Large enough to be written in several batches.
+    big_list = [{'a': i, 'b': [str(i), []]} for i in range(2000)]
+    for obj in (42, 'foo', [], [3, 1, 4], {'a': 1}, {'a': [1, {'b': {}}]},
+                big_list):
+      for pretty in (False, True):
+        out = io.StringIO()
+        gn_helpers.WriteGN(obj, out, pretty=pretty)
+        self.assertEqual(out.getvalue(),
+                         gn_helpers.ToGNString(obj, pretty=pretty))
+
+    with self.assertRaises(gn_helpers.GNError):
+      gn_helpers.WriteGN([1.5], io.StringIO())
+
   def test_UnescapeGNString(self):
     # Backslash followed by a \, $, or " means the folling character without
     # the special meaning. Backslash followed by everything else is a literal.
     self.assertEqual(
         gn_helpers.UnescapeGNString('\\as\\$\\\\asd\\"'),
         '\\as$\\asd"')
+    # A backslash at the very end is dropped.
+    self.assertEqual(gn_helpers.UnescapeGNString('a\\\\\\'), 'a\\')
+    # Strings without backslashes are returned as they are.
+    plain = 'no escapes $ "'
+    self.assertIs(gn_helpers.UnescapeGNString(plain), plain)
 
   def test_FromGNString(self):
     self.assertEqual(
@@ -90,6 +114,68 @@ class UnitTest(unittest.TestCase):
       parser = gn_helpers.GNValueParser('123 456')
       parser.Parse()
 
+  def test_FromGNStringCompact(self):
+    text = '[ [ "a/b.cc", "a/c.cc" ], [ "a/b.cc", 1 ], [  ] ]'
+    value = gn_helpers.FromGNString(text, intern=True, compact=True)
+    self.assertEqual(value, [('a/b.cc', 'a/c.cc'), ['a/b.cc', 1], ()])
+    # Equal strings share one object.
+    self.assertIs(value[0][0], value[1][0])
+    # Tuples are printed like lists.
+    self.assertEqual(gn_helpers.ToGNString(value), text)
+
+    args = gn_helpers.FromGNArgs('a = [ "x" ]\nb = { c = "x" }', intern=True,
+                                 compact=True)
+    self.assertEqual(args, {'a': ('x', ), 'b': {'c': 'x'}})
+    self.assertIs(args['a'][0], args['b']['c'])
+
+  def test_DeeplyNested(self):
+    # Deeper than the recursion limit; lists and scopes alternate.
+    depth = sys.getrecursionlimit() * 2
+    text = '"leaf"'
+    for level in range(depth):
+      if level % 2:
+        text = '[ %s ]' % text
+      else:
+        text = '{ v = %s }' % text
+    value = gn_helpers.FromGNString(text)
+    for level in range(depth):
+      value = value[0] if isinstance(value, list) else value['v']
+    self.assertEqual(value, 'leaf')
+    self.assertEqual(
+        gn_helpers.ToGNString(gn_helpers.FromGNString('[ %s ]' % text)),
+        '[ %s ]' % text)
+
+  def test_IterGNList(self):
+    text = u'[ 1, "a\\"b", # Comment, ]\n[ true, { c = [] } ],\n "\u2713" ]'
+    expected = gn_helpers.FromGNString(text)
+    self.assertEqual(list(gn_helpers.IterGNList(text)), expected)
+
+    # Read in tiny chunks, so that tokens, comments and UTF-8 sequences are
+    # split between them.
+    old_chunk_size = gn_helpers._ITER_CHUNK_SIZE
+    gn_helpers._ITER_CHUNK_SIZE = 1
+    try:
+      self.assertEqual(list(gn_helpers.IterGNList(io.StringIO(text))),
+                       expected)
+      self.assertEqual(
+          list(gn_helpers.IterGNList(io.BytesIO(text.encode('utf-8')))),
+          expected)
+    finally:
+      gn_helpers._ITER_CHUNK_SIZE = old_chunk_size
+
+    # Items before an error are still produced; the error has its offset.
+    data = u'["\u2713", 1 2]'.encode('utf-8')
+    items = gn_helpers.IterGNList(io.BytesIO(data))
+    self.assertEqual(next(items), u'\u2713')
+    self.assertEqual(next(items), 1)
+    with self.assertRaises(gn_helpers.GNError) as cm:
+      next(items)
+    self.assertEqual(cm.exception.offset, 10)
+
+    for invalid in ('', '1', '[1', '[1] 2', '[{a = 1]'):
+      with self.assertRaises(gn_helpers.GNError):
+        list(gn_helpers.IterGNList(invalid))
+
   def test_ParseBool(self):
     parser = gn_helpers.GNValueParser('true')
     self.assertEqual(parser.Parse(), True)
@@ -121,6 +207,9 @@ class UnitTest(unittest.TestCase):
     with self.assertRaises(gn_helpers.GNError):
       parser = gn_helpers.GNValueParser('"trailing')  # Unterminated.
       parser.ParseString()
+    with self.assertRaises(gn_helpers.GNError):
+      parser = gn_helpers.GNValueParser('"trailing\\')  # Ends in backslash.
+      parser.ParseString()
 
   def test_ParseList(self):
     parser = gn_helpers.GNValueParser('[1,]')  # Optional end comma OK.
@@ -138,6 +227,14 @@ class UnitTest(unittest.TestCase):
     with self.assertRaises(gn_helpers.GNError):
       parser = gn_helpers.GNValueParser('[1 2]')  # No separating comma.
       parser.ParseList()
+    with self.assertRaises(gn_helpers.GNError):
+      parser = gn_helpers.GNValueParser('[1a]')  # Number followed by junk.
+      parser.ParseList()
+
+    # Comments and escaped quotes must not confuse the item scanner.
+    parser = gn_helpers.GNValueParser(
+        '[ "a\\"b", # "c",\n -1 , true,false # ]\n,"$\\\\" ]')
+    self.assertEqual(parser.ParseList(), ['a"b', -1, True, False, '$\\'])
 
   def test_ParseScope(self):
     parser = gn_helpers.GNValueParser('{a = 1}')
@@ -182,6 +279,11 @@ class UnitTest(unittest.TestCase):
         'baz': False
     })
 
+    # Values hidden in comments should be ignored.
+    self.assertEqual(gn_helpers.FromGNArgs('foo = # 1\n  2 # 3'), {'foo': 2})
+    with self.assertRaises(gn_helpers.GNError):
+      gn_helpers.FromGNArgs('foo = # "bar"')
+
     # Lists should work.
     self.assertEqual(gn_helpers.FromGNArgs('foo=[1, 2, 3]'),
                      {'foo': [1, 2, 3]})
@@ -255,6 +357,57 @@ class UnitTest(unittest.TestCase):
     self.assertEqual(gn_helpers.FromGNArgs('foo_=true'),
                      {'foo_': True})
 
+  def test_ParseArgsCache(self):
+    if sys.version_info.major < 3:
+      from mock import patch
+    else:
+      from unittest.mock import patch
+
+    checkout_root = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, checkout_root)
+    cache_dir = os.path.join(checkout_root, 'cache')
+    imported_path = os.path.join(checkout_root, 'imported.gni')
+    with open(imported_path, 'w') as f:
+      f.write('b = [ "x" ]')
+
+    def ParseArgs(input_string):
+      parser = gn_helpers.GNValueParser(input_string,
+                                        checkout_root=checkout_root)
+      return parser.ParseArgs(cache_dir=cache_dir)
+
+    args = 'a = 1\nimport("//imported.gni")\n'
+    self.assertEqual(ParseArgs(args), {'a': 1, 'b': ['x']})
+
+    # Cache hits don't parse anything.
+    with patch.object(gn_helpers.GNValueParser, 'ReplaceImports',
+                      side_effect=AssertionError('Parsed again')):
+      self.assertEqual(ParseArgs(args), {'a': 1, 'b': ['x']})
+
+    # Cache hits still tell which files were imported, e.g. for depfiles.
+    parser = gn_helpers.GNValueParser(args, checkout_root=checkout_root)
+    with patch.object(gn_helpers.GNValueParser, 'ReplaceImports',
+                      side_effect=AssertionError('Parsed again')):
+      parser.ParseArgs(cache_dir=cache_dir)
+    self.assertEqual(parser.imported_files, [imported_path])
+
+    # Rewriting an import with the same contents keeps the entry valid.
+    os.utime(imported_path, (0, 0))
+    with patch.object(gn_helpers.GNValueParser, 'ReplaceImports',
+                      side_effect=AssertionError('Parsed again')):
+      self.assertEqual(ParseArgs(args), {'a': 1, 'b': ['x']})
+
+    # Changes to the input or its imports are noticed.
+    self.assertEqual(ParseArgs('a = 2\n'), {'a': 2})
+    with open(imported_path, 'w') as f:
+      f.write('b = [ "y" ]')
+    self.assertEqual(ParseArgs(args), {'a': 1, 'b': ['y']})
+
+    # Failing to store an entry doesn't fail the parse.
+    shutil.rmtree(cache_dir)
+    with open(cache_dir, 'w'):
+      pass
+    self.assertEqual(ParseArgs(args), {'a': 1, 'b': ['y']})
+
   def test_ReplaceImports(self):
     # Should be a no-op on args inputs without any imports.
     parser = gn_helpers.GNValueParser(
@@ -314,6 +467,40 @@ class UnitTest(unittest.TestCase):
           textwrap.dedent('import("some/relative/args/file.gni")'))
       parser.ReplaceImports()
 
+  def test_ReplaceImportsNested(self):
+    checkout_root = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, checkout_root)
+
+    def WriteFile(name, contents):
+      path = os.path.join(checkout_root, name)
+      with open(path, 'w') as f:
+        f.write(contents)
+      return path
+
+    # Both a.gni and b.gni import c.gni; it's spliced in at both places.
+    a_path = WriteFile('a.gni', 'a = 1\nimport("//b.gni")\nimport("//c.gni")')
+    b_path = WriteFile('b.gni', 'import("//c.gni")\nb = 2')
+    c_path = WriteFile('c.gni', 'c = 3')
+    parser = gn_helpers.GNValueParser('import("//a.gni")\nd = 4\n',
+                                      checkout_root=checkout_root)
+    self.assertEqual(parser.ReplaceImports(), [a_path, b_path, c_path])
+    self.assertEqual(parser.imported_files, [a_path, b_path, c_path])
+    self.assertEqual(parser.input, 'a = 1\nc = 3\nb = 2\nc = 3\nd = 4\n')
+
+    # Changes to imported files are picked up.
+    WriteFile('c.gni', 'c = 30')
+    parser = gn_helpers.GNValueParser('import("//b.gni")',
+                                      checkout_root=checkout_root)
+    parser.ReplaceImports()
+    self.assertEqual(parser.input, 'c = 30\nb = 2')
+
+    # Cycles should raise an exception instead of recursing forever.
+    WriteFile('c.gni', 'import("//a.gni")')
+    with self.assertRaises(gn_helpers.GNError):
+      parser = gn_helpers.GNValueParser('import("//a.gni")',
+                                        checkout_root=checkout_root)
+      parser.ReplaceImports()
+
 
 if __name__ == '__main__':
   unittest.main()
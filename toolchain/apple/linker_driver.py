@@ -6,10 +6,12 @@
 
 import os
 import os.path
-import shutil
 import subprocess
 import sys
 
+# shutil (and the re module it needs) is only imported by the steps that use it,
+# since this runs for every link.
+
 # On mac, the values of these globals are modified when parsing -Wcrl, flags. On
 # ios, the script uses the defaults.
 DSYMUTIL_INVOKE = ['xcrun', 'dsymutil']
@@ -209,6 +211,7 @@ def RunSaveUnstripped(unstripped_path_prefix, full_args):
   base = os.path.basename(linker_out)
   unstripped_out = os.path.join(unstripped_path_prefix, base + '.unstripped')
 
+  import shutil
   shutil.copyfile(linker_out, unstripped_out)
   return [unstripped_out]
 
@@ -283,6 +286,7 @@ def _RemovePath(path):
   """Removes the file or directory at |path| if it exists."""
   if os.path.exists(path):
     if os.path.isdir(path):
+      import shutil
       shutil.rmtree(path)
     else:
       os.unlink(path)
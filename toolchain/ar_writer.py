@@ -0,0 +1,332 @@
+# Copyright 2026 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Writes static libraries like `ar rcsD` and `ar rcsDT` do, in process.
+
+gcc_ar_wrapper.py used to delete the archive and run ar over all of its
+objects, which copies every one of them again even if only one changed.
+WriteArchive() writes the same bytes as GNU ar: a symbol index of the
+symbols each object defines, a table of the member names that don't fit into
+a member header, and the members with zeroed dates, owners and groups. Thin
+archives only contain the paths of their members, relative to the archive.
+
+With |incremental|, an index of the objects is kept next to the archive.
+Objects whose mtime and size, or failing that contents, haven't changed are
+not parsed again, and the members of a full archive are only written from
+the first one that changed on. The members before it stay where they are, as
+long as the symbol index and the name table keep their size.
+
+Inputs ar would handle differently (anything but the ELF objects elf_toc.py
+understands, e.g. LLVM bitcode or archives) and archives larger than 4 GiB
+raise ArchiveError, so that callers can fall back to running ar.
+"""
+
+import marshal
+import os
+
+import elf_toc
+import wrapper_utils
+
+_MAGIC = b'!<arch>\n'
+_THIN_MAGIC = b'!<thin>\n'
+_HEADER_SIZE = 60
+# Names longer than this go into the name table, since a header only has
+# room for 16 bytes including the terminating slash.
+_MAX_SHORT_NAME = 15
+# Archives with offsets beyond this need a 64-bit symbol index.
+_MAX_OFFSET = 0xffffffff
+_COPY_BUFFER_SIZE = 1024 * 1024
+# Changes whenever the format of the index kept by WriteArchive() changes.
+_INDEX_VERSION = 1
+
+
+class ArchiveError(Exception):
+  """The archive can't be written the way ar would write it."""
+
+
+class _Member(object):
+  """An object file to archive.
+
+  Attributes:
+    path: Path of the object file.
+    name: Name of the member, as bytes.
+    version: (mtime, size) of the object file.
+    digest: Hex SHA-256 of its contents, or None if it wasn't needed (the
+        contents of the members of thin archives don't matter).
+    symbols: The symbols it defines, see elf_toc.ReadArchiveSymbols().
+  """
+
+  def __init__(self, path, name, version, digest, symbols):
+    self.path = path
+    self.name = name
+    self.version = version
+    self.digest = digest
+    self.symbols = symbols
+
+  @property
+  def size(self):
+    return self.version[1]
+
+  def Entry(self):
+    return (self.path, self.version, self.digest, self.symbols)
+
+
+def _Header(name, size, mode=b'644'):
+  return b'%-16s%-12s%-6s%-6s%-8s%-10d`\n' % (name, b'0', b'0', b'0', mode,
+                                             size)
+
+
+def _Layout(members, thin):
+  """Returns where everything goes in the archive of |members|.
+
+  Returns:
+    A tuple of (prefix, headers, offsets): the bytes of the archive up to the
+    first member, the header of each member, and the offset of each member
+    followed by the size of the archive.
+  """
+  names = []
+  names_size = 0
+  headers = []
+  for i, member in enumerate(members):
+    if thin and i and member.name == members[i - 1].name:
+      # Like ar, consecutive members of a thin archive share their name.
+      name = b'/%d' % (names_size - len(names[-1]))
+    elif thin or len(member.name) > _MAX_SHORT_NAME:
+      names.append(member.name + b'/\n')
+      name = b'/%d' % names_size
+      names_size += len(names[-1])
+    else:
+      name = member.name + b'/'
+    if thin and len(os.path.basename(member.path)) == _MAX_SHORT_NAME:
+      # ar writes the short name before the reference to the name table, and
+      # the slash ending a name of the longest short length survives.
+      name = name.ljust(_MAX_SHORT_NAME) + b'/'
+    headers.append(_Header(name, member.size))
+  names = b''.join(names)
+  if names:
+    names += b'\n' * (len(names) % 2)
+    names = b'%-48s%-10d`\n' % (b'//', len(names)) + names
+
+  symbols = [symbol + b'\0' for member in members
+             for symbol in member.symbols]
+  strings = b''.join(symbols)
+  symbol_index_size = 4 * (1 + len(symbols)) + len(strings)
+  strings += b'\0' * (symbol_index_size % 2)
+  symbol_index_size += symbol_index_size % 2
+
+  offset = len(_MAGIC) + _HEADER_SIZE + symbol_index_size + len(names)
+  offsets = []
+  for member in members:
+    offsets.append(offset)
+    offset += _HEADER_SIZE
+    if not thin:
+      offset += member.size + member.size % 2
+  offsets.append(offset)
+  if offset > _MAX_OFFSET:
+    raise ArchiveError('The archive would need a 64-bit symbol index.')
+
+  index = [len(symbols).to_bytes(4, 'big')]
+  for member, member_offset in zip(members, offsets):
+    index.extend([member_offset.to_bytes(4, 'big')] * len(member.symbols))
+  prefix = b''.join([
+      _THIN_MAGIC if thin else _MAGIC,
+      _Header(b'/', symbol_index_size, mode=b'0')] + index + [strings, names])
+  return prefix, headers, offsets
+
+
+def _MemberName(path, archive_dir, thin):
+  """Returns the name ar gives to the member for the file at |path|."""
+  if not thin:
+    return os.fsencode(os.path.basename(path))
+  if os.path.isabs(path):
+    return os.fsencode(path)
+  # Like ar, resolve symbolic links before making the path relative.
+  return os.fsencode(os.path.relpath(os.path.realpath(path), archive_dir))
+
+
+def _HashFile(path, size):
+  """Returns the hex SHA-256 of the file at |path|, which has |size| bytes."""
+  import hashlib
+  h = hashlib.sha256()
+  with open(path, 'rb') as f:
+    while True:
+      data = f.read(_COPY_BUFFER_SIZE)
+      if not data:
+        break
+      h.update(data)
+      size -= len(data)
+  if size:
+    raise ArchiveError('%s changed while it was read.' % path)
+  return h.hexdigest()
+
+
+def _ReadMember(path, name, old_entry, need_digest):
+  """Returns the _Member for the file at |path|.
+
+  |old_entry| is what the previous index recorded for |path|, if anything.
+  Its symbols are reused if the file's mtime and size or, with
+  |need_digest|, its contents are unchanged.
+  """
+  st = os.stat(path)
+  version = (st.st_mtime_ns, st.st_size)
+  if old_entry is not None and old_entry[1] == version:
+    return _Member(path, name, version, old_entry[2], old_entry[3])
+  digest = None
+  if need_digest:
+    digest = _HashFile(path, st.st_size)
+    if old_entry is not None and old_entry[2] == digest:
+      return _Member(path, name, version, digest, old_entry[3])
+  try:
+    symbols = elf_toc.ReadArchiveSymbols(path)
+  except elf_toc.ElfError as e:
+    raise ArchiveError('%s: %s' % (path, e))
+  return _Member(path, name, version, digest, symbols)
+
+
+def _LoadIndex(index_path):
+  """Returns what the index at |index_path| recorded.
+
+  Returns:
+    A tuple of (thin, archive_version, entries), where |entries| holds the
+    Entry() of each member, or None if there's no usable index.
+  """
+  try:
+    with open(index_path, 'rb') as f:
+      version, thin, archive_version, entries = marshal.loads(f.read())
+  except (EnvironmentError, EOFError, ValueError, TypeError):
+    return None
+  if version != _INDEX_VERSION:
+    return None
+  return thin, archive_version, entries
+
+
+def _WriteMembers(f, members, headers, thin):
+  """Writes the headers, and for full archives the contents, of |members|."""
+  for member, header in zip(members, headers):
+    f.write(header)
+    if thin:
+      continue
+    with open(member.path, 'rb') as member_file:
+      copied = 0
+      while True:
+        data = member_file.read(_COPY_BUFFER_SIZE)
+        if not data:
+          break
+        f.write(data)
+        copied += len(data)
+    if copied != member.size:
+      raise ArchiveError('%s changed while it was archived.' % member.path)
+    if copied % 2:
+      f.write(b'\n')
+
+
+def _UnchangedMembers(old_members, members, prefix, thin):
+  """Returns how many members an archive of |old_members| has in place.
+
+  That is, how many of the leading |members| the archive already contains
+  where an archive with |prefix| would have them.
+  """
+  old_prefix, _, _ = _Layout(old_members, thin)
+  if len(old_prefix) != len(prefix):
+    return 0
+  unchanged = 0
+  for old, new in zip(old_members, members):
+    if (old.name, old.size, old.digest) != (new.name, new.size, new.digest):
+      break
+    unchanged += 1
+  return unchanged
+
+
+def _IsIdentical(old_members, members, prefix, headers, unchanged, thin):
+  """Returns whether the archive of |old_members| is the one to write.
+
+  |prefix| and |headers| are the _Layout() of |members|, the first |unchanged|
+  of which are in place.
+  """
+  if not old_members or len(old_members) != len(members):
+    return False
+  old_prefix, old_headers, _ = _Layout(old_members, thin)
+  # The contents of a thin archive are all in its prefix and headers.
+  return (old_prefix == prefix and old_headers == headers and
+          (thin or unchanged == len(members)))
+
+
+def WriteArchive(output, inputs, thin=False, incremental=False, restat=False):
+  """Writes the objects |inputs| to the archive |output| like ar would.
+
+  Args:
+    output: Path of the archive.
+    inputs: Paths of the object files, in the order of their members.
+    thin: Write a thin archive, which only refers to the objects.
+    incremental: Keep an index in |output|.index, and use it to only read the
+        objects and write the members that changed since the last call.
+    restat: With |incremental|, leave the archive alone, mtime included, if
+        it would come out the same.
+
+  Raises:
+    ArchiveError: The archive can't be written like ar would. It may be left
+        incomplete; callers should delete it and run ar.
+  """
+  archive_dir = os.path.realpath(os.path.dirname(output) or '.')
+  index_path = output + '.index'
+  old = _LoadIndex(index_path) if incremental else None
+  old_members = []
+  if old is not None:
+    old_thin, archive_version, entries = old
+    try:
+      st = os.stat(output)
+      valid = (old_thin == thin and
+               archive_version == (st.st_mtime_ns, st.st_size))
+    except OSError:
+      valid = False
+    if valid:
+      old_members = [_Member(entry[0], _MemberName(entry[0], archive_dir, thin),
+                             *entry[1:]) for entry in entries]
+  old_entries = dict((member.path, member.Entry()) for member in old_members)
+
+  # Only full archives need the contents of their members to stay the same.
+  members = [_ReadMember(path, _MemberName(path, archive_dir, thin),
+                         old_entries.get(path), incremental and not thin)
+             for path in inputs]
+  prefix, headers, offsets = _Layout(members, thin)
+
+  if incremental:
+    # A run that is interrupted halfway leaves no index to trust.
+    try:
+      os.remove(index_path)
+    except OSError:
+      pass
+  unchanged = 0
+  if old_members and not thin:
+    unchanged = _UnchangedMembers(old_members, members, prefix, thin)
+  if restat and _IsIdentical(old_members, members, prefix, headers, unchanged,
+                              thin):
+    pass  # Leave the archive, and with it its mtime, alone.
+  elif unchanged and os.stat(output).st_nlink == 1:
+    # The unchanged members keep their place; the symbol index and name
+    # table are rewritten, which also updates the mtime of the archive.
+    # Archives with other hard links are replaced instead, so that the
+    # other names keep the old archive.
+    with open(output, 'r+b') as f:
+      f.write(prefix)
+      f.seek(offsets[unchanged])
+      _WriteMembers(f, members[unchanged:], headers[unchanged:], thin)
+      f.truncate()
+  else:
+    try:
+      os.remove(output)
+    except OSError:
+      pass
+    with open(output, 'wb') as f:
+      f.write(prefix)
+      _WriteMembers(f, members, headers, thin)
+
+  if incremental:
+    st = os.stat(output)
+    try:
+      wrapper_utils.WriteFileAtomically(index_path, marshal.dumps(
+          (_INDEX_VERSION, thin, (st.st_mtime_ns, st.st_size),
+           [member.Entry() for member in members])))
+    except OSError:
+      pass  # The next run just has to read everything again.
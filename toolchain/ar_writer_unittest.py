@@ -0,0 +1,151 @@
+# Copyright 2026 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import ar_writer
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+_HAVE_TOOLS = all(shutil.which(tool) for tool in ('ar', 'gcc'))
+
+
+def _Compile(path, source, flags=()):
+  source_path = os.path.splitext(path)[0] + '.c'
+  with open(source_path, 'w') as f:
+    f.write(source)
+  subprocess.check_call(['gcc', '-fcommon', '-c', source_path, '-o', path] +
+                        list(flags))
+
+
+@unittest.skipUnless(_HAVE_TOOLS, 'needs ar and gcc')
+class ArWriterTest(unittest.TestCase):
+  def setUp(self):
+    self.root = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, self.root)
+    old_cwd = os.getcwd()
+    os.chdir(self.root)
+    self.addCleanup(os.chdir, old_cwd)
+    os.makedirs('src/deep')
+    os.makedirs('out/lib')
+    # Short and long names, one of exactly 15 characters, and the same name
+    # in different directories.
+    self.objects = {
+        'a.o': 'int a_data = 1;\nint a_func(void) { return 0; }\n',
+        'src/a.o': 'static int hidden;\nint other_a;\n',
+        'src/deep/averylongobjectname.o':
+            '__attribute__((weak)) int weak_func(void) { return 1; }\n'
+            'char padding[3] = {1};\n',
+        '123456789012.o': '__thread int tls;\nint common_data;\n',
+        'src/nothing.o': 'static int nothing;\n',
+    }
+    for path, source in self.objects.items():
+      _Compile(path, source)
+    self.output = 'out/lib/libtest.a'
+
+  def _Ar(self, inputs, operation='rcsD'):
+    reference = 'out/lib/reference.a'
+    if os.path.exists(reference):
+      os.remove(reference)
+    subprocess.check_call(['ar', operation, reference] + inputs)
+    with open(reference, 'rb') as f:
+      return f.read()
+
+  def _Read(self, path):
+    with open(path, 'rb') as f:
+      return f.read()
+
+  def _CheckArchive(self, inputs, thin=False, incremental=False, **kwargs):
+    ar_writer.WriteArchive(self.output, inputs, thin=thin,
+                           incremental=incremental, **kwargs)
+    self.assertEqual(self._Read(self.output),
+                     self._Ar(inputs, 'rcsDT' if thin else 'rcsD'))
+
+  def test_FullArchive(self):
+    self._CheckArchive(sorted(self.objects))
+    self._CheckArchive(['a.o', 'src/a.o', 'a.o'])
+    self._CheckArchive(['src/nothing.o'])
+
+  def test_ThinArchive(self):
+    self._CheckArchive(sorted(self.objects), thin=True)
+    # Consecutive members of the same name share their name table entry.
+    self._CheckArchive(['a.o', 'a.o', 'src/a.o', 'a.o'], thin=True)
+    self._CheckArchive([os.path.abspath('a.o'), '123456789012.o'], thin=True)
+
+  def test_Incremental(self):
+    inputs = sorted(self.objects)
+    self._CheckArchive(inputs, incremental=True)
+    self.assertTrue(os.path.exists(self.output + '.index'))
+    inode = os.stat(self.output).st_ino
+
+    # The last member changes, but not its symbols: the archive is updated
+    # in place.
+    _Compile(inputs[-1], 'static int nothing = 3;\n')
+    self._CheckArchive(inputs, incremental=True)
+    self.assertEqual(os.stat(self.output).st_ino, inode)
+
+    # Members are added, removed and reordered.
+    self._CheckArchive(inputs + ['a.o'], incremental=True)
+    self._CheckArchive(inputs[1:], incremental=True)
+    self._CheckArchive(list(reversed(inputs)), incremental=True)
+
+    # Touched objects with the same contents.
+    for path in inputs:
+      os.utime(path, None)
+    self._CheckArchive(list(reversed(inputs)), incremental=True)
+
+  def test_IncrementalThin(self):
+    inputs = sorted(self.objects)
+    self._CheckArchive(inputs, thin=True, incremental=True)
+    _Compile('a.o', 'int changed;\n')
+    self._CheckArchive(inputs, thin=True, incremental=True)
+    self._CheckArchive(inputs[:2], thin=True, incremental=True)
+
+  def test_IncrementalKeepsHardLinks(self):
+    inputs = sorted(self.objects)
+    ar_writer.WriteArchive(self.output, inputs, incremental=True)
+    old = self._Read(self.output)
+    os.link(self.output, 'out/copy.a')
+    # Same symbols, so that the archive could be updated in place.
+    _Compile(inputs[-1], 'static int nothing = 2;\n')
+    self._CheckArchive(inputs, incremental=True)
+    self.assertEqual(self._Read('out/copy.a'), old)
+
+  def test_Restat(self):
+    inputs = sorted(self.objects)
+    ar_writer.WriteArchive(self.output, inputs, incremental=True)
+    mtime = os.stat(self.output).st_mtime_ns
+    for path in inputs:
+      os.utime(path, None)
+    self._CheckArchive(inputs, incremental=True, restat=True)
+    self.assertEqual(os.stat(self.output).st_mtime_ns, mtime)
+
+    # A changed member is written, as the archive is compared with ar's.
+    _Compile('a.o', 'int changed;\n')
+    self._CheckArchive(inputs, incremental=True, restat=True)
+
+  def test_UnsupportedInput(self):
+    with open('not_elf.o', 'wb') as f:
+      f.write(b'\x00' * 64)
+    with self.assertRaises(ar_writer.ArchiveError):
+      ar_writer.WriteArchive(self.output, ['a.o', 'not_elf.o'])
+
+  def test_WrapperRunsArWithoutSymbolIndex(self):
+    # Without 's', ar doesn't write a symbol index, so neither may the
+    # wrapper.
+    inputs = sorted(self.objects)
+    subprocess.check_call([
+        sys.executable, os.path.join(_SCRIPT_DIR, 'gcc_ar_wrapper.py'),
+        '--incremental', '--output', self.output, '--ar', 'ar', 'rcD'] +
+        inputs)
+    self.assertEqual(self._Read(self.output), self._Ar(inputs, 'rcD'))
+    self.assertFalse(os.path.exists(self.output + '.index'))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,540 @@
+# Copyright 2026 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""A local cache of compilation results for gcc_compile_wrapper.py.
+
+Like ccache, it stores the object file, the dependencies and the diagnostics
+of each successful compile, so that compiling the same thing again only has
+to copy them back. The key of a result depends on the compiler binary, the
+command line (minus the names of its outputs and flags that only change how
+diagnostics look) and the working directory, and on the inputs in one of two
+ways:
+
+  direct: The contents of the source and of every header listed in the
+      depfile of the compile that stored the result. The headers a source
+      uses are recorded in a manifest, so a lookup only has to hash them.
+      This needs a command that writes a depfile with -MMD/-MD -MF. Like
+      ccache, the compiles run for this mode use -MD instead of -MMD, so
+      that system headers are part of the key too, and are listed in the
+      depfile.
+  preprocessor: The output of running the command with -E instead of -c. It
+      is slower, since the preprocessor runs every time, but works for any
+      command. Commands that don't write a depfile always use this mode.
+
+Both also depend on the environment variables that change what the
+preprocessor does (CPATH, SOURCE_DATE_EPOCH, ...). Like ccache, direct mode
+doesn't store compiles whose source or headers use __DATE__, __TIME__ or
+__TIMESTAMP__, since their contents don't tell what those expand to; in
+preprocessor mode, they are already expanded in what the key is made of.
+
+Results are evicted least recently used first once the cache is larger than
+its maximum size. Commands the cache can't handle (no -c, no -o, a response
+file, outputs other than the object and depfile, ...) are just run.
+
+Build with compile_cache_dir = "/path/to/cache" in args.gn to run every
+compile through the cache.
+"""
+
+import errno
+import hashlib
+import json
+import marshal
+import os
+import re
+import shutil
+import subprocess
+import sys
+
+import wrapper_utils
+
+try:
+  import fcntl
+except ImportError:
+  fcntl = None  # Statistics are updated without locking on Windows.
+
+
+CACHE_DIR_ENV = wrapper_utils.COMPILE_CACHE_DIR_ENV
+DEFAULT_MAX_SIZE = 5 * 1024 * 1024 * 1024
+MODES = wrapper_utils.COMPILE_CACHE_MODES
+
+# Changes whenever the format of manifests or results changes, or what goes
+# into their keys.
+_CACHE_VERSION = 3
+# Environment variables that change the output of the preprocessor.
+_KEY_ENVIRONMENT = ('CPATH', 'C_INCLUDE_PATH', 'CPLUS_INCLUDE_PATH',
+                    'OBJC_INCLUDE_PATH', 'SOURCE_DATE_EPOCH')
+# Macros that expand to something other than what the files that use them
+# contain.
+_TIME_MACROS_RE = re.compile(br'__(?:DATE|TIME|TIMESTAMP)__')
+_TIME_MACROS_MAX_LENGTH = len('__TIMESTAMP__')
+# Manifests remember the headers of this many results of the same command.
+_MAX_MANIFEST_ENTRIES = 16
+# Compiles with more diagnostics than this aren't stored.
+_MAX_STDERR_SIZE = 1024 * 1024
+# Eviction removes results until the cache is this fraction of its maximum
+# size, so that it doesn't have to run again after the next store.
+_EVICTION_TARGET = 0.9
+_STATS_FILE = 'stats.json'
+_LOCK_FILE = 'lock'
+_STAT_NAMES = ('direct_hits', 'preprocessor_hits', 'misses', 'uncacheable',
+               'evictions', 'files', 'size')
+
+# Flags whose value is an output file or that only affect diagnostics; they
+# don't go into the key.
+_OUTPUT_FLAGS_WITH_VALUE = ('-o', '-MF')
+_IGNORED_FLAGS = ('-fcolor-diagnostics', '-fno-color-diagnostics',
+                  '-fdiagnostics-color', '-fno-diagnostics-color',
+                  '-fansi-escape-codes')
+_IGNORED_FLAG_PREFIXES = ('-fdiagnostics-color=',)
+# Flags that make the compiler write other files, change the form of its
+# output or read files that the depfile doesn't list.
+_UNCACHEABLE_FLAGS = ('-E', '-S', '-M', '-MM', '-MT', '-MQ', '-MP',
+                      '--coverage', '-ftest-coverage', '-gsplit-dwarf', '-')
+_UNCACHEABLE_FLAG_PREFIXES = ('@', '-save-temps', '-fdump-', '-fprofile-use',
+                              '-fprofile-instr-use', '-fprofile-sample-use',
+                              '-fsanitize-blacklist', '-fsanitize-ignorelist',
+                              '-fcrash-diagnostics-dir', '-ftime-trace')
+# Programs that run the compiler given as their first argument.
+_LAUNCHERS = ('ccache', 'distcc', 'gomacc', 'sccache')
+
+
+class UnsupportedCommand(Exception):
+  """The command can't be cached (or run elsewhere, see remote_exec.py)."""
+
+
+def _Hash(*parts):
+  """Returns the hex digest of a sequence of strings and bytes."""
+  h = hashlib.sha256()
+  for part in parts:
+    if not isinstance(part, bytes):
+      part = str(part).encode('utf-8', 'surrogateescape')
+    h.update(b'%d:' % len(part))
+    h.update(part)
+  return h.hexdigest()
+
+
+def _HashFile(path):
+  """Returns the digest of the file at |path|, and whether it uses __DATE__,
+  __TIME__ or __TIMESTAMP__."""
+  h = hashlib.sha256()
+  uses_time_macros = False
+  tail = b''
+  with open(path, 'rb') as f:
+    for block in iter(lambda: f.read(1024 * 1024), b''):
+      h.update(block)
+      if not uses_time_macros:
+        uses_time_macros = bool(_TIME_MACROS_RE.search(tail + block))
+        tail = block[-(_TIME_MACROS_MAX_LENGTH - 1):]
+  return h.hexdigest(), uses_time_macros
+
+
+def _FileIdentity(path):
+  """Identifies an executable the way ccache does by default."""
+  st = os.stat(path)
+  return '%s:%d:%d' % (os.path.realpath(path), st.st_size, st.st_mtime_ns)
+
+
+def _FindExecutable(name):
+  if os.path.dirname(name):
+    return name if os.path.isfile(name) else None
+  return shutil.which(name)
+
+
+def _ParseDepfile(text, target):
+  """Returns the dependencies listed by a gcc depfile for |target|.
+
+  Raises:
+    UnsupportedCommand if the depfile isn't for |target| or uses escapes (e.g.
+    for paths with spaces) that aren't supported.
+  """
+  if not text.startswith(target + ':'):
+    raise UnsupportedCommand()
+  deps = text[len(target) + 1:].replace('\\\n', ' ')
+  if '\\' in deps or '$' in deps or ':' in deps:
+    raise UnsupportedCommand()
+  return deps.split()
+
+
+def _WriteDepfile(path, target, deps):
+  wrapper_utils.WriteFileAtomically(
+      path, ('%s: %s\n' % (target, ' \\\n  '.join(deps))).encode(
+          'utf-8', 'surrogateescape'))
+
+
+class CompileCommand(object):
+  """The parts of a compile command that matter to the cache."""
+
+  def __init__(self, command):
+    self.command = command
+    compiler = _FindExecutable(command[0])
+    if compiler is None:
+      raise UnsupportedCommand()
+    self.compiler_identity = [_FileIdentity(compiler)]
+    args = command[1:]
+    if os.path.basename(compiler) in _LAUNCHERS and args:
+      launched = _FindExecutable(args[0])
+      if launched is None:
+        raise UnsupportedCommand()
+      self.compiler_identity.append(_FileIdentity(launched))
+      args = args[1:]
+
+    self.output = None
+    self.depfile = None
+    self.source = None
+    # -MD or -MMD, whichever the command uses.
+    self.depfile_flag = None
+    # The compiler (and its launcher, if any).
+    self.prefix = command[:len(command) - len(args)]
+    # The arguments other than -c, -o, -MMD/-MD and -MF and their values.
+    self.flags = []
+    self.key_args = []
+    i = 0
+    while i < len(args):
+      arg = args[i]
+      if arg in _UNCACHEABLE_FLAGS or \
+         arg.startswith(_UNCACHEABLE_FLAG_PREFIXES):
+        raise UnsupportedCommand()
+      if arg in _OUTPUT_FLAGS_WITH_VALUE:
+        if i + 1 == len(args):
+          raise UnsupportedCommand()
+        value = args[i + 1]
+        if arg == '-o' and self.output is None:
+          self.output = value
+        elif arg == '-MF' and self.depfile is None:
+          self.depfile = value
+        else:
+          raise UnsupportedCommand()
+        self.key_args.append(arg)
+        i += 2
+        continue
+      if arg == '-c':
+        # GN puts the source right after -c.
+        if i + 1 == len(args) or args[i + 1].startswith('-') or \
+           self.source is not None:
+          raise UnsupportedCommand()
+        self.source = args[i + 1]
+        self.key_args += [arg, self.source]
+        i += 2
+        continue
+      if arg in ('-MMD', '-MD'):
+        self.depfile_flag = arg
+      else:
+        self.flags.append(arg)
+      if arg not in _IGNORED_FLAGS and \
+         not arg.startswith(_IGNORED_FLAG_PREFIXES):
+        self.key_args.append(arg)
+      i += 1
+    if self.output is None or self.source is None:
+      raise UnsupportedCommand()
+    # The command to run to preprocess the source instead of compiling it.
+    self.preprocess_command = self.prefix + self.flags + ['-E', self.source]
+    # The command to run in direct mode, whose depfile must also list the
+    # system headers.
+    self.direct_command = ['-MD' if arg == '-MMD' else arg for arg in command]
+
+  def Key(self, *inputs):
+    environment = ['%s=%s' % (name, os.environ[name])
+                   for name in _KEY_ENVIRONMENT if name in os.environ]
+    return _Hash(_CACHE_VERSION, os.getcwd(),
+                 *(self.compiler_identity + environment + self.key_args +
+                   list(inputs)))
+
+
+class _StderrRecorder(object):
+  """Keeps the stderr of a compile, up to _MAX_STDERR_SIZE bytes of it."""
+
+  def __init__(self, scanner):
+    self._scanner = scanner
+    self._pieces = []
+    self._size = 0
+
+  def Feed(self, piece):
+    if self._pieces is not None:
+      self._size += len(piece)
+      if self._size <= _MAX_STDERR_SIZE:
+        self._pieces.append(piece)
+      else:
+        self._pieces = None
+    if self._scanner is not None:
+      self._scanner.Feed(piece)
+
+  def Close(self):
+    if self._scanner is not None:
+      self._scanner.Close()
+
+  def Result(self):
+    """Returns the stderr, or None if it was too long to keep."""
+    return None if self._pieces is None else b''.join(self._pieces)
+
+
+class CompileCache(object):
+  """A directory of compilation results.
+
+  It contains
+    manifests/: For each command and source, the headers of the compiles
+        stored from it (direct mode).
+    results/: The output of each compile.
+    stats.json: Counts of hits and misses, and the size of the cache.
+  """
+
+  def __init__(self, cache_dir, max_size=DEFAULT_MAX_SIZE, backend=None):
+    """Initializes the cache.
+
+    Args:
+      cache_dir: The directory to store results in.
+      max_size: The size in bytes above which results are evicted.
+      backend: Optional remote_exec.ExecutionBackend to run compiles on.
+    """
+    self._cache_dir = cache_dir
+    self._max_size = max_size
+    self._backend = backend
+    # The digest of each file hashed so far, and whether it uses __DATE__,
+    # __TIME__ or __TIMESTAMP__, keyed by path.
+    self._file_digests = {}
+
+  def Compile(self, command, mode='direct', scanner=None):
+    """Runs the compile |command|, or restores its outputs from the cache.
+
+    Diagnostics are written to stderr in both cases.
+
+    Args:
+      command: A list containing the compiler and its arguments.
+      mode: One of MODES. Commands without a depfile use preprocessor mode.
+      scanner: Optional wrapper_utils.ResourceIdScanner to feed the
+          diagnostics to.
+
+    Returns:
+      The return code of the compile.
+    """
+    try:
+      parsed = CompileCommand(command)
+    except (UnsupportedCommand, OSError):
+      self._UpdateStats(uncacheable=1)
+      return self._Run(command, scanner)
+
+    if parsed.depfile is None:
+      mode = 'preprocessor'
+    manifest_path = None
+    source_digest = None
+    if mode == 'direct':
+      try:
+        source_digest = self._DigestFile(parsed.source)
+      except EnvironmentError:
+        self._UpdateStats(uncacheable=1)
+        return self._Run(command, scanner)
+      manifest_path = self._Path('manifests',
+                                 parsed.Key('manifest', source_digest))
+      result_key = self._LookUpManifest(manifest_path)
+    else:
+      preprocessed = subprocess.Popen(
+          parsed.preprocess_command, stdout=subprocess.PIPE,
+          stderr=subprocess.DEVNULL)
+      output = preprocessed.communicate()[0]
+      if preprocessed.returncode:
+        # Let the compiler report the errors.
+        self._UpdateStats(uncacheable=1)
+        return self._Run(command, scanner)
+      result_key = parsed.Key('preprocessor',
+                              hashlib.sha256(output).hexdigest())
+
+    if result_key is not None and self._Restore(parsed, result_key, scanner):
+      self._UpdateStats(**{mode + '_hits': 1})
+      return 0
+
+    recorder = _StderrRecorder(scanner)
+    if mode == 'direct':
+      command = parsed.direct_command
+    returncode = self._Run(command, recorder)
+    stderr = recorder.Result()
+    if returncode or stderr is None:
+      self._UpdateStats(misses=1)
+      return returncode
+    try:
+      self._Store(parsed, result_key, manifest_path, source_digest, stderr)
+    except (UnsupportedCommand, EnvironmentError, ValueError):
+      self._UpdateStats(misses=1)
+    return returncode
+
+  def FormatStats(self):
+    """Returns a report of the statistics of the cache."""
+    stats = self._ReadStats()
+    lookups = sum(stats[name] for name in
+                  ('direct_hits', 'preprocessor_hits', 'misses'))
+    hits = stats['direct_hits'] + stats['preprocessor_hits']
+    lines = [
+        'cache directory       %s' % os.path.abspath(self._cache_dir),
+        'direct hits           %d' % stats['direct_hits'],
+        'preprocessor hits     %d' % stats['preprocessor_hits'],
+        'misses                %d' % stats['misses'],
+        'hit rate              %.1f %%' % (100.0 * hits / max(lookups, 1)),
+        'uncacheable commands  %d' % stats['uncacheable'],
+        'evicted results       %d' % stats['evictions'],
+        'files in cache        %d' % stats['files'],
+        'cache size            %.1f MB' % (stats['size'] / 1048576.0),
+        'max cache size        %.1f MB' % (self._max_size / 1048576.0),
+    ]
+    return '\n'.join(lines)
+
+  def _Run(self, command, scanner):
+    if self._backend is not None:
+      return self._backend.RunCompile(command, scanner=scanner)
+    return wrapper_utils.StreamCommandStderr(command, scanner=scanner)
+
+  def _Path(self, kind, key):
+    return os.path.join(self._cache_dir, kind, key[:2], key[2:])
+
+  def _HashFile(self, path):
+    hashed = self._file_digests.get(path)
+    if hashed is None:
+      hashed = self._file_digests[path] = _HashFile(path)
+    return hashed
+
+  def _DigestFile(self, path):
+    return self._HashFile(path)[0]
+
+  def _Load(self, path):
+    """Returns the object stored at |path|, or None if there isn't one.
+
+    Reading an entry marks it as recently used.
+    """
+    try:
+      with open(path, 'rb') as f:
+        version, value = marshal.loads(f.read())
+      os.utime(path, None)
+    except (EnvironmentError, EOFError, ValueError, TypeError):
+      return None
+    return value if version == _CACHE_VERSION else None
+
+  def _Save(self, path, value):
+    """Stores |value| at |path| and returns the change in the cache size."""
+    data = marshal.dumps((_CACHE_VERSION, value))
+    try:
+      old_size = os.path.getsize(path)
+    except OSError:
+      old_size = None
+    wrapper_utils.WriteFileAtomically(path, data)
+    if old_size is None:
+      return 1, len(data)
+    return 0, len(data) - old_size
+
+  def _LookUpManifest(self, manifest_path):
+    """Returns the key of a result whose headers are unchanged, if any."""
+    for includes, result_key in self._Load(manifest_path) or ():
+      try:
+        if all(self._DigestFile(path) == digest for path, digest in includes):
+          return result_key
+      except EnvironmentError:
+        pass  # A header was removed.
+    return None
+
+  def _Restore(self, parsed, result_key, scanner):
+    """Writes the outputs of the result |result_key|, if it's in the cache."""
+    result = self._Load(self._Path('results', result_key))
+    if result is None:
+      return False
+    obj, deps, stderr = result
+    wrapper_utils.WriteFileAtomically(parsed.output, obj)
+    if parsed.depfile is not None:
+      _WriteDepfile(parsed.depfile, parsed.output, deps)
+    if stderr:
+      sys.stderr.buffer.write(stderr)
+      sys.stderr.buffer.flush()
+    if scanner is not None:
+      for line in stderr.splitlines(True):
+        scanner.Feed(line)
+      scanner.Close()
+    return True
+
+  def _Store(self, parsed, result_key, manifest_path, source_digest, stderr):
+    """Stores the outputs of the compile that just succeeded.
+
+    In direct mode (when |manifest_path| is given), |result_key| is None and
+    the key is made from the paths and contents of the headers listed in the
+    depfile, and |source_digest| is that of the source when the compile
+    started.
+    """
+    deps = []
+    if parsed.depfile is not None:
+      with open(parsed.depfile, 'r') as f:
+        deps = _ParseDepfile(f.read(), parsed.output)
+    with open(parsed.output, 'rb') as f:
+      obj = f.read()
+
+    files = size = 0
+    if manifest_path is not None:
+      # Hash the headers after the compile, so that one that changed while it
+      # ran can only cause misses.
+      self._file_digests.clear()
+      if self._DigestFile(parsed.source) != source_digest:
+        raise UnsupportedCommand()
+      includes = tuple((path, self._DigestFile(path)) for path in deps)
+      if any(self._HashFile(path)[1] for path in [parsed.source] + deps):
+        raise UnsupportedCommand()
+      # The paths go into the key too, since they end up in the depfile.
+      result_key = parsed.Key('direct', *[part for include in includes
+                                          for part in include])
+      entries = [(includes, result_key)]
+      entries += [entry for entry in self._Load(manifest_path) or ()
+                  if entry[0] != includes][:_MAX_MANIFEST_ENTRIES - 1]
+      added_files, added_size = self._Save(manifest_path, tuple(entries))
+      files += added_files
+      size += added_size
+    added_files, added_size = self._Save(self._Path('results', result_key),
+                                         (obj, tuple(deps), stderr))
+    self._UpdateStats(misses=1, files=files + added_files,
+                      size=size + added_size)
+
+  def _ReadStats(self):
+    try:
+      with open(os.path.join(self._cache_dir, _STATS_FILE)) as f:
+        stats = json.load(f)
+    except (EnvironmentError, ValueError):
+      stats = {}
+    return dict((name, stats.get(name, 0)) for name in _STAT_NAMES)
+
+  def _UpdateStats(self, **changes):
+    """Adds |changes| to the statistics and evicts results if needed."""
+    if not os.path.isdir(self._cache_dir):
+      os.makedirs(self._cache_dir)
+    with open(os.path.join(self._cache_dir, _LOCK_FILE), 'a') as lock:
+      if fcntl:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+      stats = self._ReadStats()
+      for name, change in changes.items():
+        stats[name] += change
+      if stats['size'] > self._max_size:
+        self._Evict(stats)
+      wrapper_utils.WriteFileAtomically(
+          os.path.join(self._cache_dir, _STATS_FILE),
+          json.dumps(stats, indent=2, sort_keys=True).encode('utf-8'))
+
+  def _Evict(self, stats):
+    """Removes the least recently used entries until the cache is small
+    enough. Also recounts its files and size."""
+    entries = []
+    for kind in ('manifests', 'results'):
+      for root, _, names in os.walk(os.path.join(self._cache_dir, kind)):
+        for name in names:
+          path = os.path.join(root, name)
+          try:
+            st = os.stat(path)
+          except OSError:
+            continue
+          entries.append((st.st_mtime, st.st_size, path))
+    entries.sort()
+    size = sum(entry[1] for entry in entries)
+    files = len(entries)
+    for _, entry_size, path in entries:
+      if size <= self._max_size * _EVICTION_TARGET:
+        break
+      try:
+        os.unlink(path)
+      except OSError as e:
+        if e.errno != errno.ENOENT:
+          raise
+      size -= entry_size
+      files -= 1
+      stats['evictions'] += 1
+    stats['files'] = files
+    stats['size'] = size
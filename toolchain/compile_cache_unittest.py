@@ -0,0 +1,291 @@
+# Copyright 2026 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import compile_cache
+
+# A compiler that "compiles" a source by concatenating it with the headers it
+# includes from -I (#include "x") and -isystem (#include <x>) directories.
+# Like gcc, it only lists system headers in the depfile with -MD. Each run
+# is logged to $FAKE_CC_LOG.
+_FAKE_COMPILER = '''\
+import os
+import sys
+
+args = sys.argv[1:]
+output = depfile = source = None
+include_dirs = []
+system_dirs = []
+all_deps = preprocess = False
+i = 0
+while i < len(args):
+  arg = args[i]
+  if arg in ('-o', '-MF', '-c'):
+    if arg == '-o':
+      output = args[i + 1]
+    elif arg == '-MF':
+      depfile = args[i + 1]
+    else:
+      source = args[i + 1]
+    i += 2
+    continue
+  if arg == '-MD':
+    all_deps = True
+  elif arg == '-E':
+    preprocess = True
+  elif arg.startswith('-isystem'):
+    system_dirs.append(arg[len('-isystem'):])
+  elif arg.startswith('-I'):
+    include_dirs.append(arg[2:])
+  elif not arg.startswith('-'):
+    source = arg
+  i += 1
+
+with open(os.environ['FAKE_CC_LOG'], 'a') as log:
+  log.write(' '.join(sys.argv[1:]) + '\\n')
+
+deps = [source]
+text = ''
+with open(source) as f:
+  for line in f:
+    if line.startswith('#include'):
+      name = line.split()[1]
+      dirs = include_dirs if name[0] == '"' else system_dirs
+      for directory in dirs:
+        path = os.path.join(directory, name[1:-1])
+        if os.path.exists(path):
+          break
+      else:
+        sys.stderr.write('%s not found\\n' % name)
+        sys.exit(1)
+      if name[0] == '"' or all_deps:
+        deps.append(path)
+      with open(path) as header:
+        text += header.read()
+    else:
+      text += line
+if 'warn' in text:
+  sys.stderr.write('warning: warn\\n')
+
+if preprocess:
+  sys.stdout.write(text)
+  sys.exit(0)
+with open(output, 'w') as f:
+  f.write('object of ' + text)
+if depfile:
+  with open(depfile, 'w') as f:
+    f.write('%s: %s\\n' % (output, ' '.join(deps)))
+'''
+
+
+class CompileCacheTest(unittest.TestCase):
+  def setUp(self):
+    self.root = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, self.root)
+    old_cwd = os.getcwd()
+    os.chdir(self.root)
+    self.addCleanup(os.chdir, old_cwd)
+
+    self.compiler = os.path.join(self.root, 'cc')
+    with open(self.compiler, 'w') as f:
+      f.write('#!%s\n%s' % (sys.executable, _FAKE_COMPILER))
+    os.chmod(self.compiler, 0o755)
+    environ = mock.patch.dict(os.environ,
+                              {'FAKE_CC_LOG': os.path.join(self.root, 'log')})
+    environ.start()
+    self.addCleanup(environ.stop)
+    # Keep the compiler's diagnostics out of the test output.
+    self.stderr = tempfile.TemporaryFile()
+    self.addCleanup(self.stderr.close)
+    stderr = mock.patch.object(sys, 'stderr',
+                               mock.Mock(buffer=self.stderr))
+    stderr.start()
+    self.addCleanup(stderr.stop)
+
+    os.makedirs('include')
+    os.makedirs('other')
+    os.makedirs('system')
+    self._Write('a.c', '#include "a.h"\n#include <sys.h>\nint a;\n')
+    self._Write('include/a.h', 'int h;\n')
+    self._Write('system/sys.h', 'int s;\n')
+    self.cache_dir = os.path.join(self.root, 'cache')
+
+  def _Write(self, path, contents):
+    with open(path, 'w') as f:
+      f.write(contents)
+
+  def _Read(self, path):
+    with open(path) as f:
+      return f.read()
+
+  def _Runs(self):
+    try:
+      return self._Read('log').splitlines()
+    except IOError:
+      return []
+
+  def _Command(self, source='a.c', output='a.o', extra_flags=()):
+    return [self.compiler, '-MMD', '-MF', output + '.d', '-Iinclude',
+            '-Iother', '-isystemsystem'] + list(extra_flags) + [
+                '-c', source, '-o', output]
+
+  def _Compile(self, mode='direct', max_size=compile_cache.DEFAULT_MAX_SIZE,
+               **kwargs):
+    cache = compile_cache.CompileCache(self.cache_dir, max_size)
+    return cache.Compile(self._Command(**kwargs), mode)
+
+  def _Deps(self, depfile):
+    return self._Read(depfile).replace('\\\n', ' ').split()
+
+  def _Stats(self):
+    with open(os.path.join(self.cache_dir, 'stats.json')) as f:
+      return json.load(f)
+
+  def test_MissThenHit(self):
+    self.assertEqual(self._Compile(), 0)
+    self.assertEqual(len(self._Runs()), 1)
+    self.assertEqual(self._Read('a.o'), 'object of int h;\nint s;\nint a;\n')
+    os.remove('a.o')
+    os.remove('a.o.d')
+
+    self.assertEqual(self._Compile(), 0)
+    self.assertEqual(len(self._Runs()), 1)
+    self.assertEqual(self._Read('a.o'), 'object of int h;\nint s;\nint a;\n')
+    self.assertEqual(self._Deps('a.o.d'),
+                     ['a.o:', 'a.c', 'include/a.h', 'system/sys.h'])
+    stats = self._Stats()
+    self.assertEqual(stats['misses'], 1)
+    self.assertEqual(stats['direct_hits'], 1)
+
+  def test_DiagnosticsAreReplayed(self):
+    self._Write('a.c', 'warn\n')
+    self._Compile()
+    self._Compile()
+    self.assertEqual(len(self._Runs()), 1)
+    self.stderr.seek(0)
+    self.assertEqual(self.stderr.read(), b'warning: warn\n' * 2)
+
+  def test_DirectModeListsSystemHeaders(self):
+    self._Compile()
+    self.assertIn('-MD', self._Runs()[0].split())
+    self.assertNotIn('-MMD', self._Runs()[0].split())
+    self.assertIn('system/sys.h', self._Read('a.o.d'))
+
+  def test_ChangedHeaderMisses(self):
+    self._Compile()
+    self._Write('include/a.h', 'int changed;\n')
+    self._Compile()
+    self.assertEqual(len(self._Runs()), 2)
+    self.assertEqual(self._Read('a.o'),
+                     'object of int changed;\nint s;\nint a;\n')
+
+    # The manifest remembers both versions of the header.
+    self._Write('include/a.h', 'int h;\n')
+    self._Compile()
+    self.assertEqual(len(self._Runs()), 2)
+    self.assertEqual(self._Read('a.o'), 'object of int h;\nint s;\nint a;\n')
+    self.assertEqual(self._Stats()['direct_hits'], 1)
+
+  def test_ChangedSystemHeaderMisses(self):
+    self._Compile()
+    self._Write('system/sys.h', 'int updated;\n')
+    self._Compile()
+    self.assertEqual(len(self._Runs()), 2)
+    self.assertEqual(self._Read('a.o'),
+                     'object of int h;\nint updated;\nint a;\n')
+
+  def test_MovedHeaderMisses(self):
+    self._Compile()
+    # The same header found at another path must not restore a depfile
+    # listing the old path.
+    os.rename('include/a.h', 'other/a.h')
+    self._Compile()
+    self.assertEqual(len(self._Runs()), 2)
+    self.assertEqual(self._Deps('a.o.d'),
+                     ['a.o:', 'a.c', 'other/a.h', 'system/sys.h'])
+
+    os.rename('other/a.h', 'include/a.h')
+    self._Compile()
+    self.assertEqual(len(self._Runs()), 2)
+    self.assertEqual(self._Deps('a.o.d'),
+                     ['a.o:', 'a.c', 'include/a.h', 'system/sys.h'])
+
+  def test_PreprocessorMode(self):
+    self._Compile(mode='preprocessor')
+    self.assertEqual(len(self._Runs()), 2)  # Preprocessing and compiling.
+    self._Compile(mode='preprocessor')
+    self.assertEqual(len(self._Runs()), 3)  # Only preprocessing.
+    self.assertEqual(self._Stats()['preprocessor_hits'], 1)
+
+    self._Write('system/sys.h', 'int updated;\n')
+    self._Compile(mode='preprocessor')
+    self.assertEqual(len(self._Runs()), 5)
+    self.assertEqual(self._Read('a.o'),
+                     'object of int h;\nint updated;\nint a;\n')
+
+  def test_FailedCompilesAreNotStored(self):
+    self._Write('a.c', '#include "missing.h"\n')
+    self.assertEqual(self._Compile(), 1)
+    self.assertEqual(self._Compile(), 1)
+    self.assertEqual(len(self._Runs()), 2)
+    self.assertEqual(self._Stats()['misses'], 2)
+
+  def test_UncacheableCommand(self):
+    self.assertEqual(self._Compile(extra_flags=['-save-temps']), 0)
+    self.assertEqual(self._Compile(extra_flags=['-save-temps']), 0)
+    self.assertEqual(len(self._Runs()), 2)
+    self.assertEqual(self._Stats()['uncacheable'], 2)
+
+  def test_TimeMacrosAreNotStored(self):
+    self._Write('include/a.h', 'const char *built = __DATE__;\n')
+    self._Compile()
+    self._Compile()
+    self.assertEqual(len(self._Runs()), 2)
+    self.assertEqual(self._Stats()['direct_hits'], 0)
+
+  def test_TimeMacrosAcrossBlocks(self):
+    self._Write('big.h', ' ' * (1024 * 1024 - 5) + '__TIMESTAMP__\n')
+    self.assertTrue(compile_cache._HashFile('big.h')[1])
+    self._Write('big.h', ' ' * (1024 * 1024 - 5) + '__TIMESTAMPS\n')
+    self.assertFalse(compile_cache._HashFile('big.h')[1])
+
+  def test_ChangedEnvironmentMisses(self):
+    self._Compile()
+    with mock.patch.dict(os.environ, {'CPATH': 'other'}):
+      self._Compile()
+    self.assertEqual(len(self._Runs()), 2)
+    with mock.patch.dict(os.environ, {'SOURCE_DATE_EPOCH': '0'}):
+      self._Compile(mode='preprocessor')
+    self.assertEqual(len(self._Runs()), 4)
+
+  def test_Eviction(self):
+    for i in range(10):
+      self._Write('s%d.c' % i, 'int source_%d;\n' % i + 'x' * 1000)
+    self._Compile(source='s0.c', output='s0.o')
+    entry_size = self._Stats()['size']
+    max_size = entry_size * 4
+    for i in range(10):
+      self._Compile(source='s%d.c' % i, output='s%d.o' % i,
+                    max_size=max_size)
+    stats = self._Stats()
+    self.assertGreater(stats['evictions'], 0)
+    self.assertLessEqual(stats['size'], max_size)
+    self.assertEqual(len(self._Runs()), 10)
+
+    # The most recent results are still there, the oldest ones are gone.
+    self._Compile(source='s9.c', output='s9.o', max_size=max_size)
+    self.assertEqual(len(self._Runs()), 10)
+    self._Compile(source='s0.c', output='s0.o', max_size=max_size)
+    self.assertEqual(len(self._Runs()), 11)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,496 @@
+# Copyright 2026 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Reads the parts of an ELF shared object that make up its .TOC file.
+
+gcc_solink_wrapper.py used to run readelf and nm to get the SONAME and the
+exported dynamic symbols of a library. The functions here read both directly
+from the file, and format them exactly like
+
+  readelf -d $sofile | grep SONAME
+  nm --format=posix -g -D $sofile | cut -f1-2 -d' '
+
+do with GNU binutils. It also reads the symbols ar lists in the symbol
+index of a static library, for ar_writer.py. Files this module can't handle
+the same way (other architectures, unusual section layouts, corrupt files)
+raise ElfError, so that callers can fall back to running the tools.
+"""
+
+import locale
+import mmap
+import struct
+
+
+class ElfError(Exception):
+  """The file can't be read the way readelf and nm would read it."""
+
+
+# The .TOC is text, but the names in it are bytes. Decoding them, and the
+# output of the tools, like this, and encoding the .TOC the same way, gives
+# back their exact bytes whatever the locale.
+TOC_ENCODING = 'utf-8'
+TOC_ERRORS = 'surrogateescape'
+
+
+# Machines whose symbols binutils classifies without target-specific rules
+# (e.g. small data sections), so the generic rules below match nm's output.
+_EM_386 = 3
+_EM_ARM = 40
+_EM_X86_64 = 62
+_EM_AARCH64 = 183
+_SUPPORTED_MACHINES = (_EM_386, _EM_ARM, _EM_X86_64, _EM_AARCH64)
+
+_ET_REL = 1
+
+_SHT_PROGBITS = 1
+_SHT_SYMTAB = 2
+_SHT_DYNAMIC = 6
+_SHT_NOTE = 7
+_SHT_NOBITS = 8
+_SHT_DYNSYM = 11
+_SHT_INIT_ARRAY = 14
+_SHT_FINI_ARRAY = 15
+_SHT_PREINIT_ARRAY = 16
+_SHT_GNU_VERDEF = 0x6ffffffd
+_SHT_GNU_VERNEED = 0x6ffffffe
+_SHT_GNU_VERSYM = 0x6fffffff
+# Types of sections symbols can be defined in. binutils doesn't create
+# sections for some of the others, which changes how it reports symbols.
+_SYMBOL_SECTION_TYPES = (_SHT_PROGBITS, _SHT_DYNAMIC, _SHT_NOTE, _SHT_NOBITS,
+                         _SHT_INIT_ARRAY, _SHT_FINI_ARRAY, _SHT_PREINIT_ARRAY)
+
+_SHF_WRITE = 0x1
+_SHF_ALLOC = 0x2
+_SHF_EXECINSTR = 0x4
+
+_SHN_UNDEF = 0
+_SHN_LORESERVE = 0xff00
+_SHN_X86_64_LCOMMON = 0xff02
+_SHN_ABS = 0xfff1
+_SHN_COMMON = 0xfff2
+_SHN_XINDEX = 0xffff
+
+_STB_LOCAL = 0
+_STB_GLOBAL = 1
+_STB_WEAK = 2
+_STB_GNU_UNIQUE = 10
+
+_STT_OBJECT = 1
+_STT_SECTION = 3
+_STT_FILE = 4
+_STT_COMMON = 5
+_STT_GNU_IFUNC = 10
+
+_DT_NULL = 0
+_DT_NEEDED = 1
+_DT_SONAME = 14
+_DT_RPATH = 15
+_DT_RUNPATH = 29
+
+_VER_FLG_BASE = 0x1
+_VERSYM_HIDDEN = 0x8000
+_VERSYM_VERSION = 0x7fff
+
+# Formats of the ELF structures, by ELF class. The byte order is prepended.
+_FORMATS = {
+    # ELFCLASS32
+    1: {
+        'ehdr': 'HHIIIIIHHHHHH',
+        'shdr': 'IIIIIIIIII',
+        'sym': 'IIIBBH',
+        'dyn': 'iI',
+    },
+    # ELFCLASS64
+    2: {
+        'ehdr': 'HHIQQQIHHHHHH',
+        'shdr': 'IIQQQQIIQQ',
+        'sym': 'IBBHQQ',
+        'dyn': 'qQ',
+    },
+}
+
+
+class _Section(object):
+  def __init__(self, fields):
+    (self.name, self.type, self.flags, _, self.offset, self.size, self.link,
+     self.info, _, self.entsize) = fields
+
+
+class _ElfFile(object):
+  """The section headers and dynamic symbols of an ELF file in memory."""
+
+  def __init__(self, data):
+    self.data = data
+    if data[:4] != b'\x7fELF':
+      raise ElfError('Not an ELF file.')
+    elf_class, byte_order = struct.unpack_from('BB', data, 4)
+    if elf_class not in _FORMATS or byte_order not in (1, 2):
+      raise ElfError('Unknown ELF class or byte order.')
+    self.is_64 = elf_class == 2
+    prefix = '<' if byte_order == 1 else '>'
+    self.structs = dict(
+        (name, struct.Struct(prefix + fmt))
+        for name, fmt in _FORMATS[elf_class].items())
+    self.structs['half'] = struct.Struct(prefix + 'H')
+    self.structs['verdef'] = struct.Struct(prefix + 'HHHHIII')
+    self.structs['verdaux'] = struct.Struct(prefix + 'II')
+    self.structs['verneed'] = struct.Struct(prefix + 'HHIII')
+    self.structs['vernaux'] = struct.Struct(prefix + 'IHHII')
+
+    ehdr = self._Unpack('ehdr', 16)
+    self.type = ehdr[0]
+    self.machine = ehdr[1]
+    shoff, shentsize, shnum, shstrndx = ehdr[5], ehdr[10], ehdr[11], ehdr[12]
+    if not shoff:
+      raise ElfError('No section headers.')
+    if shentsize != self.structs['shdr'].size:
+      raise ElfError('Unexpected section header size.')
+    first = _Section(self._Unpack('shdr', shoff))
+    # Section counts and indices that don't fit into the ELF header are kept
+    # in the first section header instead.
+    if shnum == 0:
+      shnum = first.size
+    if shstrndx == _SHN_XINDEX:
+      shstrndx = first.link
+    self.sections = [first] + [
+        _Section(self._Unpack('shdr', shoff + i * shentsize))
+        for i in range(1, shnum)]
+    if shstrndx >= shnum:
+      raise ElfError('Invalid section name string table index.')
+    self.section_names = self.sections[shstrndx]
+
+  def _Unpack(self, name, offset):
+    try:
+      return self.structs[name].unpack_from(self.data, offset)
+    except struct.error:
+      raise ElfError('Truncated file.')
+
+  def String(self, section, offset):
+    """Returns the NUL-terminated string at |offset| in |section|."""
+    if offset >= section.size:
+      raise ElfError('Invalid string table offset.')
+    start = section.offset + offset
+    end = self.data.find(b'\0', start, section.offset + section.size)
+    if end < 0:
+      raise ElfError('Unterminated string.')
+    return self.data[start:end]
+
+  def SectionName(self, section):
+    return self.String(self.section_names, section.name)
+
+  def FindSection(self, section_type):
+    for section in self.sections:
+      if section.type == section_type:
+        return section
+    return None
+
+  def Link(self, section):
+    if not 0 < section.link < len(self.sections):
+      raise ElfError('Invalid section link.')
+    return self.sections[section.link]
+
+  def Entries(self, section, name):
+    """Yields the entries of |section|, which are |name| structs."""
+    entry_struct = self.structs[name]
+    if section.type == _SHT_NOBITS:
+      raise ElfError('Section has no contents.')
+    if section.offset + section.size > len(self.data):
+      raise ElfError('Truncated file.')
+    for offset in range(section.offset, section.offset + section.size -
+                        entry_struct.size + 1, entry_struct.size):
+      yield entry_struct.unpack_from(self.data, offset)
+
+  def DynamicStrings(self):
+    """Yields (tag, string) for each dynamic entry whose value is a string."""
+    dynamic = self.FindSection(_SHT_DYNAMIC)
+    if dynamic is None:
+      return
+    strtab = self.Link(dynamic)
+    for tag, value in self.Entries(dynamic, 'dyn'):
+      if tag == _DT_NULL:
+        break
+      if tag in (_DT_NEEDED, _DT_SONAME, _DT_RPATH, _DT_RUNPATH):
+        yield tag, self.String(strtab, value)
+
+  def VersionDefinitions(self):
+    """Returns a list of version names, indexed by version number - 1.
+
+    Also returns whether the first version is the base version, i.e. the
+    one named after the file.
+    """
+    verdef = self.FindSection(_SHT_GNU_VERDEF)
+    if verdef is None:
+      return [], False
+    strtab = self.Link(verdef)
+    names = {}
+    base = False
+    offset = verdef.offset
+    for _ in range(verdef.info):
+      _, flags, index, count, _, aux, next_offset = self._Unpack(
+          'verdef', offset)
+      name = None
+      if count:
+        name = self.String(strtab, self._Unpack('verdaux', offset + aux)[0])
+      names[index] = name
+      if index == 1:
+        base = flags == _VER_FLG_BASE
+      if not next_offset:
+        break
+      offset += next_offset
+    if not names or min(names) < 1:
+      raise ElfError('Invalid version definitions.')
+    return [names.get(i) for i in range(1, max(names) + 1)], base
+
+  def VersionReferences(self):
+    """Returns a dictionary mapping version numbers to names of needed
+    versions.
+    """
+    verneed = self.FindSection(_SHT_GNU_VERNEED)
+    if verneed is None:
+      return {}
+    strtab = self.Link(verneed)
+    names = {}
+    offset = verneed.offset
+    for _ in range(verneed.info):
+      _, count, _, aux, next_offset = self._Unpack('verneed', offset)
+      aux_offset = offset + aux
+      for _ in range(count):
+        _, _, other, name, next_aux = self._Unpack('vernaux', aux_offset)
+        # Like binutils, the last match wins.
+        names[other] = self.String(strtab, name)
+        if not next_aux:
+          break
+        aux_offset += next_aux
+      if not next_offset:
+        break
+      offset += next_offset
+    return names
+
+  def SymbolType(self, sym_type, bind, shndx):
+    """Returns the letter nm prints as the type of a dynamic symbol."""
+    if shndx == _SHN_COMMON or (self.machine == _EM_X86_64 and
+                                shndx == _SHN_X86_64_LCOMMON):
+      return 'C'
+    is_object = sym_type in (_STT_OBJECT, _STT_COMMON)
+    if shndx == _SHN_UNDEF:
+      if bind == _STB_WEAK:
+        return 'v' if is_object else 'w'
+      return 'U'
+    if sym_type == _STT_GNU_IFUNC:
+      return 'i'
+    if bind == _STB_WEAK:
+      return 'V' if is_object else 'W'
+    if bind == _STB_GNU_UNIQUE:
+      return 'u'
+    if bind not in (_STB_GLOBAL, _STB_LOCAL):
+      return '?'
+
+    if shndx == _SHN_ABS:
+      letter = 'a'
+    elif shndx >= _SHN_LORESERVE or shndx >= len(self.sections):
+      raise ElfError('Unsupported section index %d.' % shndx)
+    else:
+      letter = self._SectionLetter(self.sections[shndx])
+    return letter.upper() if bind == _STB_GLOBAL else letter
+
+  def _SectionLetter(self, section):
+    if section.type not in _SYMBOL_SECTION_TYPES:
+      raise ElfError('Symbol in a section of type %d.' % section.type)
+    name = self.SectionName(section)
+    # binutils recognizes a few sections of Windows objects by name.
+    for prefix, letter in ((b'.drectve', 'i'), (b'.edata', 'e'),
+                           (b'.idata', 'i'), (b'.pdata', 'p')):
+      if (name.startswith(prefix) and
+          name[len(prefix):len(prefix) + 1] in b'.$0123456789'):
+        return letter
+
+    if section.flags & _SHF_EXECINSTR:
+      return 't'
+    if not section.flags & _SHF_ALLOC:
+      raise ElfError('Symbol in a section that is not loaded.')
+    if section.type == _SHT_NOBITS:
+      return 'b'
+    return 'd' if section.flags & _SHF_WRITE else 'r'
+
+
+def _Open(path):
+  """Returns the contents of the file at |path| as a read-only mmap."""
+  with open(path, 'rb') as f:
+    try:
+      return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, mmap.error):
+      # Empty files can't be mapped.
+      raise ElfError('Can\'t map %s.' % path)
+
+
+def _Decode(name):
+  return name.decode(TOC_ENCODING, TOC_ERRORS)
+
+
+def _ReadSONAME(elf):
+  lines = []
+  for tag, value in elf.DynamicStrings():
+    if tag != _DT_SONAME:
+      # These would only be printed by readelf, and thus matter for the
+      # output, if they contained 'SONAME'.
+      if b'SONAME' in value:
+        raise ElfError('Dynamic entry containing SONAME.')
+      continue
+    if elf.is_64:
+      tag_text = ' 0x%016x (SONAME)%13s' % (tag, ' ')
+    else:
+      tag_text = ' 0x%08x (SONAME)%21s' % (tag, ' ')
+    lines.append(tag_text + 'Library soname: [%s]\n' % _Decode(value))
+  return ''.join(lines)
+
+
+def _ReadDynSym(elf):
+  if elf.machine not in _SUPPORTED_MACHINES:
+    raise ElfError('Unsupported machine %d.' % elf.machine)
+  dynsym = elf.FindSection(_SHT_DYNSYM)
+  if dynsym is None:
+    return ''
+  strtab = elf.Link(dynsym)
+  symbols = list(elf.Entries(dynsym, 'sym'))
+  versions = None
+  versym = elf.FindSection(_SHT_GNU_VERSYM)
+  if versym is not None:
+    definitions, base = elf.VersionDefinitions()
+    references = elf.VersionReferences()
+    if definitions or references:
+      versions = [v[0] for v in elf.Entries(versym, 'half')]
+      if len(versions) < len(symbols):
+        raise ElfError('Missing symbol versions.')
+
+  entries = []
+  for index in range(1, len(symbols)):
+    if elf.is_64:
+      name_offset, info, _, shndx, _, _ = symbols[index]
+    else:
+      name_offset, _, _, info, _, shndx = symbols[index]
+    sym_type = info & 0xf
+    bind = info >> 4
+    if sym_type in (_STT_SECTION, _STT_FILE):
+      continue  # Debugging symbols are never printed.
+    is_common = shndx == _SHN_COMMON or (elf.machine == _EM_X86_64 and
+                                         shndx == _SHN_X86_64_LCOMMON)
+    if (bind not in (_STB_GLOBAL, _STB_WEAK, _STB_GNU_UNIQUE) and
+        shndx != _SHN_UNDEF and not is_common):
+      continue  # Not an external symbol.
+    name = elf.String(strtab, name_offset)
+    sym_letter = elf.SymbolType(sym_type, bind, shndx)
+
+    suffix = b''
+    if versions is not None:
+      version = versions[index] & _VERSYM_VERSION
+      hidden = bool(versions[index] & _VERSYM_HIDDEN)
+      version_name = b''
+      if version == 0:
+        pass
+      elif version == 1 and (not definitions or base):
+        pass  # The base version isn't printed.
+      elif version <= len(definitions):
+        version_name = definitions[version - 1]
+        if version_name is None or version_name == name:
+          # Version definitions have symbols named after them.
+          version_name = b''
+      elif version in references:
+        version_name = references[version]
+        hidden = True
+      else:
+        raise ElfError('Invalid symbol version %d.' % version)
+      if version_name:
+        at = b'@' if hidden or shndx == _SHN_UNDEF else b'@@'
+        suffix = at + version_name
+    entries.append((_Decode(name), _Decode(suffix), sym_letter))
+
+  # nm sorts by name without the version, using the collation order of the
+  # current locale. Symbols with equal names keep their order.
+  entries.sort(key=lambda entry: locale.strxfrm(entry[0]))
+  return ''.join('%s%s %s\n' % entry for entry in entries)
+
+
+def _ReadArchiveSymbols(elf):
+  if elf.machine not in _SUPPORTED_MACHINES:
+    raise ElfError('Unsupported machine %d.' % elf.machine)
+  if elf.type != _ET_REL:
+    raise ElfError('Not a relocatable object.')
+  symtab = elf.FindSection(_SHT_SYMTAB)
+  if symtab is None:
+    return []
+  strtab = elf.Link(symtab)
+  names = []
+  for index, symbol in enumerate(elf.Entries(symtab, 'sym')):
+    if elf.is_64:
+      name_offset, info, _, shndx, _, _ = symbol
+    else:
+      name_offset, _, _, info, _, shndx = symbol
+    bind = info >> 4
+    if index == 0 or bind == _STB_LOCAL or shndx == _SHN_UNDEF:
+      continue
+    if bind not in (_STB_GLOBAL, _STB_WEAK, _STB_GNU_UNIQUE):
+      raise ElfError('Unsupported symbol binding %d.' % bind)
+    if (shndx >= _SHN_LORESERVE and shndx not in (_SHN_ABS, _SHN_COMMON) and
+        not (elf.machine == _EM_X86_64 and shndx == _SHN_X86_64_LCOMMON)):
+      raise ElfError('Unsupported section index %d.' % shndx)
+    names.append(elf.String(strtab, name_offset))
+  return names
+
+
+def ReadSONAME(path):
+  """Returns the SONAME lines `readelf -d` prints for the file at |path|.
+
+  Raises:
+    ElfError: The file can't be read like readelf would.
+  """
+  data = _Open(path)
+  try:
+    return _ReadSONAME(_ElfFile(data))
+  finally:
+    data.close()
+
+
+def ReadDynSym(path):
+  """Returns the name and type of each exported symbol of the file at |path|.
+
+  The output is the same as that of `nm --format=posix -g -D` cut down to
+  the first two fields, with the symbols sorted in the collation order of the
+  current locale (nm sets LC_COLLATE from the environment, so callers wanting
+  the same order should too).
+
+  Raises:
+    ElfError: The file can't be read like nm would.
+  """
+  data = _Open(path)
+  try:
+    return _ReadDynSym(_ElfFile(data))
+  finally:
+    data.close()
+
+
+def ReadTOC(path):
+  """Returns ReadSONAME(path) + ReadDynSym(path), mapping the file once."""
+  data = _Open(path)
+  try:
+    elf = _ElfFile(data)
+    return _ReadSONAME(elf) + _ReadDynSym(elf)
+  finally:
+    data.close()
+
+
+def ReadArchiveSymbols(path):
+  """Returns the symbols ar puts in the index of an archive for an object.
+
+  These are the global, weak and unique symbols the object file at |path|
+  defines (including common ones), as bytes, in the order of its symbol
+  table.
+
+  Raises:
+    ElfError: The object can't be read like ar would.
+  """
+  data = _Open(path)
+  try:
+    return _ReadArchiveSymbols(_ElfFile(data))
+  finally:
+    data.close()
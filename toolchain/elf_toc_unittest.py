@@ -0,0 +1,297 @@
+# Copyright 2026 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import argparse
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import elf_toc
+import gcc_solink_wrapper
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+_HAVE_TOOLS = all(shutil.which(tool) for tool in ('gcc', 'nm', 'readelf'))
+
+_LIBRARY_SOURCE = '''\
+#include <stdio.h>
+int common_data;
+int data = 1;
+const int rodata = 2;
+static int local_data;
+__thread int tls;
+__attribute__((weak)) int weak_func(void) { return 0; }
+__attribute__((visibility("hidden"))) int hidden_func(void) { return 0; }
+#ifdef VERSIONED
+int old_func(void) { return 0; }
+int new_func(void) { return 1; }
+__asm__(".symver old_func,func@VERS_1");
+__asm__(".symver new_func,func@@VERS_2");
+#endif
+static int impl(void) { return 0; }
+static void *resolve(void) { return (void *)impl; }
+int ifunc(void) __attribute__((ifunc("resolve")));
+int Zebra(void) { return puts("x"); }
+int apple(void) { return local_data; }
+'''
+
+_VERSION_SCRIPT = '''\
+VERS_1 { global: data; rodata; common_data; tls; weak_func; ifunc; Zebra;
+                 apple; func; local: *; };
+VERS_2 { } VERS_1;
+'''
+
+
+@unittest.skipUnless(_HAVE_TOOLS, 'needs gcc, nm and readelf')
+class ElfTocTest(unittest.TestCase):
+  def setUp(self):
+    self.root = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, self.root)
+    # The order of the symbols depends on the collation order.
+    environ = mock.patch.dict(os.environ, {'LC_ALL': 'C'})
+    environ.start()
+    self.addCleanup(environ.stop)
+    self.source = self._Path('lib.c', _LIBRARY_SOURCE)
+    self.version_script = self._Path('lib.map', _VERSION_SCRIPT)
+
+  def _Path(self, name, contents=None):
+    path = os.path.join(self.root, name)
+    if contents is not None:
+      with open(path, 'w') as f:
+        f.write(contents)
+    return path
+
+  def _Link(self, name, flags=()):
+    path = self._Path(name)
+    try:
+      subprocess.check_call(
+          ['gcc', '-shared', '-fPIC', '-fcommon', self.source, '-o', path] +
+          list(flags), stderr=subprocess.DEVNULL)
+    except subprocess.CalledProcessError:
+      self.skipTest('gcc can\'t link %s' % ' '.join(flags))
+    return path
+
+  def _CheckTOC(self, sofile):
+    args = argparse.Namespace(readelf='readelf', nm='nm', sofile=sofile,
+                              toc_from_tools=True)
+    result, toc = gcc_solink_wrapper.CollectTOC(args)
+    self.assertEqual(result, 0)
+    self.assertEqual(elf_toc.ReadTOC(sofile), toc)
+    return toc
+
+  def test_TOC(self):
+    toc = self._CheckTOC(self._Link('libplain.so'))
+    self.assertIn('apple T\n', toc)
+    self.assertNotIn('SONAME', toc)
+
+  def test_TOCWithSONAME(self):
+    toc = self._CheckTOC(self._Link('libsoname.so',
+                                    ['-Wl,-soname,libsoname.so.1']))
+    self.assertIn('Library soname: [libsoname.so.1]', toc)
+
+  def test_TOCWithVersions(self):
+    toc = self._CheckTOC(self._Link(
+        'libversions.so', ['-DVERSIONED',
+                           '-Wl,--version-script,' + self.version_script]))
+    self.assertIn('func@@VERS_2 T\n', toc)
+    self.assertIn('func@VERS_1 T\n', toc)
+
+  def test_TOC32Bit(self):
+    self._CheckTOC(self._Link(
+        'lib32.so', ['-m32', '-DVERSIONED', '-Wl,-soname,lib32.so',
+                     '-Wl,--version-script,' + self.version_script]))
+
+  def test_TOCKeepsBytesOfNames(self):
+    # A name that isn't UTF-8 is written to the .TOC as nm prints it.
+    with open(self.source, 'a') as f:
+      f.write('int latin1(void) __asm__("caf\\351");\n'
+              'int latin1(void) { return 0; }\n')
+    sofile = self._Link('liblatin1.so')
+    toc = self._CheckTOC(sofile)
+    tocfile = self._Path('liblatin1.so.TOC')
+    gcc_solink_wrapper.UpdateTOC(tocfile, toc)
+    nm = subprocess.check_output(['nm', '--format=posix', '-g', '-D', sofile])
+    with open(tocfile, 'rb') as f:
+      self.assertIn(b'caf\xe9 T\n', f.read())
+    self.assertIn(b'caf\xe9 T ', nm)
+
+  def test_TOCMatchesShellCommands(self):
+    # What gcc_toolchain.gni ran before the wrapper wrote the .TOC, byte for
+    # byte.
+    with open(self.source, 'a') as f:
+      f.write('int latin1(void) __asm__("caf\\351");\n'
+              'int latin1(void) { return 0; }\n')
+    sofile = self._Link('libshell.so', ['-Wl,-soname,libshell.so'])
+    tocfile = self._Path('libshell.so.TOC')
+    gcc_solink_wrapper.UpdateTOC(tocfile, self._CheckTOC(sofile))
+    expected = subprocess.check_output(
+        ['sh', '-c', 'readelf -d "$0" | grep SONAME; '
+         'nm --format=posix -g -D "$0" | cut -f1-2 -d" "', sofile])
+    with open(tocfile, 'rb') as f:
+      self.assertEqual(f.read(), expected)
+
+  def test_ArchiveSymbols(self):
+    obj = self._Path('lib.o')
+    subprocess.check_call(['gcc', '-c', '-fPIC', '-fcommon', self.source,
+                           '-o', obj])
+    nm = subprocess.check_output(
+        ['nm', '-g', '--defined-only', '--format=posix', obj],
+        universal_newlines=True)
+    expected = [line.split(' ')[0] for line in nm.splitlines()]
+    names = elf_toc.ReadArchiveSymbols(obj)
+    self.assertEqual(sorted(name.decode('ascii') for name in names), expected)
+
+  def test_NotElf(self):
+    path = self._Path('not_elf.so', 'not an ELF file\n')
+    with self.assertRaises(elf_toc.ElfError):
+      elf_toc.ReadTOC(path)
+
+
+class UpdateTOCTest(unittest.TestCase):
+  _OLD_MTIME = 10**18
+
+  def setUp(self):
+    self.root = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, self.root)
+    self.tocfile = os.path.join(self.root, 'lib.so.TOC')
+    self.digest_file = self.tocfile + '.digest'
+
+  def _Read(self, path):
+    with open(path, 'rb') as f:
+      return f.read()
+
+  def _Age(self):
+    os.utime(self.tocfile, ns=(self._OLD_MTIME, self._OLD_MTIME))
+
+  def _MTime(self):
+    return os.stat(self.tocfile).st_mtime_ns
+
+  def test_ExactBytes(self):
+    # Names that aren't UTF-8 come from nm as surrogate escapes.
+    gcc_solink_wrapper.UpdateTOC(self.tocfile, 'caf\udce9 T\nfunc T\n')
+    data = self._Read(self.tocfile)
+    self.assertEqual(data, b'caf\xe9 T\nfunc T\n')
+    st = os.stat(self.tocfile)
+    self.assertEqual(
+        self._Read(self.digest_file).decode('ascii'),
+        '%s %d %d\n' % (hashlib.sha256(data).hexdigest(), st.st_size,
+                        st.st_mtime_ns))
+
+  def test_UnchangedTOCKeepsMTime(self):
+    gcc_solink_wrapper.UpdateTOC(self.tocfile, 'func T\n')
+    self._Age()
+    # The digest is stale now, as the mtime changed: the contents are
+    # compared instead, and the digest updated.
+    gcc_solink_wrapper.UpdateTOC(self.tocfile, 'func T\n')
+    self.assertEqual(self._MTime(), self._OLD_MTIME)
+    self.assertIn(b' %d\n' % self._OLD_MTIME, self._Read(self.digest_file))
+    with mock.patch('builtins.open', wraps=open) as opened:
+      gcc_solink_wrapper.UpdateTOC(self.tocfile, 'func T\n')
+    self.assertEqual(self._MTime(), self._OLD_MTIME)
+    # Only the digest was read.
+    self.assertEqual([call[0][0] for call in opened.call_args_list],
+                     [self.digest_file])
+
+  def test_ChangedTOC(self):
+    gcc_solink_wrapper.UpdateTOC(self.tocfile, 'func T\n')
+    self._Age()
+    gcc_solink_wrapper.UpdateTOC(self.tocfile, 'func T\nother T\n')
+    self.assertEqual(self._Read(self.tocfile), b'func T\nother T\n')
+    self.assertNotEqual(self._MTime(), self._OLD_MTIME)
+
+  def test_TOCChangedBehindDigest(self):
+    gcc_solink_wrapper.UpdateTOC(self.tocfile, 'func T\n')
+    with open(self.tocfile, 'wb') as f:
+      f.write(b'garbage\n')
+    gcc_solink_wrapper.UpdateTOC(self.tocfile, 'func T\n')
+    self.assertEqual(self._Read(self.tocfile), b'func T\n')
+
+  def test_BadDigest(self):
+    for contents in (b'', b'not a digest\n'):
+      with open(self.digest_file, 'wb') as f:
+        f.write(contents)
+      gcc_solink_wrapper.UpdateTOC(self.tocfile, 'func T\n')
+      self.assertEqual(self._Read(self.tocfile), b'func T\n')
+
+
+# Tools for gcc_solink_wrapper.py. The linker's output isn't ELF, so the
+# wrapper falls back to readelf and nm, which fail if $FAIL_NM is set.
+_FAKE_TOOLS = {
+    'ld': '''
+import sys
+with open(sys.argv[sys.argv.index('-o') + 1], 'w') as f:
+  f.write('not ELF')
+''',
+    'readelf': '''
+print(' 0x000000000000000e (SONAME)             Library soname: [lib.so]')
+''',
+    'nm': '''
+import os
+import sys
+with open(os.path.join(os.path.dirname(__file__), 'symbols')) as f:
+  sys.stdout.write(f.read())
+sys.exit(1 if os.environ.get('FAIL_NM') else 0)
+''',
+}
+
+
+class SolinkWrapperTOCTest(unittest.TestCase):
+  _OLD_MTIME = 10**18
+
+  def setUp(self):
+    self.root = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, self.root)
+    for name, source in _FAKE_TOOLS.items():
+      path = self._Path(name)
+      with open(path, 'w') as f:
+        f.write('#!%s\n%s' % (sys.executable, source))
+      os.chmod(path, 0o755)
+    self.tocfile = self._Path('lib.so.TOC')
+
+  def _Path(self, name):
+    return os.path.join(self.root, name)
+
+  def _Link(self, symbols, fail=False):
+    with open(self._Path('symbols'), 'w') as f:
+      f.write(symbols)
+    env = dict(os.environ)
+    env.pop('FAIL_NM', None)
+    if fail:
+      env['FAIL_NM'] = '1'
+    return subprocess.call([
+        sys.executable, os.path.join(_SCRIPT_DIR, 'gcc_solink_wrapper.py'),
+        '--readelf', self._Path('readelf'), '--nm', self._Path('nm'),
+        '--sofile', self._Path('lib.so'), '--tocfile', self.tocfile,
+        '--output', self._Path('lib.so'), '--', self._Path('ld'), '-o',
+        self._Path('lib.so')], env=env)
+
+  def _TOC(self):
+    with open(self.tocfile, 'rb') as f:
+      return f.read()
+
+  def test_FailedStepKeepsOldTOC(self):
+    self.assertEqual(self._Link('func T 0 0\n'), 0)
+    old_toc = self._TOC()
+    self.assertTrue(old_toc.endswith(b'\nfunc T\n'))
+    self.assertTrue(os.path.exists(self.tocfile + '.digest'))
+    os.utime(self.tocfile, ns=(self._OLD_MTIME, self._OLD_MTIME))
+
+    for symbols in ('func T 0 0\n', 'func T 0 0\nnew T 0 0\n'):
+      self.assertEqual(self._Link(symbols, fail=True), 1)
+      self.assertEqual(self._TOC(), old_toc)
+      self.assertEqual(os.stat(self.tocfile).st_mtime_ns, self._OLD_MTIME)
+      self.assertFalse(os.path.exists(self.tocfile + '.digest'))
+
+    # The old .TOC is still valid when the next link succeeds.
+    self.assertEqual(self._Link('func T 0 0\n'), 0)
+    self.assertEqual(os.stat(self.tocfile).st_mtime_ns, self._OLD_MTIME)
+    self.assertTrue(os.path.exists(self.tocfile + '.digest'))
+
+
+if __name__ == '__main__':
+  unittest.main()
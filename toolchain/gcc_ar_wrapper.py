@@ -9,6 +9,13 @@ This script is invoked like:
   python gcc_ar_wrapper.py --ar=$AR --output=$OUT $OP $INPUTS
 to do the equivalent of:
   rm -f $OUT && $AR $OP $OUT $INPUTS
+
+With --incremental, the archive is written by ar_writer.py instead, which
+only writes the members that changed since the last build. ar still runs for
+operations and inputs ar_writer.py doesn't handle.
+
+With --restat, an archive that comes out identical to the existing one is
+left alone, mtime included, so that ninja can skip what depends on it.
 """
 
 import argparse
@@ -20,6 +27,27 @@ import errno
 import wrapper_utils
 
 
+def _WriteIncrementally(args):
+  """Writes the archive with ar_writer.py.
+
+  Returns:
+    Whether it could be written; if not, ar has to run.
+  """
+  operation = set(args.operation)
+  if args.plugin is not None or not operation <= set('rcsDT') or \
+     not set('rsD') <= operation:
+    return False
+  import ar_writer
+  try:
+    ar_writer.WriteArchive(args.output,
+                           wrapper_utils.ExpandRspFiles(args.inputs),
+                           thin='T' in operation, incremental=True,
+                           restat=args.restat)
+  except (ar_writer.ArchiveError, EnvironmentError):
+    return False  # ar reports missing inputs better.
+  return True
+
+
 def main():
   parser = argparse.ArgumentParser(description=__doc__)
   parser.add_argument('--ar',
@@ -35,6 +63,12 @@ def main():
   parser.add_argument('--resource-whitelist',
                       help='Merge all resource whitelists into a single file.',
                       metavar='PATH')
+  parser.add_argument('--incremental', action='store_true',
+                      help=('Only write the members that changed since the '
+                            'last build, see ar_writer.py'))
+  parser.add_argument('--restat', action='store_true',
+                      help=('Keep the existing archive if the new one is '
+                            'identical'))
   parser.add_argument('operation',
                       help='Operation on the archive')
   parser.add_argument('inputs', nargs='+',
@@ -46,21 +80,30 @@ def main():
     wrapper_utils.CombineResourceWhitelists(
         whitelist_candidates, args.resource_whitelist)
 
+  if args.incremental and _WriteIncrementally(args):
+    return 0
+
   command = [args.ar, args.operation]
   if args.plugin is not None:
     command += ['--plugin', args.plugin]
   command.append(args.output)
   command += args.inputs
 
-  # Remove the output file first.
-  try:
-    os.remove(args.output)
-  except OSError as e:
-    if e.errno != errno.ENOENT:
-      raise
+  # Remove the output file first, or just move it aside to compare.
+  set_aside = {}
+  if args.restat:
+    set_aside = wrapper_utils.SetAsideOutputs([args.output])
+  else:
+    try:
+      os.remove(args.output)
+    except OSError as e:
+      if e.errno != errno.ENOENT:
+        raise
 
   # Now just run the ar command.
-  return subprocess.call(wrapper_utils.CommandToRun(command))
+  result = subprocess.call(wrapper_utils.CommandToRun(command))
+  wrapper_utils.RestoreUnchangedOutputs(set_aside, succeeded=result == 0)
+  return result
 
 
 if __name__ == "__main__":
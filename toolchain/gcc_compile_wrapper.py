@@ -8,30 +8,74 @@
 This script exists to avoid using complex shell commands in
 gcc_toolchain.gni's tool("cxx") and tool("cc") in case the host running the
 compiler does not have a POSIX-like shell (e.g. Windows).
+
+With --cache-dir (or GN_BUILD_COMPILE_CACHE_DIR set in the environment), the
+results of successful compiles are cached and reused; see compile_cache.py.
+With GN_BUILD_REMOTE_EXEC set, compiles run on a worker; see remote_exec.py.
 """
 
+from __future__ import print_function
+
 import argparse
+import os
 import sys
 
 import wrapper_utils
 
 
+# compile_cache.py is only imported when the cache is used.
+def _OpenCache(cache_dir, max_size, backend=None):
+  import compile_cache
+  return compile_cache.CompileCache(
+      cache_dir, max_size or compile_cache.DEFAULT_MAX_SIZE, backend=backend)
+
+
 def main():
   parser = argparse.ArgumentParser(description=__doc__)
   parser.add_argument('--resource-whitelist',
                       help='Generate a resource whitelist for this target.',
                       metavar='PATH')
+  cache_dir_env = wrapper_utils.COMPILE_CACHE_DIR_ENV
+  parser.add_argument('--cache-dir', default=os.environ.get(cache_dir_env),
+                      help=('Cache compilation results in this directory '
+                            '(default: $%s)' % cache_dir_env),
+                      metavar='DIR')
+  parser.add_argument('--cache-max-size', type=wrapper_utils.ParseSize,
+                      help=('Evict the least recently used results when the '
+                            'cache grows larger than this, e.g. 500M '
+                            '(default: 5G)'),
+                      metavar='SIZE')
+  parser.add_argument('--cache-mode', choices=wrapper_utils.COMPILE_CACHE_MODES,
+                      default='direct',
+                      help=('Look up results by the headers in the depfile '
+                            '(direct) or by the preprocessed source'))
+  parser.add_argument('--cache-stats', action='store_true',
+                      help='Print the statistics of the cache and exit')
   parser.add_argument('command', nargs=argparse.REMAINDER,
                       help='Compilation command')
   args = parser.parse_args()
 
-  returncode, stderr = wrapper_utils.CaptureCommandStderr(
-      wrapper_utils.CommandToRun(args.command))
+  if args.cache_stats:
+    if not args.cache_dir:
+      parser.error('--cache-stats requires --cache-dir')
+    print(_OpenCache(args.cache_dir, args.cache_max_size).FormatStats())
+    return 0
 
-  used_resources = wrapper_utils.ExtractResourceIdsFromPragmaWarnings(stderr)
-  sys.stderr.write(stderr)
+  scanner = None
+  if args.resource_whitelist:
+    scanner = wrapper_utils.ResourceIdScanner()
+  command = wrapper_utils.CommandToRun(args.command)
+  backend = wrapper_utils.ExecutionBackendFromEnvironment()
+  if args.cache_dir:
+    cache = _OpenCache(args.cache_dir, args.cache_max_size, backend=backend)
+    returncode = cache.Compile(command, args.cache_mode, scanner=scanner)
+  elif backend:
+    returncode = backend.RunCompile(command, scanner=scanner)
+  else:
+    returncode = wrapper_utils.StreamCommandStderr(command, scanner=scanner)
 
   if args.resource_whitelist:
+    used_resources = scanner.resource_ids
     with open(args.resource_whitelist, 'w') as f:
       if used_resources:
         f.write('\n'.join(str(resource) for resource in used_resources))
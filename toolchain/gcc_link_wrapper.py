@@ -8,6 +8,9 @@
 This script exists to avoid using complex shell commands in
 gcc_toolchain.gni's tool("link"), in case the host running the compiler
 does not have a POSIX-like shell (e.g. Windows).
+
+With --restat, outputs that come out identical keep their old contents and
+mtime, so that ninja can skip what depends on them.
 """
 
 import argparse
@@ -33,6 +36,32 @@ def CommandToRun(command):
   return command
 
 
+def _LinkAndStrip(args):
+  # Work-around for gold being slow-by-default. http://crbug.com/632230
+  fast_env = dict(os.environ)
+  fast_env['LC_ALL'] = 'C'
+  steps = []
+  result = wrapper_utils.RunLinkWithOptionalMapFile(
+      args.command, env=fast_env, map_file=args.map_file,
+      post_link_steps=steps, map_gzip_level=args.map_file_gzip_level,
+      map_gzip_threads=args.map_file_gzip_threads,
+      backend=wrapper_utils.ExecutionBackendFromEnvironment(),
+      admission=wrapper_utils.LinkAdmissionFromEnvironment(args.output))
+  if result != 0:
+    return result
+
+  # Finally, strip the linked executable (if desired), while the map file (if
+  # any) is gzipped.
+  if args.strip:
+    steps.append(wrapper_utils.PostLinkStep(
+        'strip', lambda: subprocess.call(CommandToRun([
+            args.strip, '--strip-unneeded', '-o', args.output,
+            args.unstripped_file
+        ])), outputs=[args.output]))
+
+  return wrapper_utils.RunPostLinkSteps(steps, args.output)
+
+
 def main():
   parser = argparse.ArgumentParser(description=__doc__)
   parser.add_argument('--strip',
@@ -45,6 +74,17 @@ def main():
                       help=('Use --Wl,-Map to generate a map file. Will be '
                             'gzipped if extension ends with .gz'),
                       metavar='FILE')
+  parser.add_argument('--map-file-gzip-level',
+                      type=int,
+                      default=1,
+                      help='Compression level for gzipping the map file')
+  parser.add_argument('--map-file-gzip-threads',
+                      type=int,
+                      help=('Number of threads for gzipping the map file '
+                            '(default: number of CPUs)'))
+  parser.add_argument('--restat', action='store_true',
+                      help=('Keep the existing outputs that come out '
+                            'identical'))
   parser.add_argument('--output',
                       required=True,
                       help='Final output executable file',
@@ -53,20 +93,17 @@ def main():
                       help='Linking command')
   args = parser.parse_args()
 
-  # Work-around for gold being slow-by-default. http://crbug.com/632230
-  fast_env = dict(os.environ)
-  fast_env['LC_ALL'] = 'C'
-  result = wrapper_utils.RunLinkWithOptionalMapFile(args.command, env=fast_env,
-                                                    map_file=args.map_file)
-  if result != 0:
-    return result
-
-  # Finally, strip the linked executable (if desired).
-  if args.strip:
-    result = subprocess.call(CommandToRun([
-        args.strip, '--strip-unneeded', '-o', args.output, args.unstripped_file
-        ]))
-
+  set_aside = {}
+  if args.restat:
+    outputs = [args.output]
+    if args.strip and args.unstripped_file:
+      outputs.append(args.unstripped_file)
+    set_aside = wrapper_utils.SetAsideOutputs(outputs)
+  result = 1
+  try:
+    result = _LinkAndStrip(args)
+  finally:
+    wrapper_utils.RestoreUnchangedOutputs(set_aside, succeeded=result == 0)
   return result
 
 
@@ -11,10 +11,12 @@ does not have a POSIX-like shell (e.g. Windows).
 """
 
 import argparse
+import locale
 import os
 import subprocess
 import sys
 
+import elf_toc
 import wrapper_utils
 
 
@@ -23,7 +25,7 @@ def CollectSONAME(args):
   toc = ''
   readelf = subprocess.Popen(wrapper_utils.CommandToRun(
       [args.readelf, '-d', args.sofile]), stdout=subprocess.PIPE,
-      bufsize=-1, universal_newlines=True)
+      bufsize=-1, encoding=elf_toc.TOC_ENCODING, errors=elf_toc.TOC_ERRORS)
   for line in readelf.stdout:
     if 'SONAME' in line:
       toc += line
@@ -35,13 +37,23 @@ def CollectDynSym(args):
   toc = ''
   nm = subprocess.Popen(wrapper_utils.CommandToRun([
       args.nm, '--format=posix', '-g', '-D', args.sofile]),
-      stdout=subprocess.PIPE, bufsize=-1, universal_newlines=True)
+      stdout=subprocess.PIPE, bufsize=-1, encoding=elf_toc.TOC_ENCODING,
+      errors=elf_toc.TOC_ERRORS)
   for line in nm.stdout:
     toc += ' '.join(line.split(' ', 2)[:2]) + '\n'
   return nm.wait(), toc
 
 
 def CollectTOC(args):
+  if not args.toc_from_tools:
+    # Reading the file directly saves starting two processes per link. Files
+    # elf_toc can't read exactly like the tools (or at all) are left to the
+    # tools, which also report any errors.
+    try:
+      return 0, elf_toc.ReadTOC(args.sofile)
+    except (elf_toc.ElfError, IOError, OSError):
+      pass
+
   result, toc = CollectSONAME(args)
   if result == 0:
     result, dynsym = CollectDynSym(args)
@@ -49,13 +61,75 @@ def CollectTOC(args):
   return result, toc
 
 
+def _TOCDigestFile(tocfile):
+  return tocfile + '.digest'
+
+
+def _ReadTOCDigest(tocfile):
+  """Returns the digest recorded for |tocfile|, or None if it's not current.
+
+  The sidecar written by UpdateTOC() also records the size and mtime of the
+  .TOC, so a .TOC changed behind our back isn't mistaken for the one hashed.
+  """
+  try:
+    with open(_TOCDigestFile(tocfile), 'r') as f:
+      digest, size, mtime_ns = f.read().split()
+    st = os.stat(tocfile)
+  except (EnvironmentError, ValueError):
+    return None
+  if (str(st.st_size), str(st.st_mtime_ns)) != (size, mtime_ns):
+    return None
+  return digest
+
+
+def _WriteTOCDigest(tocfile, digest):
+  try:
+    st = os.stat(tocfile)
+    wrapper_utils.WriteFileAtomically(
+        _TOCDigestFile(tocfile),
+        ('%s %d %d\n' % (digest, st.st_size, st.st_mtime_ns)).encode('ascii'))
+  except OSError:
+    pass  # The next link just has to compare the contents again.
+
+
 def UpdateTOC(tocfile, toc):
-  if os.path.exists(tocfile):
-    old_toc = open(tocfile, 'r').read()
-  else:
-    old_toc = None
-  if toc != old_toc:
-    open(tocfile, 'w').write(toc)
+  """Writes |toc| to |tocfile|, unless it already has those contents.
+
+  The digest of the .TOC is kept next to it, so that checking for the same
+  contents only reads a few bytes. The .TOC is replaced atomically, and the
+  digest is removed while it's not up to date, so an interrupted link leaves
+  either the old .TOC or the new one, and never a stale digest.
+  """
+  import hashlib
+
+  data = toc.encode(elf_toc.TOC_ENCODING, elf_toc.TOC_ERRORS)
+  digest = hashlib.sha256(data).hexdigest()
+  old_digest = _ReadTOCDigest(tocfile)
+  if old_digest is None and os.path.exists(tocfile):
+    # No usable digest (e.g. from before there were any): compare contents.
+    with open(tocfile, 'rb') as f:
+      if f.read() == data:
+        old_digest = digest
+        _WriteTOCDigest(tocfile, digest)
+  if old_digest == digest:
+    return
+  try:
+    os.remove(_TOCDigestFile(tocfile))
+  except OSError:
+    pass
+  wrapper_utils.WriteFileAtomically(tocfile, data)
+  _WriteTOCDigest(tocfile, digest)
+
+
+def GenerateTOC(args):
+  result, toc = CollectTOC(args)
+  if result != 0:
+    return result
+
+  # If there is an existing TOC file with identical contents, leave it alone.
+  # Otherwise, write out the TOC file.
+  UpdateTOC(args.tocfile, toc)
+  return 0
 
 
 def main():
@@ -68,6 +142,10 @@ def main():
                       required=True,
                       help='The nm binary to run',
                       metavar='PATH')
+  parser.add_argument('--toc-from-tools',
+                      action='store_true',
+                      help=('Always run readelf and nm to generate the TOC, '
+                            'instead of reading the shared object directly'))
   parser.add_argument('--strip',
                       help='The strip binary to run',
                       metavar='PATH')
@@ -83,6 +161,14 @@ def main():
                       help=('Use --Wl,-Map to generate a map file. Will be '
                             'gzipped if extension ends with .gz'),
                       metavar='FILE')
+  parser.add_argument('--map-file-gzip-level',
+                      type=int,
+                      default=1,
+                      help='Compression level for gzipping the map file')
+  parser.add_argument('--map-file-gzip-threads',
+                      type=int,
+                      help=('Number of threads for gzipping the map file '
+                            '(default: number of CPUs)'))
   parser.add_argument('--output',
                       required=True,
                       help='Final output shared object file',
@@ -94,6 +180,12 @@ def main():
                       help='Linking command')
   args = parser.parse_args()
 
+  # Like nm, sort the TOC's symbols in the collation order of the environment.
+  try:
+    locale.setlocale(locale.LC_COLLATE, '')
+  except locale.Error:
+    pass
+
   # Work-around for gold being slow-by-default. http://crbug.com/632230
   fast_env = dict(os.environ)
   fast_env['LC_ALL'] = 'C'
@@ -105,27 +197,32 @@ def main():
 
   # First, run the actual link.
   command = wrapper_utils.CommandToRun(args.command)
-  result = wrapper_utils.RunLinkWithOptionalMapFile(command, env=fast_env,
-                                                    map_file=args.map_file)
-
-  if result != 0:
-    return result
+  steps = []
+  result = wrapper_utils.RunLinkWithOptionalMapFile(
+      command, env=fast_env, map_file=args.map_file,
+      post_link_steps=steps, map_gzip_level=args.map_file_gzip_level,
+      map_gzip_threads=args.map_file_gzip_threads,
+      backend=wrapper_utils.ExecutionBackendFromEnvironment(),
+      admission=wrapper_utils.LinkAdmissionFromEnvironment(args.output))
 
-  # Next, generate the contents of the TOC file.
-  result, toc = CollectTOC(args)
   if result != 0:
     return result
 
-  # If there is an existing TOC file with identical contents, leave it alone.
-  # Otherwise, write out the TOC file.
-  UpdateTOC(args.tocfile, toc)
-
-  # Finally, strip the linked shared object file (if desired).
+  # Then generate the TOC file, strip the linked shared object file (if
+  # desired) and gzip the map file (if any). These only read the linked file,
+  # so they run in parallel.
+  # The .TOC is replaced atomically, so a failed step leaves the old one,
+  # which is still valid; only its digest may be stale.
+  steps.append(wrapper_utils.PostLinkStep(
+      'toc', lambda: GenerateTOC(args),
+      outputs=[_TOCDigestFile(args.tocfile)]))
   if args.strip:
-    result = subprocess.call(wrapper_utils.CommandToRun(
-        [args.strip, '--strip-unneeded', '-o', args.output, args.sofile]))
+    steps.append(wrapper_utils.PostLinkStep(
+        'strip', lambda: subprocess.call(wrapper_utils.CommandToRun(
+            [args.strip, '--strip-unneeded', '-o', args.output,
+             args.sofile])), outputs=[args.output]))
 
-  return result
+  return wrapper_utils.RunPostLinkSteps(steps, args.output)
 
 
 if __name__ == "__main__":
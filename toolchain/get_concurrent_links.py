@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# Copyright 2026 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Prints how many links to run at once, for concurrent_links.gni.
+
+Links take far more memory than compiles, so running as many of them as
+there are CPUs makes large (and especially LTO) builds run out of memory.
+This estimates how much memory one link takes from the GN args that matter
+most, and allows as many links as fit into the machine's memory, but no more
+than there are CPUs.
+
+Run with:
+  python get_concurrent_links.py [--symbol-level=N] [--enable-lto]
+      [--use-debug-fission] [--is-official-build] [--mem-per-link-gb=GB]
+
+concurrent_links.gni passes the GN arg concurrent_links_mem_per_link_gb as
+--mem-per-link-gb when it's set.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+_GB = 1024 ** 3
+_MEMINFO = '/proc/meminfo'
+# Rough peak memory of one link in GiB by symbol_level, without and with
+# use_debug_fission, which keeps most of the debug info out of the linker.
+_MEMORY_PER_LINK_GB = {
+    0: (2, 2),
+    1: (4, 3),
+    2: (8, 4),
+}
+# Extra memory per link for LTO, which optimizes and generates all the code
+# in the linker.
+_LTO_MEMORY_PER_LINK_GB = 12
+# Official builds optimize harder (e.g. identical code folding), which takes
+# this much more memory per link.
+_OFFICIAL_BUILD_FACTOR = 1.5
+# Memory left for the OS and the compiles running next to the links.
+_RESERVED_MEMORY_GB = 2
+
+
+def _ReadMemTotal(meminfo_path):
+  """Returns the total memory in bytes listed in |meminfo_path|, or None."""
+  try:
+    with open(meminfo_path) as f:
+      for line in f:
+        fields = line.split()
+        if len(fields) >= 2 and fields[0] == 'MemTotal:':
+          unit = fields[2].lower() if len(fields) > 2 else ''
+          return int(fields[1]) * (1024 if unit == 'kb' else 1)
+  except (EnvironmentError, ValueError):
+    pass
+  return None
+
+
+def _GetWindowsMemory():
+  import ctypes
+
+  class MEMORYSTATUSEX(ctypes.Structure):
+    _fields_ = [
+        ('dwLength', ctypes.c_ulong),
+        ('dwMemoryLoad', ctypes.c_ulong),
+        ('ullTotalPhys', ctypes.c_ulonglong),
+        ('ullAvailPhys', ctypes.c_ulonglong),
+        ('ullTotalPageFile', ctypes.c_ulonglong),
+        ('ullAvailPageFile', ctypes.c_ulonglong),
+        ('ullTotalVirtual', ctypes.c_ulonglong),
+        ('ullAvailVirtual', ctypes.c_ulonglong),
+        ('sullAvailExtendedVirtual', ctypes.c_ulonglong),
+    ]
+
+  status = MEMORYSTATUSEX()
+  status.dwLength = ctypes.sizeof(status)
+  if not ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+    return None
+  return status.ullTotalPhys
+
+
+def GetTotalMemory(meminfo_path=_MEMINFO):
+  """Returns the physical memory of this machine in bytes, or None."""
+  if sys.platform.startswith('linux') or meminfo_path != _MEMINFO:
+    return _ReadMemTotal(meminfo_path)
+  if sys.platform == 'darwin':
+    try:
+      return int(subprocess.check_output(['sysctl', '-n', 'hw.memsize']))
+    except (EnvironmentError, subprocess.CalledProcessError, ValueError):
+      return None
+  if sys.platform in ('win32', 'cygwin'):
+    return _GetWindowsMemory()
+  return None
+
+
+def GetMemoryPerLink(symbol_level=2, enable_lto=False,
+                     use_debug_fission=False, is_official_build=False):
+  """Returns the estimated peak memory of one link in bytes."""
+  without_fission, with_fission = _MEMORY_PER_LINK_GB[symbol_level]
+  gb = with_fission if use_debug_fission else without_fission
+  if enable_lto:
+    gb += _LTO_MEMORY_PER_LINK_GB
+  if is_official_build:
+    gb *= _OFFICIAL_BUILD_FACTOR
+  return int(gb * _GB)
+
+
+def GetMemoryForLinks(total_memory):
+  """Returns how many of the |total_memory| bytes links may take together."""
+  return total_memory - _RESERVED_MEMORY_GB * _GB
+
+
+def GetConcurrentLinks(total_memory, cpu_count, memory_per_link):
+  """Returns how many links of |memory_per_link| bytes to run at once.
+
+  Args:
+    total_memory: Memory of the machine in bytes, or None if unknown.
+    cpu_count: Number of CPUs of the machine.
+    memory_per_link: Estimated peak memory of one link in bytes.
+  """
+  cpu_count = max(1, cpu_count or 1)
+  if not total_memory:
+    return cpu_count
+  return max(1, min(cpu_count,
+                    GetMemoryForLinks(total_memory) // memory_per_link))
+
+
+def main():
+  parser = argparse.ArgumentParser(
+      description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument('--symbol-level', type=int, default=2,
+                      choices=sorted(_MEMORY_PER_LINK_GB),
+                      help='symbol_level of the build')
+  parser.add_argument('--enable-lto', action='store_true',
+                      help='The build uses LTO')
+  parser.add_argument('--use-debug-fission', action='store_true',
+                      help='The build uses split DWARF')
+  parser.add_argument('--is-official-build', action='store_true',
+                      help='The build is an official build')
+  parser.add_argument('--mem-per-link-gb', type=float,
+                      help='Use this memory per link instead of the estimate')
+  parser.add_argument('--meminfo', default=_MEMINFO, help=argparse.SUPPRESS)
+  args = parser.parse_args()
+
+  if args.mem_per_link_gb:
+    memory_per_link = int(args.mem_per_link_gb * _GB)
+  else:
+    memory_per_link = GetMemoryPerLink(args.symbol_level, args.enable_lto,
+                                       args.use_debug_fission,
+                                       args.is_official_build)
+  print(GetConcurrentLinks(GetTotalMemory(args.meminfo), os.cpu_count(),
+                           memory_per_link))
+  return 0
+
+
+if __name__ == '__main__':
+  sys.exit(main())
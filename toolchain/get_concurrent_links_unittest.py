@@ -0,0 +1,119 @@
+# Copyright 2026 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import textwrap
+import unittest
+from unittest import mock
+
+import get_concurrent_links
+
+_GB = 1024 ** 3
+
+
+class UnitTest(unittest.TestCase):
+  def setUp(self):
+    self.temp_dir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.temp_dir)
+
+  def _WriteMeminfo(self, contents):
+    path = os.path.join(self.temp_dir, 'meminfo')
+    with open(path, 'w') as f:
+      f.write(textwrap.dedent(contents))
+    return path
+
+  def _Run(self, meminfo, cpu_count, *args):
+    argv = ['get_concurrent_links.py', '--meminfo=' + meminfo] + list(args)
+    stdout = io.StringIO()
+    with mock.patch.object(sys, 'argv', argv), \
+         mock.patch.object(os, 'cpu_count', return_value=cpu_count), \
+         contextlib.redirect_stdout(stdout):
+      self.assertEqual(get_concurrent_links.main(), 0)
+    return int(stdout.getvalue())
+
+  def test_GetTotalMemory(self):
+    meminfo = self._WriteMeminfo("""\
+        MemTotal:       65855180 kB
+        MemFree:        40143904 kB
+        MemAvailable:   58911628 kB
+        """)
+    self.assertEqual(get_concurrent_links.GetTotalMemory(meminfo),
+                     65855180 * 1024)
+
+    meminfo = self._WriteMeminfo("""\
+        MemFree:        40143904 kB
+        """)
+    self.assertIsNone(get_concurrent_links.GetTotalMemory(meminfo))
+
+    meminfo = self._WriteMeminfo("""\
+        MemTotal:       lots kB
+        """)
+    self.assertIsNone(get_concurrent_links.GetTotalMemory(meminfo))
+
+    self.assertIsNone(get_concurrent_links.GetTotalMemory(
+        os.path.join(self.temp_dir, 'missing')))
+
+  def test_GetMemoryPerLink(self):
+    default = get_concurrent_links.GetMemoryPerLink()
+    self.assertEqual(default, 8 * _GB)
+    self.assertLess(get_concurrent_links.GetMemoryPerLink(symbol_level=1),
+                    default)
+    self.assertLess(get_concurrent_links.GetMemoryPerLink(symbol_level=0),
+                    get_concurrent_links.GetMemoryPerLink(symbol_level=1))
+    self.assertLess(
+        get_concurrent_links.GetMemoryPerLink(use_debug_fission=True), default)
+    self.assertGreater(get_concurrent_links.GetMemoryPerLink(enable_lto=True),
+                       default)
+    self.assertGreater(
+        get_concurrent_links.GetMemoryPerLink(is_official_build=True), default)
+    self.assertEqual(
+        get_concurrent_links.GetMemoryPerLink(
+            symbol_level=0, use_debug_fission=True),
+        get_concurrent_links.GetMemoryPerLink(symbol_level=0))
+
+  def test_GetConcurrentLinks(self):
+    # 62 GiB are left after the reserve, enough for 7 links of 8 GiB.
+    self.assertEqual(
+        get_concurrent_links.GetConcurrentLinks(64 * _GB, 32, 8 * _GB), 7)
+    # There are never more links than CPUs.
+    self.assertEqual(
+        get_concurrent_links.GetConcurrentLinks(64 * _GB, 4, 8 * _GB), 4)
+    # There's always at least one link.
+    self.assertEqual(
+        get_concurrent_links.GetConcurrentLinks(4 * _GB, 32, 8 * _GB), 1)
+    self.assertEqual(
+        get_concurrent_links.GetConcurrentLinks(1 * _GB, 32, 8 * _GB), 1)
+    # Without knowing the memory, only the CPUs count.
+    self.assertEqual(
+        get_concurrent_links.GetConcurrentLinks(None, 32, 8 * _GB), 32)
+    self.assertEqual(
+        get_concurrent_links.GetConcurrentLinks(None, None, 8 * _GB), 1)
+
+  def test_main(self):
+    meminfo = self._WriteMeminfo("""\
+        MemTotal:       67108864 kB
+        MemFree:        1024 kB
+        """)
+    self.assertEqual(self._Run(meminfo, 64), 7)
+    self.assertEqual(self._Run(meminfo, 64, '--use-debug-fission'), 15)
+    self.assertEqual(self._Run(meminfo, 64, '--symbol-level=0'), 31)
+    self.assertEqual(self._Run(meminfo, 64, '--enable-lto'), 3)
+    self.assertEqual(self._Run(meminfo, 64, '--enable-lto',
+                               '--is-official-build'), 2)
+    self.assertEqual(self._Run(meminfo, 8, '--symbol-level=0'), 8)
+    # The memory per link can be overridden.
+    self.assertEqual(self._Run(meminfo, 64, '--mem-per-link-gb=31'), 2)
+    self.assertEqual(self._Run(meminfo, 64, '--enable-lto',
+                               '--mem-per-link-gb=1'), 62)
+
+
+if __name__ == '__main__':
+  unittest.main()
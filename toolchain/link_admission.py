@@ -0,0 +1,271 @@
+# Copyright 2026 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Admits links by the memory they take, across all the links of a machine.
+
+ninja's link_pool only limits how many links run at once, but links differ
+wildly in how much memory they take. With $GN_BUILD_LINK_ADMISSION_DIR set,
+gcc_link_wrapper.py and gcc_solink_wrapper.py take "tokens" for the memory
+their link is expected to need from a budget shared through files in that
+directory, and wait while taking them would exceed the budget. That way
+concurrent_links can be raised without the large links running out of
+memory together.
+
+A link is expected to need the peak memory (RSS) it took the last time it
+succeeded, or, the first time, an amount proportional to the size of the
+files listed in its response files. Only the peak of the largest process of a
+link is known, so for gcc LTO links, which run up to N LTRANS processes at
+once with -flto=N (or one per CPU with -flto, -flto=auto or
+-flto=jobserver), the peak is multiplied by the number of those. The peaks
+of the most recently linked _MAX_HISTORY_ENTRIES outputs are kept.
+
+The budget is the machine's memory minus what get_concurrent_links.py
+reserves, or $GN_BUILD_LINK_MEMORY_BUDGET (e.g. 48G). Links are admitted in
+the order they asked, and a link is always admitted when no other link is
+running, even if it needs more than the budget. The tokens of links that
+exited without returning them are returned for them: each link holds a lock
+on a file of its own while it waits or runs, so links that are gone are told
+apart from running ones without relying on pids, which are reused and differ
+between pid namespaces.
+
+This needs flock(), so links aren't limited on Windows.
+"""
+
+import contextlib
+import marshal
+import os
+import sys
+import time
+
+import wrapper_utils
+
+try:
+  import fcntl
+except ImportError:
+  fcntl = None
+
+ADMISSION_DIR_ENV = wrapper_utils.LINK_ADMISSION_DIR_ENV
+BUDGET_ENV = 'GN_BUILD_LINK_MEMORY_BUDGET'
+
+# Changes whenever the format of the files in the admission directory changes.
+_STATE_VERSION = 2
+_LOCK_FILE = 'lock'
+# The files each waiting or running link holds a lock on, named by its id.
+_LINKS_DIR = 'links'
+# The links holding tokens and the links waiting for them.
+_STATE_FILE = 'state'
+# The peak memory of the last successful link of each output, from the least
+# to the most recently linked one.
+_HISTORY_FILE = 'history'
+# Outputs are only forgotten when they're the least recently linked, since
+# build directories that are gone can't be told apart from ones that aren't
+# built often.
+_MAX_HISTORY_ENTRIES = 5000
+# Without history, a link is expected to take this many times the size of
+# its inputs, but at least _MIN_LINK_MEMORY.
+_INPUT_SIZE_FACTOR = 1.5
+_MIN_LINK_MEMORY = 256 * 1024 * 1024
+# How often waiting links check whether they can start.
+_POLL_SECONDS = 0.2
+
+
+def _IsRunning(admission_dir, link_id):
+  """Returns whether the link |link_id| still holds the lock on its file.
+
+  Must be called with the admission directory locked. The files of links
+  that are gone are removed.
+  """
+  path = os.path.join(admission_dir, _LINKS_DIR, link_id)
+  try:
+    f = open(path, 'rb')
+  except FileNotFoundError:
+    return False
+  with f:
+    try:
+      fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+      return True
+    os.remove(path)
+  return False
+
+
+def _LoadFile(path, default):
+  try:
+    with open(path, 'rb') as f:
+      version, data = marshal.loads(f.read())
+  except (EnvironmentError, EOFError, ValueError, TypeError):
+    return default
+  return data if version == _STATE_VERSION else default
+
+
+def _InputSize(command):
+  """Returns the size in bytes of the files in the response files of
+  |command|."""
+  size = 0
+  for arg in command:
+    if not arg.startswith('@'):
+      continue
+    for path in wrapper_utils.ExpandRspFiles([arg]):
+      try:
+        size += os.path.getsize(path)
+      except OSError:
+        pass  # A flag, or a library found through the search path.
+  return size
+
+
+def _ParallelLTOJobs(command):
+  """Returns how many LTO processes the link |command| may run at once.
+
+  gcc runs the LTRANS stage of LTO in separate processes. clang's LTO runs in
+  threads of the linker, so -flto=thin and -flto=full count as one process.
+  """
+  if not command or 'clang' in os.path.basename(command[0]):
+    return 1
+  jobs = 1
+  for arg in command[1:]:
+    if arg in ('-flto-partition=one', '-flto-partition=none'):
+      return 1
+    if arg == '-fno-lto':
+      jobs = 1
+    elif arg in ('-flto', '-flto=auto', '-flto=jobserver'):
+      jobs = os.cpu_count() or 1
+    elif arg.startswith('-flto=') and arg[len('-flto='):].isdigit():
+      jobs = max(1, int(arg[len('-flto='):]))
+  return jobs
+
+
+def _PeakChildMemory():
+  """Returns the peak RSS in bytes of the largest child process waited for."""
+  import resource
+  peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+  # ru_maxrss is in bytes on macOS, and in KiB elsewhere.
+  return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class LinkAdmission(object):
+  """Takes tokens for the link of one output from the shared budget."""
+
+  def __init__(self, admission_dir, budget, output):
+    self._dir = admission_dir
+    self._budget = budget
+    self._output = os.path.abspath(output)
+    self._tokens = None
+    # The number of processes whose peak memory may add up, see
+    # _ParallelLTOJobs().
+    self._jobs = 1
+    # The id of the link in the state, and its locked file, see _IsRunning().
+    self._id = None
+    self._link_file = None
+
+  @contextlib.contextmanager
+  def _Locked(self):
+    """Yields the state of the budget, and saves it afterwards.
+
+    The state is a dict of the tokens each link holds and a list of the
+    links waiting for tokens, in the order they asked, by their ids. Links
+    that are gone are removed from both. The state is only saved if it
+    changed, so that waiting links don't rewrite it every time they check.
+    """
+    with open(os.path.join(self._dir, _LOCK_FILE), 'a') as lock:
+      fcntl.flock(lock, fcntl.LOCK_EX)
+      path = os.path.join(self._dir, _STATE_FILE)
+      old_state = _LoadFile(path, ({}, []))
+      holders, waiters = old_state
+      state = {
+          'holders': dict((link_id, tokens)
+                          for link_id, tokens in holders.items()
+                          if _IsRunning(self._dir, link_id)),
+          'waiters': [link_id for link_id in waiters
+                      if _IsRunning(self._dir, link_id)],
+      }
+      yield state
+      new_state = (state['holders'], state['waiters'])
+      if new_state != old_state:
+        wrapper_utils.WriteFileAtomically(
+            path, marshal.dumps((_STATE_VERSION, new_state)))
+
+  def _LockLinkFile(self):
+    """Creates and locks the file of this link, see _IsRunning()."""
+    links_dir = os.path.join(self._dir, _LINKS_DIR)
+    os.makedirs(links_dir, exist_ok=True)
+    # The pid is only there to tell whose file it is.
+    self._id = '%d-%s' % (os.getpid(), os.urandom(8).hex())
+    self._link_file = open(os.path.join(links_dir, self._id), 'wb')
+    fcntl.flock(self._link_file, fcntl.LOCK_EX)
+
+  def EstimateMemory(self, command):
+    """Returns how many bytes the link of |command| is expected to take."""
+    history = _LoadFile(os.path.join(self._dir, _HISTORY_FILE), {})
+    if self._output in history:
+      return history[self._output]
+    return max(_MIN_LINK_MEMORY, int(_InputSize(command) * _INPUT_SIZE_FACTOR))
+
+  def Acquire(self, command):
+    """Waits until the link of |command| fits into the budget."""
+    self._tokens = self.EstimateMemory(command)
+    self._jobs = _ParallelLTOJobs(command)
+    self._LockLinkFile()
+    while True:
+      with self._Locked() as state:
+        holders, waiters = state['holders'], state['waiters']
+        if self._id not in waiters:
+          waiters.append(self._id)
+        held = sum(holders.values())
+        if waiters[0] == self._id and (not holders or
+                                       held + self._tokens <= self._budget):
+          waiters.pop(0)
+          holders[self._id] = self._tokens
+          return
+      time.sleep(_POLL_SECONDS)
+
+  def Release(self, succeeded=True):
+    """Returns the tokens, and records the peak memory of a successful link."""
+    if self._tokens is None:
+      return
+    self._tokens = None
+    with self._Locked() as state:
+      state['holders'].pop(self._id, None)
+      if self._id in state['waiters']:
+        state['waiters'].remove(self._id)
+      peak = _PeakChildMemory() * self._jobs if succeeded else 0
+      if peak:
+        # Under the lock, so that links don't lose each other's updates.
+        history_path = os.path.join(self._dir, _HISTORY_FILE)
+        history = _LoadFile(history_path, {})
+        # marshal keeps the order of dicts, which is the order of the links.
+        history.pop(self._output, None)
+        history[self._output] = peak
+        for output in list(history)[:-_MAX_HISTORY_ENTRIES]:
+          del history[output]
+        wrapper_utils.WriteFileAtomically(
+            history_path, marshal.dumps((_STATE_VERSION, history)))
+      # No longer in the state, so nothing else looks at the file.
+      os.remove(self._link_file.name)
+    self._link_file.close()
+    self._link_file = None
+
+
+def _DefaultBudget():
+  import get_concurrent_links
+  total_memory = get_concurrent_links.GetTotalMemory()
+  if not total_memory:
+    return None
+  return get_concurrent_links.GetMemoryForLinks(total_memory)
+
+
+def AdmissionFromEnvironment(output):
+  """Returns the LinkAdmission for |output| set up in the environment, or
+  None if links aren't limited."""
+  admission_dir = os.environ.get(ADMISSION_DIR_ENV)
+  if not admission_dir or fcntl is None:
+    return None
+  if os.environ.get(BUDGET_ENV):
+    budget = wrapper_utils.ParseSize(os.environ[BUDGET_ENV])
+  else:
+    budget = _DefaultBudget()
+  if budget is None:
+    return None
+  if not os.path.isdir(admission_dir):
+    os.makedirs(admission_dir, exist_ok=True)
+  return LinkAdmission(admission_dir, budget, output)
@@ -0,0 +1,192 @@
+# Copyright 2026 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import link_admission
+import wrapper_utils
+
+_MIB = 1024 * 1024
+
+
+@unittest.skipIf(link_admission.fcntl is None, 'needs flock()')
+class LinkAdmissionTest(unittest.TestCase):
+  def setUp(self):
+    self.admission_dir = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, self.admission_dir)
+    poll = mock.patch.object(link_admission, '_POLL_SECONDS', 0.01)
+    poll.start()
+    self.addCleanup(poll.stop)
+    self.lock = threading.Lock()
+    self.running = 0
+    self.peak = 0
+    self.started = []
+
+  def _Admission(self, output, budget=1000 * _MIB, memory=256 * _MIB):
+    admission = link_admission.LinkAdmission(self.admission_dir, budget,
+                                             output)
+    admission.EstimateMemory = lambda command: memory
+    return admission
+
+  def _State(self):
+    return link_admission._LoadFile(
+        os.path.join(self.admission_dir, link_admission._STATE_FILE),
+        ({}, []))
+
+  def _WaitForWaiters(self, count):
+    while len(self._State()[1]) < count:
+      time.sleep(0.01)
+
+  def _Link(self, admission, seconds):
+    admission.Acquire([])
+    with self.lock:
+      self.started.append(admission)
+      self.running += 1
+      self.peak = max(self.peak, self.running)
+    time.sleep(seconds)
+    with self.lock:
+      self.running -= 1
+    admission.Release(succeeded=False)
+
+  def _Start(self, admission, seconds=0.2):
+    thread = threading.Thread(target=self._Link, args=(admission, seconds))
+    thread.start()
+    self.addCleanup(thread.join)
+    return thread
+
+  def test_Budget(self):
+    threads = [self._Start(self._Admission('lib%d.so' % i))
+               for i in range(6)]
+    for thread in threads:
+      thread.join()
+    # 3 * 256M fit into 1000M, 4 * 256M don't.
+    self.assertEqual(self.peak, 3)
+    self.assertEqual(self._State(), ({}, []))
+    self.assertEqual(os.listdir(os.path.join(self.admission_dir,
+                                             link_admission._LINKS_DIR)), [])
+
+  def test_AdmittedInOrder(self):
+    first = self._Admission('first', memory=1000 * _MIB)
+    first.Acquire([])
+    # The small links wait behind the large one, even though they'd fit
+    # next to the first link.
+    waiting = [self._Admission('large', memory=900 * _MIB),
+               self._Admission('small1', memory=100 * _MIB),
+               self._Admission('small2', memory=100 * _MIB)]
+    threads = []
+    for i, admission in enumerate(waiting):
+      threads.append(self._Start(admission, seconds=0.1))
+      self._WaitForWaiters(i + 1)
+    first.Release(succeeded=False)
+    for thread in threads:
+      thread.join()
+    self.assertEqual(self.started, waiting)
+    self.assertEqual(self.peak, 2)
+
+  def test_LargeLinkAdmittedAlone(self):
+    admission = self._Admission('huge', memory=4000 * _MIB)
+    admission.Acquire([])
+    self.assertEqual(len(self._State()[0]), 1)
+    admission.Release(succeeded=False)
+
+  def test_TokensOfGoneLinksAreReturned(self):
+    gone = self._Admission('gone', memory=1000 * _MIB)
+    gone.Acquire([])
+    # As if the process had died: its lock is released, but it never
+    # returned its tokens.
+    gone._link_file.close()
+    admission = self._Admission('next')
+    admission.Acquire([])
+    self.assertEqual(list(self._State()[0].values()), [256 * _MIB])
+    admission.Release(succeeded=False)
+
+  def test_WaitingDoesNotRewriteState(self):
+    first = self._Admission('first', memory=1000 * _MIB)
+    first.Acquire([])
+    thread = self._Start(self._Admission('second'))
+    self._WaitForWaiters(1)
+    with mock.patch.object(wrapper_utils, 'WriteFileAtomically') as write:
+      time.sleep(0.1)
+    self.assertFalse(write.called)
+    first.Release(succeeded=False)
+    thread.join()
+    self.assertEqual(self.peak, 1)
+
+  def test_History(self):
+    admission = link_admission.LinkAdmission(self.admission_dir, 1000 * _MIB,
+                                             'lib.so')
+    self.assertEqual(admission.EstimateMemory([]),
+                     link_admission._MIN_LINK_MEMORY)
+    admission.Acquire([])
+    with mock.patch.object(link_admission, '_PeakChildMemory',
+                           return_value=300 * _MIB):
+      admission.Release()
+    self.assertEqual(admission.EstimateMemory([]), 300 * _MIB)
+
+  def test_HistoryOfParallelLTO(self):
+    admission = link_admission.LinkAdmission(self.admission_dir, 1000 * _MIB,
+                                             'lib.so')
+    admission.Acquire(['g++', '-flto=4', '-o', 'lib.so'])
+    with mock.patch.object(link_admission, '_PeakChildMemory',
+                           return_value=300 * _MIB):
+      admission.Release()
+    self.assertEqual(admission.EstimateMemory([]), 1200 * _MIB)
+
+  def test_HistoryIsPruned(self):
+    with mock.patch.object(link_admission, '_MAX_HISTORY_ENTRIES', 3), \
+         mock.patch.object(link_admission, '_PeakChildMemory',
+                           return_value=300 * _MIB):
+      for name in ('lib0.so', 'lib1.so', 'lib2.so', 'lib0.so', 'lib3.so'):
+        admission = self._Admission(name)
+        admission.Acquire([])
+        admission.Release()
+    history = link_admission._LoadFile(
+        os.path.join(self.admission_dir, link_admission._HISTORY_FILE), {})
+    # lib1.so was linked least recently.
+    self.assertEqual([os.path.basename(path) for path in history],
+                     ['lib2.so', 'lib0.so', 'lib3.so'])
+
+  def test_ParallelLTOJobs(self):
+    with mock.patch.object(os, 'cpu_count', return_value=8):
+      for command, jobs in (
+          (['g++', '-o', 'app'], 1),
+          (['g++', '-flto=4', '-o', 'app'], 4),
+          (['g++', '-flto', '-o', 'app'], 8),
+          (['gcc', '-flto=auto'], 8),
+          (['gcc', '-flto=jobserver'], 8),
+          (['gcc', '-flto=4', '-flto-partition=one'], 1),
+          (['gcc', '-flto=4', '-fno-lto'], 1),
+          (['clang++', '-flto=thin', '-o', 'app'], 1),
+          (['/usr/bin/clang', '-flto'], 1),
+          ([], 1)):
+        self.assertEqual(link_admission._ParallelLTOJobs(command), jobs,
+                         command)
+
+
+class RunLinkTest(unittest.TestCase):
+  def test_RemoteLinksAreNotAdmitted(self):
+    admission = mock.Mock()
+    backend = mock.Mock()
+    backend.RunLink.return_value = 0
+    self.assertEqual(wrapper_utils.RunLinkWithOptionalMapFile(
+        ['ld'], backend=backend, admission=admission), 0)
+    self.assertFalse(admission.Acquire.called)
+    self.assertFalse(admission.Release.called)
+
+
+class ParseSizeTest(unittest.TestCase):
+  def test_ParseSize(self):
+    self.assertEqual(wrapper_utils.ParseSize('1000'), 1000)
+    self.assertEqual(wrapper_utils.ParseSize('500M'), 500 * _MIB)
+    self.assertEqual(wrapper_utils.ParseSize('1.5g'), 1536 * _MIB)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,48 @@
+# Copyright 2026 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Tells who is at the other end of a Unix socket.
+
+remote_exec.py's worker and wrapper_daemon.py run commands for whoever
+connects, and their clients send them their environment and files, so both
+sides only talk to processes of the same user.
+"""
+
+import os
+import struct
+import sys
+
+# The C module has all this needs, and takes a fraction of the time the socket
+# module takes to import, which matters to wrapper_daemon_client.py.
+import _socket
+
+# getsockopt() level and option for the credentials of the peer on macOS and
+# the BSDs, and the start of the struct xucred they return (cr_version and
+# cr_uid).
+_SOL_LOCAL = 0
+_LOCAL_PEERCRED = 1
+_XUCRED = struct.Struct('=II')
+_XUCRED_SIZE = 76
+
+
+def PeerUid(sock):
+  """Returns the uid of the process at the other end of the Unix socket
+  |sock|, or None if it can't be told."""
+  try:
+    if hasattr(_socket, 'SO_PEERCRED'):
+      ucred = struct.Struct('=iII')  # pid, uid, gid.
+      _, uid, _ = ucred.unpack(sock.getsockopt(
+          _socket.SOL_SOCKET, _socket.SO_PEERCRED, ucred.size))
+      return uid
+    if sys.platform == 'darwin' or 'bsd' in sys.platform:
+      xucred = sock.getsockopt(_SOL_LOCAL, _LOCAL_PEERCRED, _XUCRED_SIZE)
+      return _XUCRED.unpack(xucred[:_XUCRED.size])[1]
+  except (OSError, struct.error):
+    pass
+  return None
+
+
+def IsSameUser(sock):
+  """Returns whether the peer of the Unix socket |sock| runs as this user."""
+  return hasattr(os, 'getuid') and PeerUid(sock) == os.getuid()
@@ -0,0 +1,692 @@
+#!/usr/bin/env python
+# Copyright 2026 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Runs the commands of the gcc_toolchain.gni wrappers on an execution backend.
+
+An ExecutionBackend runs a command given the files it reads and the files it
+writes. RemoteBackend sends the inputs to a worker by content hash (uploading
+only those the worker doesn't have yet), has it run the command there and
+fetches the outputs. Compiles are preprocessed locally, like distcc does, so
+that the only input is the preprocessed source; links send every file named
+on the command line or in a response file.
+
+This script is also a stand-in for a remote execution service:
+
+  python remote_exec.py serve --socket=PATH [--root=DIR] [--jobs=N]
+
+runs a worker that accepts commands on the Unix socket PATH and runs up to N
+of them at a time. It stores inputs and outputs by content hash in DIR and
+caches the outputs of successful commands, so that running the same command
+on the same inputs again just returns them. Setting GN_BUILD_REMOTE_EXEC to
+the socket path makes gcc_compile_wrapper.py, gcc_link_wrapper.py and
+gcc_solink_wrapper.py use it.
+
+Paths are sent relative to the build directory; files given by absolute
+paths (e.g. system headers and libraries) aren't sent and must exist on the
+worker. Directories searched with relative -L flags aren't sent either.
+
+The outputs of a command are cached by the command, the digests of its
+inputs, the tool it runs (its path, size and mtime, like ccache) and the
+digests of the files named by absolute paths on its command line. Commands
+that name absolute directories (e.g. -L/usr/lib) aren't cached, since what
+they read from them isn't known.
+
+Only processes of the user running the worker may connect to it, and clients
+only talk to a worker of their own user.
+"""
+
+from __future__ import print_function
+
+import argparse
+import hashlib
+import marshal
+import os
+import shutil
+import socket
+import socketserver
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+
+import compile_cache
+import peer_credentials
+import wrapper_utils
+
+
+REMOTE_EXEC_ENV = wrapper_utils.REMOTE_EXEC_ENV
+
+_HEADER = struct.Struct('>Q')
+# Blobs are uploaded and downloaded in batches of about this many bytes.
+_BATCH_SIZE = 16 * 1024 * 1024
+# The language to compile the preprocessed output of a source as, by the
+# extension of the source.
+_PREPROCESSED_LANGUAGES = {
+    '.c': 'cpp-output',
+    '.cc': 'c++-cpp-output',
+    '.cpp': 'c++-cpp-output',
+    '.cxx': 'c++-cpp-output',
+    '.m': 'objective-c-cpp-output',
+    '.mm': 'objective-c++-cpp-output',
+    '.S': 'assembler',
+}
+# Preprocessor flags that aren't passed on when compiling preprocessed output,
+# with their value either attached or in the next argument.
+_PREPROCESSOR_FLAGS = ('-D', '-U', '-I', '-include', '-imacros', '-isystem',
+                       '-iquote', '-idirafter')
+
+
+class RemoteError(Exception):
+  """The worker couldn't be reached or failed to run a command."""
+
+
+def _Digest(data):
+  return hashlib.sha256(data).hexdigest()
+
+
+def _Send(sock, message):
+  data = marshal.dumps(message)
+  sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def _Receive(f):
+  """Reads a message from the file |f|, or returns None at the end of it."""
+  header = f.read(_HEADER.size)
+  if not header:
+    return None
+  if len(header) != _HEADER.size:
+    raise EOFError('Truncated message')
+  length, = _HEADER.unpack(header)
+  data = f.read(length)
+  if len(data) != length:
+    raise EOFError('Truncated message')
+  return marshal.loads(data)
+
+
+def _IsRelativeFile(path):
+  return path and not os.path.isabs(path) and os.path.isfile(path)
+
+
+def _WithAbsoluteTool(command):
+  """Returns |command| with the tool it runs given by an absolute path.
+
+  Tools are expected to exist on the worker rather than be sent to it.
+  """
+  if _IsRelativeFile(command[0]):
+    return [os.path.abspath(command[0])] + command[1:]
+  return list(command)
+
+
+def _LinkInputs(command):
+  """Returns the relative paths of the files a link |command| reads.
+
+  These are the arguments that name files, the values of --flag=FILE and
+  -Wl,... arguments that do, and the same in response files.
+  """
+  inputs = set()
+  args = command[1:]
+  while args:
+    arg = args.pop()
+    candidates = [arg]
+    if arg.startswith('-Wl,'):
+      candidates = arg[4:].split(',')
+    candidates += [c.split('=', 1)[1] for c in candidates if '=' in c]
+    for candidate in candidates:
+      if candidate.startswith('@') and _IsRelativeFile(candidate[1:]):
+        inputs.add(candidate[1:])
+        args.extend(wrapper_utils.ResolveRspLinks([candidate]))
+      elif _IsRelativeFile(candidate):
+        inputs.add(candidate)
+  return inputs
+
+
+def _AbsolutePaths(args):
+  """Returns the absolute paths named by |args|, like _LinkInputs()."""
+  paths = set()
+  for arg in args:
+    candidates = [arg]
+    if arg.startswith('-Wl,'):
+      candidates = arg[4:].split(',')
+    candidates += [c.split('=', 1)[1] for c in candidates if '=' in c]
+    # Flags with the path attached, e.g. -L/usr/lib.
+    candidates += [c[c.index(os.sep):] for c in candidates
+                   if c.startswith('-') and os.sep in c]
+    paths.update(c for c in candidates if os.path.isabs(c))
+  return paths
+
+
+def _LinkOutputs(command):
+  """Returns the files written by the link |command| (-o and -Wl,-Map)."""
+  outputs = []
+  for i, arg in enumerate(command):
+    if arg == '-o' and i + 1 < len(command):
+      outputs.append(command[i + 1])
+    elif arg.startswith('-Wl,-Map,'):
+      outputs.append(arg[len('-Wl,-Map,'):])
+    elif arg.startswith('-Wl,-Map='):
+      outputs.append(arg[len('-Wl,-Map='):])
+  return outputs
+
+
+def _CompileFlags(flags):
+  """Returns |flags| without those that only matter to the preprocessor."""
+  result = []
+  skip_value = False
+  for flag in flags:
+    if skip_value:
+      skip_value = False
+    elif flag in _PREPROCESSOR_FLAGS:
+      skip_value = True
+    elif not flag.startswith(_PREPROCESSOR_FLAGS):
+      result.append(flag)
+  return result
+
+
+class ExecutionBackend(object):
+  """Runs the commands of the wrappers.
+
+  Subclasses implement Run(). RunCompile() and RunLink() work out the inputs
+  and outputs of compile and link commands for it.
+  """
+
+  def Run(self, command, inputs, outputs, env=None):
+    """Runs |command| and returns (returncode, stdout, stderr).
+
+    Args:
+      command: A list containing the command and arguments.
+      inputs: Dict mapping the paths of the files |command| reads to their
+          contents, or to None for files that can be read from disk.
+      outputs: List of the paths of the files |command| writes.
+      env: Dict of environment variables to set for |command|.
+    """
+    raise NotImplementedError()
+
+  def RunCompile(self, command, scanner=None):
+    """Runs a compile |command|, passing its diagnostics on to stderr.
+
+    The source is preprocessed locally (which also writes the depfile), and
+    only the preprocessed output is compiled by Run(). Commands that can't be
+    split up that way are run locally.
+
+    Args:
+      command: A list containing the compiler and its arguments.
+      scanner: Optional wrapper_utils.ResourceIdScanner to feed the
+          diagnostics to.
+
+    Returns:
+      The return code of the compile.
+    """
+    try:
+      parsed = compile_cache.CompileCommand(command)
+    except (compile_cache.UnsupportedCommand, OSError):
+      parsed = None
+    language = parsed and _PREPROCESSED_LANGUAGES.get(
+        os.path.splitext(parsed.source)[1])
+    if not language or '-x' in parsed.flags:
+      return wrapper_utils.StreamCommandStderr(command, scanner=scanner)
+
+    preprocess_command = list(parsed.preprocess_command)
+    if parsed.depfile is not None:
+      preprocess_command += [parsed.depfile_flag or '-MMD',
+                             '-MF', parsed.depfile, '-MT', parsed.output]
+    preprocessor = subprocess.Popen(preprocess_command, stdout=subprocess.PIPE,
+                                    stderr=subprocess.PIPE)
+    preprocessed, stderr = preprocessor.communicate()
+    _WriteStderr(stderr, scanner, close=False)
+    if preprocessor.returncode:
+      if scanner is not None:
+        scanner.Close()
+      return preprocessor.returncode
+
+    # The preprocessed output takes the place of the source, so that the
+    # compiler sees the same file name.
+    compile_command = _WithAbsoluteTool(
+        parsed.prefix + _CompileFlags(parsed.flags) +
+        ['-x', language, '-c', parsed.source, '-o', parsed.output])
+    returncode, _, stderr = self.Run(compile_command,
+                                     {parsed.source: preprocessed},
+                                     [parsed.output])
+    _WriteStderr(stderr, scanner)
+    return returncode
+
+  def RunLink(self, command, env=None):
+    """Runs a link |command| and returns its return code.
+
+    Args:
+      command: A list containing the linker and its arguments.
+      env: Environment variables for the linker. Only those that differ from
+          the current environment are passed on.
+    """
+    overrides = dict((name, value) for name, value in (env or {}).items()
+                     if os.environ.get(name) != value)
+    outputs = _LinkOutputs(command)
+    # Outputs left by the last run of the link aren't inputs of this one.
+    inputs = dict((path, None) for path in _LinkInputs(command)
+                  if path not in outputs)
+    returncode, stdout, stderr = self.Run(_WithAbsoluteTool(command), inputs,
+                                          outputs, overrides)
+    sys.stdout.buffer.write(stdout)
+    sys.stdout.buffer.flush()
+    _WriteStderr(stderr)
+    return returncode
+
+
+def _WriteStderr(stderr, scanner=None, close=True):
+  sys.stderr.buffer.write(stderr)
+  sys.stderr.buffer.flush()
+  if scanner is not None:
+    for line in stderr.splitlines(True):
+      scanner.Feed(line)
+    if close:
+      scanner.Close()
+
+
+class LocalBackend(ExecutionBackend):
+  """Runs commands on this machine, like the wrappers do without a backend."""
+
+  def Run(self, command, inputs, outputs, env=None):
+    child_env = None
+    if env:
+      child_env = dict(os.environ)
+      child_env.update(env)
+    child = subprocess.Popen(command, stdout=subprocess.PIPE,
+                             stderr=subprocess.PIPE, env=child_env)
+    stdout, stderr = child.communicate()
+    return child.returncode, stdout, stderr
+
+  def RunCompile(self, command, scanner=None):
+    return wrapper_utils.StreamCommandStderr(command, scanner=scanner)
+
+  def RunLink(self, command, env=None):
+    return subprocess.call(command, env=env)
+
+
+class RemoteBackend(ExecutionBackend):
+  """Runs commands on a worker listening on a Unix socket.
+
+  Compiles and links that can't be run on the worker (e.g. because it isn't
+  running) are run locally after printing a warning.
+  """
+
+  def __init__(self, socket_path):
+    self._socket_path = socket_path
+    self._socket = None
+    self._reader = None
+
+  def RunCompile(self, command, scanner=None):
+    try:
+      return super(RemoteBackend, self).RunCompile(command, scanner)
+    except (RemoteError, EnvironmentError, EOFError) as e:
+      print('Running locally: %s' % e, file=sys.stderr)
+      return wrapper_utils.StreamCommandStderr(command, scanner=scanner)
+
+  def RunLink(self, command, env=None):
+    try:
+      return super(RemoteBackend, self).RunLink(command, env)
+    except (RemoteError, EnvironmentError, EOFError) as e:
+      print('Running locally: %s' % e, file=sys.stderr)
+      return subprocess.call(command, env=env)
+
+  def Run(self, command, inputs, outputs, env=None):
+    blobs = {}
+    tree = {}
+    for path, contents in inputs.items():
+      if contents is None:
+        with open(path, 'rb') as f:
+          contents = f.read()
+      digest = _Digest(contents)
+      blobs[digest] = contents
+      tree[path] = (digest, os.access(path, os.X_OK))
+
+    missing = self._Call({'op': 'find_missing', 'digests': list(blobs)})
+    self._Upload(dict((digest, blobs[digest])
+                      for digest in missing['digests']))
+    reply = self._Call({'op': 'execute', 'command': list(command),
+                        'inputs': tree, 'outputs': list(outputs),
+                        'env': dict(env or {})})
+    self._Download(reply['outputs'])
+    return reply['returncode'], reply['stdout'], reply['stderr']
+
+  def Stats(self):
+    """Returns the statistics of the worker."""
+    return self._Call({'op': 'stats'})['stats']
+
+  def _Call(self, message):
+    if self._socket is None:
+      self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+      try:
+        self._socket.connect(self._socket_path)
+      except socket.error as e:
+        self._socket = None
+        raise RemoteError('Cannot connect to %s: %s' % (self._socket_path, e))
+      if not peer_credentials.IsSameUser(self._socket):
+        self._socket.close()
+        self._socket = None
+        raise RemoteError('%s is listened on by another user' %
+                          self._socket_path)
+      self._reader = self._socket.makefile('rb')
+    _Send(self._socket, message)
+    reply = _Receive(self._reader)
+    if reply is None:
+      raise RemoteError('The worker closed the connection')
+    if 'error' in reply:
+      raise RemoteError(reply['error'])
+    return reply
+
+  def _Upload(self, blobs):
+    batch = {}
+    size = 0
+    for digest, contents in blobs.items():
+      batch[digest] = contents
+      size += len(contents)
+      if size >= _BATCH_SIZE:
+        self._Call({'op': 'upload', 'blobs': batch})
+        batch = {}
+        size = 0
+    if batch:
+      self._Call({'op': 'upload', 'blobs': batch})
+
+  def _Download(self, outputs):
+    """Writes the |outputs| of a command.
+
+    Args:
+      outputs: Dict mapping the path of each output to a tuple of its digest
+          and whether it's executable.
+    """
+    digests = set(digest for digest, _ in outputs.values())
+    if not digests:
+      return
+    blobs = self._Call({'op': 'download', 'digests': list(digests)})['blobs']
+    for path, (digest, executable) in outputs.items():
+      wrapper_utils.WriteFileAtomically(path, blobs[digest],
+                                        executable=executable)
+
+
+def BackendFromEnvironment():
+  """Returns the backend set up by GN_BUILD_REMOTE_EXEC, or None."""
+  socket_path = os.environ.get(REMOTE_EXEC_ENV)
+  return RemoteBackend(socket_path) if socket_path else None
+
+
+class _Worker(object):
+  """Runs commands for clients and stores their inputs and outputs.
+
+  The root directory contains
+    cas/: Files by the hex SHA-256 of their contents.
+    actions/: The outputs of each successful command, by a digest of the
+        command, its inputs and its environment.
+    exec/: The directories commands run in.
+  """
+
+  def __init__(self, root, jobs):
+    self._root = root
+    self._jobs = threading.BoundedSemaphore(jobs)
+    self._stats_lock = threading.Lock()
+    # Digests of the files named by absolute paths, by path, size and mtime.
+    self._absolute_digests = {}
+    self.stats = dict.fromkeys(
+        ('executions', 'action_cache_hits', 'blobs_uploaded',
+         'bytes_uploaded', 'blobs_deduplicated', 'bytes_downloaded'), 0)
+    for name in ('cas', 'actions', 'exec'):
+      path = os.path.join(root, name)
+      if not os.path.isdir(path):
+        os.makedirs(path)
+
+  def _Count(self, **changes):
+    with self._stats_lock:
+      for name, change in changes.items():
+        self.stats[name] += change
+
+  def _BlobPath(self, digest):
+    if len(digest) != 64 or not all(c in '0123456789abcdef' for c in digest):
+      raise ValueError('Bad digest %r' % digest)
+    return os.path.join(self._root, 'cas', digest)
+
+  def Handle(self, message):
+    op = message.get('op')
+    if op == 'find_missing':
+      missing = [digest for digest in message['digests']
+                 if not os.path.exists(self._BlobPath(digest))]
+      self._Count(blobs_deduplicated=len(message['digests']) - len(missing))
+      return {'digests': missing}
+    if op == 'upload':
+      for digest, contents in message['blobs'].items():
+        if _Digest(contents) != digest:
+          raise ValueError('Blob does not match digest %s' % digest)
+        self._StoreBlob(digest, contents)
+        self._Count(blobs_uploaded=1, bytes_uploaded=len(contents))
+      return {}
+    if op == 'download':
+      blobs = {}
+      for digest in message['digests']:
+        with open(self._BlobPath(digest), 'rb') as f:
+          blobs[digest] = f.read()
+        self._Count(bytes_downloaded=len(blobs[digest]))
+      return {'blobs': blobs}
+    if op == 'execute':
+      return self._Execute(message['command'], message['inputs'],
+                           message['outputs'], message['env'])
+    if op == 'stats':
+      with self._stats_lock:
+        return {'stats': dict(self.stats)}
+    raise ValueError('Unknown operation %r' % op)
+
+  def _StoreBlob(self, digest, contents):
+    path = self._BlobPath(digest)
+    if not os.path.exists(path):
+      wrapper_utils.WriteFileAtomically(path, contents)
+      # Blobs are hard linked into the directories commands run in.
+      os.chmod(path, 0o555)
+
+  def _ToolIdentity(self, tool, inputs, path):
+    """Returns what identifies the |tool| a command runs.
+
+    Args:
+      tool: The program, as given on the command line.
+      inputs: The inputs of the command, for tools sent along with it.
+      path: The PATH the command runs with.
+    """
+    if tool in inputs:
+      return inputs[tool][0]
+    if os.path.dirname(tool):
+      resolved = tool if os.path.isabs(tool) else None
+    else:
+      resolved = shutil.which(tool, path=path)
+    if not resolved or not os.path.isfile(resolved):
+      raise ValueError('Cannot find %s' % tool)
+    return compile_cache._FileIdentity(resolved)
+
+  def _AbsoluteDigest(self, path):
+    """Returns the digest of the file at the absolute |path|, or None if it
+    doesn't exist."""
+    try:
+      st = os.stat(path)
+    except OSError:
+      return None
+    version = (path, st.st_size, st.st_mtime_ns)
+    digest = self._absolute_digests.get(version)
+    if digest is None:
+      digest = compile_cache._HashFile(path)[0]
+      self._absolute_digests[version] = digest
+    return digest
+
+  def _ActionKey(self, command, inputs, outputs, env, path):
+    """Returns the key to cache the outputs of a command by, or None if they
+    can't be cached."""
+    tools = [self._ToolIdentity(command[0], inputs, path)]
+    if (os.path.basename(command[0]) in compile_cache._LAUNCHERS and
+        len(command) > 1):
+      tools.append(self._ToolIdentity(command[1], inputs, path))
+    args = list(command[1:])
+    for arg in command[1:]:
+      if arg.startswith('@') and arg[1:] in inputs:
+        with open(self._BlobPath(inputs[arg[1:]][0]), 'rb') as f:
+          args += wrapper_utils.SplitResponseFile(
+              f.read().decode('utf-8', 'surrogateescape'))
+    absolute = []
+    for absolute_path in sorted(_AbsolutePaths(args)):
+      if os.path.isdir(absolute_path):
+        return None
+      absolute.append((absolute_path, self._AbsoluteDigest(absolute_path)))
+    return _Digest(marshal.dumps(
+        (command, tools, sorted(inputs.items()), absolute, outputs,
+         sorted(env.items()))))
+
+  def _Execute(self, command, inputs, outputs, env):
+    child_env = dict(os.environ)
+    child_env.update(env)
+    action_key = self._ActionKey(command, inputs, outputs, env,
+                                 child_env.get('PATH'))
+    action_path = None
+    if action_key is not None:
+      action_path = os.path.join(self._root, 'actions', action_key)
+      try:
+        with open(action_path, 'rb') as f:
+          result = marshal.loads(f.read())
+        self._Count(action_cache_hits=1)
+        return result
+      except (EnvironmentError, EOFError, ValueError):
+        pass
+
+    # Relative paths may go up from the build directory (e.g. to the source
+    # directory), so run the command deep enough below the execution root.
+    paths = [os.path.normpath(path) for path in list(inputs) + outputs]
+    if any(os.path.isabs(path) for path in paths):
+      raise ValueError('Inputs and outputs must be relative paths')
+    depth = max([0] + [path.split(os.sep).count(os.pardir) for path in paths])
+    exec_root = tempfile.mkdtemp(dir=os.path.join(self._root, 'exec'))
+    try:
+      cwd = os.path.join(exec_root, *(['b'] * (depth + 1)))
+      os.makedirs(cwd)
+      for path, (digest, _) in inputs.items():
+        dest = os.path.join(cwd, path)
+        directory = os.path.dirname(dest)
+        if not os.path.isdir(directory):
+          os.makedirs(directory)
+        try:
+          os.link(self._BlobPath(digest), dest)
+        except OSError:
+          shutil.copyfile(self._BlobPath(digest), dest)
+          os.chmod(dest, 0o555)
+      for path in outputs:
+        directory = os.path.dirname(os.path.join(cwd, path))
+        if not os.path.isdir(directory):
+          os.makedirs(directory)
+
+      with self._jobs:
+        child = subprocess.Popen(command, cwd=cwd, env=child_env,
+                                 stdout=subprocess.PIPE,
+                                 stderr=subprocess.PIPE)
+        stdout, stderr = child.communicate()
+      self._Count(executions=1)
+
+      output_digests = {}
+      for path in outputs:
+        output_path = os.path.join(cwd, path)
+        try:
+          with open(output_path, 'rb') as f:
+            contents = f.read()
+        except EnvironmentError:
+          continue  # Not written, e.g. because the command failed.
+        digest = _Digest(contents)
+        self._StoreBlob(digest, contents)
+        output_digests[path] = (digest, os.access(output_path, os.X_OK))
+    finally:
+      shutil.rmtree(exec_root, ignore_errors=True)
+
+    result = {'returncode': child.returncode, 'stdout': stdout,
+              'stderr': stderr, 'outputs': output_digests}
+    if child.returncode == 0 and action_path is not None:
+      wrapper_utils.WriteFileAtomically(action_path, marshal.dumps(result))
+    return result
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+  def handle(self):
+    # The worker runs any command it's sent.
+    if not peer_credentials.IsSameUser(self.request):
+      return
+    while True:
+      try:
+        message = _Receive(self.rfile)
+      except (EOFError, ValueError):
+        return
+      if message is None:
+        return
+      try:
+        reply = self.server.worker.Handle(message)
+      except (EnvironmentError, ValueError, KeyError, TypeError) as e:
+        reply = {'error': '%s: %s' % (type(e).__name__, e)}
+      _Send(self.request, reply)
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+  daemon_threads = True
+
+
+def MakeServer(socket_path, root, jobs):
+  """Returns a worker listening on the Unix socket |socket_path|.
+
+  Call serve_forever() on it to handle requests.
+
+  Args:
+    socket_path: Path of the socket to listen on.
+    root: Directory to store files and run commands in.
+    jobs: The maximum number of commands to run at a time.
+  """
+  if os.path.exists(socket_path):
+    os.unlink(socket_path)
+  old_umask = os.umask(0o177)  # Only this user may run commands.
+  try:
+    server = _Server(socket_path, _Handler)
+  finally:
+    os.umask(old_umask)
+  server.worker = _Worker(root, jobs)
+  return server
+
+
+def main():
+  parser = argparse.ArgumentParser(
+      description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  subparsers = parser.add_subparsers(dest='command')
+  subparsers.required = True
+  serve = subparsers.add_parser('serve', help='Run a worker')
+  serve.add_argument('--socket', required=True,
+                     help='Unix socket to listen on', metavar='PATH')
+  serve.add_argument('--root',
+                     help=('Directory to store files and run commands in '
+                           '(default: a temporary directory)'),
+                     metavar='DIR')
+  serve.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+                     help='Commands to run at a time (default: CPU count)')
+  stats = subparsers.add_parser('stats', help='Print the stats of a worker')
+  stats.add_argument('--socket', required=True,
+                     help='Unix socket the worker listens on', metavar='PATH')
+  args = parser.parse_args()
+
+  if args.command == 'stats':
+    stats = RemoteBackend(args.socket).Stats()
+    for name in sorted(stats):
+      print('%-20s %d' % (name, stats[name]))
+    return 0
+
+  root = args.root or tempfile.mkdtemp(prefix='remote_exec.')
+  server = MakeServer(args.socket, root, args.jobs)
+  try:
+    server.serve_forever()
+  except KeyboardInterrupt:
+    pass
+  finally:
+    server.server_close()
+    os.unlink(args.socket)
+    if not args.root:
+      shutil.rmtree(root, ignore_errors=True)
+  return 0
+
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,195 @@
+# Copyright 2026 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import remote_exec
+
+# Writes the file given by -o with its version and the inputs it's given.
+_FAKE_TOOL = '''
+import sys
+VERSION = %d
+args = sys.argv[1:]
+output = args[args.index('-o') + 1]
+del args[args.index('-o'):args.index('-o') + 2]
+for arg in list(args):
+  if arg.startswith('@'):
+    args.remove(arg)
+    args += open(arg[1:]).read().split()
+with open(output, 'w') as f:
+  f.write('version %%d\\n' %% VERSION)
+  for arg in args:
+    if not arg.startswith('-'):
+      f.write(open(arg).read())
+print('linked ' + output)
+'''
+
+
+class RemoteExecTest(unittest.TestCase):
+  def setUp(self):
+    self.root = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, self.root)
+    os.makedirs(os.path.join(self.root, 'out'))
+    old_cwd = os.getcwd()
+    os.chdir(os.path.join(self.root, 'out'))
+    self.addCleanup(os.chdir, old_cwd)
+    self.output = tempfile.TemporaryFile()
+    self.addCleanup(self.output.close)
+    for name in ('stdout', 'stderr'):
+      stream = mock.patch.object(sys, name, mock.Mock(buffer=self.output))
+      stream.start()
+      self.addCleanup(stream.stop)
+
+    socket_path = os.path.join(self.root, 'socket')
+    server = remote_exec.MakeServer(socket_path,
+                                    os.path.join(self.root, 'worker'), 2)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    self.addCleanup(server.server_close)
+    self.addCleanup(thread.join)
+    self.addCleanup(server.shutdown)
+    self.backend = remote_exec.RemoteBackend(socket_path)
+    self.addCleanup(self._Disconnect)
+
+    self.tool = os.path.join(self.root, 'tool')
+    self._WriteTool(1)
+    self._Write('a.o', 'a\n')
+    self._Write('b.o', 'b\n')
+    self._Write('link.rsp', 'b.o\n')
+
+  def _Disconnect(self):
+    if self.backend._socket is not None:
+      self.backend._reader.close()
+      self.backend._socket.close()
+
+  def _Write(self, path, contents):
+    with open(path, 'w') as f:
+      f.write(contents)
+
+  def _Read(self, path):
+    with open(path) as f:
+      return f.read()
+
+  def _WriteTool(self, version):
+    self._Write(self.tool, '#!%s\n%s' % (sys.executable, _FAKE_TOOL % version))
+    os.chmod(self.tool, 0o755)
+    # The tool is identified by its size and mtime.
+    os.utime(self.tool, ns=(version, version))
+
+  def _Link(self, *args):
+    return self.backend.RunLink([self.tool, '-o', 'out.so', 'a.o',
+                                 '@link.rsp'] + list(args))
+
+  def _Stats(self):
+    return self.backend.Stats()
+
+  def test_Link(self):
+    self.assertEqual(self._Link(), 0)
+    self.assertEqual(self._Read('out.so'), 'version 1\na\nb\n')
+    stats = self._Stats()
+    self.assertEqual(stats['executions'], 1)
+    self.assertEqual(stats['blobs_uploaded'], 3)
+    self.output.seek(0)
+    self.assertEqual(self.output.read(), b'linked out.so\n')
+
+    # The output of the last run isn't sent.
+    self._Write('out.so', 'old\n')
+    self.assertEqual(self._Link(), 0)
+    self.assertEqual(self._Read('out.so'), 'version 1\na\nb\n')
+    stats = self._Stats()
+    self.assertEqual(stats['executions'], 1)
+    self.assertEqual(stats['action_cache_hits'], 1)
+    self.assertEqual(stats['blobs_uploaded'], 3)
+    self.assertEqual(stats['blobs_deduplicated'], 3)
+
+  def test_ChangedInputMisses(self):
+    self._Link()
+    self._Write('b.o', 'changed\n')
+    self._Link()
+    self.assertEqual(self._Read('out.so'), 'version 1\na\nchanged\n')
+    self.assertEqual(self._Stats()['executions'], 2)
+
+  def test_ChangedToolMisses(self):
+    self._Link()
+    self._WriteTool(2)
+    self._Link()
+    self.assertEqual(self._Read('out.so'), 'version 2\na\nb\n')
+    self.assertEqual(self._Stats()['executions'], 2)
+
+  def test_ChangedAbsoluteInputMisses(self):
+    library = os.path.join(self.root, 'libsystem.a')
+    self._Write(library, 'system\n')
+    self._Link(library)
+    self._Write(library, 'updated\n')
+    self._Link(library)
+    self.assertEqual(self._Read('out.so'), 'version 1\na\nupdated\nb\n')
+    self.assertEqual(self._Stats()['executions'], 2)
+
+    # Also when it's named in a response file.
+    self._Write('link.rsp', 'b.o %s\n' % library)
+    self._Link()
+    self._Write(library, 'again\n')
+    self._Link()
+    self.assertEqual(self._Read('out.so'), 'version 1\na\nb\nagain\n')
+    self.assertEqual(self._Stats()['executions'], 4)
+
+  def test_AbsoluteDirectoriesAreNotCached(self):
+    self._Link('-L' + self.root)
+    self._Link('-L' + self.root)
+    stats = self._Stats()
+    self.assertEqual(stats['executions'], 2)
+    self.assertEqual(stats['action_cache_hits'], 0)
+
+  def test_FailedCommandsAreNotCached(self):
+    os.remove('b.o')
+    self._Write('link.rsp', 'missing.o\n')
+    self.assertNotEqual(self._Link(), 0)
+    self.assertNotEqual(self._Link(), 0)
+    self.assertEqual(self._Stats()['executions'], 2)
+
+  @unittest.skipUnless(shutil.which('gcc'), 'needs gcc')
+  def test_Compile(self):
+    os.makedirs('include')
+    self._Write('include/a.h', 'int a_func(void) { return 1; }\n')
+    self._Write('a.c', '#include "a.h"\nint main_func(void) { return 0; }\n')
+    command = ['gcc', '-MMD', '-MF', 'a.o.d', '-Iinclude', '-c', 'a.c', '-o',
+               'a.o']
+    self.assertEqual(self.backend.RunCompile(command), 0)
+    with open('a.o', 'rb') as f:
+      self.assertIn(b'a_func', f.read())
+    self.assertIn('include/a.h', self._Read('a.o.d'))
+    stats = self._Stats()
+    self.assertEqual(stats['executions'], 1)
+    # Only the preprocessed source is sent.
+    self.assertEqual(stats['blobs_uploaded'], 1)
+
+    os.remove('a.o')
+    self.assertEqual(self.backend.RunCompile(command), 0)
+    self.assertTrue(os.path.exists('a.o'))
+    self.assertEqual(self._Stats()['action_cache_hits'], 1)
+
+    self._Write('include/a.h', 'int b_func(void) { return 1; }\n')
+    self.assertEqual(self.backend.RunCompile(command), 0)
+    with open('a.o', 'rb') as f:
+      self.assertIn(b'b_func', f.read())
+    self.assertEqual(self._Stats()['executions'], 2)
+
+  @unittest.skipUnless(shutil.which('gcc'), 'needs gcc')
+  def test_CompileError(self):
+    self._Write('a.c', 'int main_func(void) { return undeclared; }\n')
+    command = ['gcc', '-MMD', '-MF', 'a.o.d', '-c', 'a.c', '-o', 'a.o']
+    self.assertNotEqual(self.backend.RunCompile(command), 0)
+    self.output.seek(0)
+    self.assertIn(b'undeclared', self.output.read())
+    self.assertEqual(self._Stats()['executions'], 1)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,682 @@
+#!/usr/bin/env python
+# Copyright 2026 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Measures the work the gcc_toolchain.gni wrappers do around each tool.
+
+Run with:
+  python wrapper_benchmark.py toc [--repeat=N] [--readelf=PATH] [--nm=PATH]
+      FILE_OR_DIR ...
+  python wrapper_benchmark.py gzip [--repeat=N] [--size=MB | --input=FILE]
+      [--level=N] [--threads=N,...]
+  python wrapper_benchmark.py rsp [--repeat=N] [--size=MB | --input=FILE]
+  python wrapper_benchmark.py remote [--sources=N] [--jobs=N] [--cc=PATH]
+  python wrapper_benchmark.py daemon [--actions=N]
+  python wrapper_benchmark.py startup [--repeat=N] [--scale=X] [SCRIPT ...]
+  python wrapper_benchmark.py ar [--repeat=N] [--objects=N] [--object-size=KB]
+      [--ar=PATH] [--cc=PATH]
+
+toc: Generates the .TOC of each given shared object (or of each one found in
+    the given directories) like gcc_solink_wrapper.py does, both by running
+    readelf and nm and by reading the file directly. Reports the time taken
+    by each and any files for which the two differ.
+
+gzip: Compresses a linker map file (a synthetic one by default) like the link
+    wrappers do, with GzipFile and with ParallelGzip() using an increasing
+    number of threads. Reports the time taken, the speedup over one thread
+    and the compression ratio.
+
+rsp: Tokenizes a response file (a synthetic one like GN writes for a large
+    solink by default) with shlex.split() and with SplitResponseFile(), and
+    times ResolveRspLinks() when the tokens are already cached in the process
+    and in a GN_BUILD_RSP_CACHE_DIR directory.
+
+remote: Compiles synthetic sources that share headers locally and through a
+    remote_exec.py worker started on a Unix socket, first with an empty
+    worker and then again once it has cached the results. Reports the time
+    taken and what the worker had to upload and run.
+
+daemon: Runs gcc_link_wrapper.py with a trivial link command over and over,
+    directly, through wrapper_daemon_client.py without a daemon and through
+    a wrapper_daemon.py started for the benchmark, taking turns. Reports the
+    median time of an action in each mode.
+
+startup: Imports each wrapper that runs for every action (or the given ones)
+    in a fresh interpreter with -X importtime, and reports the time its
+    imports take. Fails if any of them takes longer than its budget (times
+    --scale, for slower machines), listing the modules that cost the most.
+
+ar: Archives synthetic objects like gcc_ar_wrapper.py does, by deleting the
+    archive and running ar and with ar_writer.py, both from scratch and
+    incrementally after touching every object and after changing the one in
+    the middle. Checks that both write the same archive.
+"""
+
+from __future__ import print_function
+
+import argparse
+import gzip
+import io
+import locale
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import timeit
+
+import ar_writer
+import elf_toc
+import gcc_solink_wrapper
+import remote_exec
+import wrapper_utils
+
+
+# The scripts that run for every action, relative to this directory, and the
+# most time their imports may take in milliseconds. Everything a script only
+# needs on some paths (the compile cache, remote execution, ...) should be
+# imported where it's used.
+_STARTUP_BUDGETS = {
+    'gcc_compile_wrapper.py': 35,
+    'gcc_link_wrapper.py': 35,
+    'gcc_solink_wrapper.py': 40,
+    'gcc_ar_wrapper.py': 35,
+    'wrapper_daemon_client.py': 5,
+    os.path.join('apple', 'filter_libtool.py'): 30,
+    os.path.join('apple', 'linker_driver.py'): 30,
+}
+
+
+def _Measure(func, repeat):
+  """Returns the best wall time of |repeat| calls to |func|."""
+  best = None
+  for _ in range(repeat):
+    start = timeit.default_timer()
+    func()
+    elapsed = timeit.default_timer() - start
+    if best is None or elapsed < best:
+      best = elapsed
+  return best
+
+
+def _FindSharedObjects(paths):
+  """Returns the ELF shared objects given by |paths|, or found below them."""
+  found = []
+  for path in paths:
+    if os.path.isdir(path):
+      for root, _, files in os.walk(path):
+        found.extend(os.path.join(root, name) for name in sorted(files)
+                     if '.so' in name)
+    else:
+      found.append(path)
+  result = []
+  for path in found:
+    if os.path.islink(path) or not os.path.isfile(path):
+      continue
+    with open(path, 'rb') as f:
+      if f.read(4) == b'\x7fELF':
+        result.append(path)
+  return result
+
+
+def _BenchmarkTOC(args):
+  # Same as gcc_solink_wrapper.py.
+  try:
+    locale.setlocale(locale.LC_COLLATE, '')
+  except locale.Error:
+    pass
+
+  sofiles = _FindSharedObjects(args.paths)
+  if not sofiles:
+    print('No shared objects found.', file=sys.stderr)
+    return 1
+
+  tool_times = []
+  reader_times = []
+  unsupported = []
+  mismatches = []
+  for sofile in sofiles:
+    tool_args = argparse.Namespace(readelf=args.readelf, nm=args.nm,
+                                   sofile=sofile, toc_from_tools=True)
+    try:
+      expected = gcc_solink_wrapper.CollectTOC(tool_args)[1]
+    except UnicodeDecodeError:
+      continue  # The tools' output isn't text either.
+    try:
+      toc = elf_toc.ReadTOC(sofile)
+    except elf_toc.ElfError as e:
+      unsupported.append('%s: %s' % (sofile, e))
+      continue
+    if toc != expected:
+      mismatches.append(sofile)
+      continue
+    tool_times.append(_Measure(
+        lambda: gcc_solink_wrapper.CollectTOC(tool_args), args.repeat))
+    reader_times.append(_Measure(lambda: elf_toc.ReadTOC(sofile),
+                                 args.repeat))
+
+  for line in unsupported:
+    print('Falls back to the tools: ' + line)
+  for sofile in mismatches:
+    print('TOC differs: ' + sofile)
+  if tool_times:
+    tools = sum(tool_times)
+    reader = sum(reader_times)
+    print('%d files: readelf + nm %.3f s (%.2f ms per file), '
+          'elf_toc %.3f s (%.2f ms per file), %.1fx faster' % (
+              len(tool_times), tools, tools * 1000 / len(tool_times), reader,
+              reader * 1000 / len(reader_times), tools / reader))
+  return 1 if mismatches else 0
+
+
+def _MakeMapFile(size):
+  """Returns the bytes of a GNU ld map file of about |size| bytes."""
+  lines = []
+  total = 0
+  i = 0
+  address = 0x401000
+  while total < size:
+    line = (' .text._ZN4base8internal%dTask%dRunEv\n'
+            '                0x%016x       0x%x obj/base/base/task_%d.o\n' % (
+                i % 1000, i, address, 16 + i % 700, i % 3000))
+    lines.append(line)
+    total += len(line)
+    address += 16 + i % 700
+    i += 1
+  return ''.join(lines).encode('ascii')
+
+
+def _BenchmarkGzip(args):
+  if args.input:
+    with open(args.input, 'rb') as f:
+      data = f.read()
+  else:
+    data = _MakeMapFile(int(args.size * 1024 * 1024))
+  megabytes = len(data) / (1024.0 * 1024.0)
+
+  def Report(name, func, single_thread_time=None):
+    output = io.BytesIO()
+    func(io.BytesIO(data), output)
+    if gzip.GzipFile(fileobj=io.BytesIO(output.getvalue())).read() != data:
+      print('%s: output does not decompress to the input' % name)
+      return None
+    elapsed = max(_Measure(lambda: func(io.BytesIO(data), io.BytesIO()),
+                           args.repeat), 1e-9)
+    line = '%s: %.1f MB in %.3f s (%.1f MB/s), ratio %.2f' % (
+        name, megabytes, elapsed, megabytes / elapsed,
+        float(len(data)) / len(output.getvalue()))
+    if single_thread_time:
+      line += ', %.2fx the speed of 1 thread' % (single_thread_time / elapsed)
+    print(line)
+    return elapsed
+
+  def GzipFile(f_in, f_out):
+    with gzip.GzipFile(fileobj=f_out, mode='wb',
+                       compresslevel=args.level) as f:
+      f.write(f_in.read())
+
+  Report('GzipFile', GzipFile)
+  single_thread_time = None
+  for threads in args.threads:
+    elapsed = Report(
+        'ParallelGzip, %d threads' % threads,
+        lambda f_in, f_out: wrapper_utils.ParallelGzip(f_in, f_out, args.level,
+                                                      threads),
+        single_thread_time)
+    if elapsed is None:
+      return 1
+    if threads == 1:
+      single_thread_time = elapsed
+  print('(%d CPUs available)' % (os.cpu_count() or 1))
+  return 0
+
+
+def _MakeRspFile(size):
+  """Returns the contents of a solink response file of about |size| bytes."""
+  items = ['-Wl,--whole-archive']
+  total = 0
+  i = 0
+  while total < size:
+    if i % 50 == 0:
+      # GN escapes the characters the shell would interpret.
+      item = 'obj/third_party/foo\\ bar/src_%d.o' % i
+    elif i % 97 == 0:
+      item = "'-DDEFINE_%d=\"value %d\"'" % (i, i)
+    else:
+      item = 'obj/components/module_%d/source_file_%d.o' % (i % 300, i)
+    items.append(item)
+    total += len(item) + 1
+    i += 1
+  items += ['-Wl,--no-whole-archive', '-ldl', '-lpthread']
+  return ' '.join(items) + '\n'
+
+
+def _BenchmarkRsp(args):
+  if args.input:
+    with open(args.input, 'r') as f:
+      text = f.read()
+  else:
+    text = _MakeRspFile(int(args.size * 1024 * 1024))
+  megabytes = len(text) / (1024.0 * 1024.0)
+
+  expected = shlex.split(text)
+  if wrapper_utils.SplitResponseFile(text) != expected:
+    print('SplitResponseFile: tokens differ from shlex.split()')
+    return 1
+
+  def Report(name, func, reference_time=None):
+    elapsed = max(_Measure(func, args.repeat), 1e-9)
+    line = '%s: %.1f MB in %.4f s (%.1f MB/s)' % (name, megabytes, elapsed,
+                                                 megabytes / elapsed)
+    if reference_time:
+      line += ', %.1fx the speed of shlex.split()' % (reference_time / elapsed)
+    print(line)
+    return elapsed
+
+  shlex_time = Report('shlex.split', lambda: shlex.split(text), None)
+  Report('SplitResponseFile', lambda: wrapper_utils.SplitResponseFile(text),
+         shlex_time)
+
+  tmp_dir = tempfile.mkdtemp()
+  saved_cache_dir = os.environ.get(wrapper_utils._RSP_CACHE_DIR_ENV)
+  try:
+    rspfile = os.path.join(tmp_dir, 'lib.so.rsp')
+    with open(rspfile, 'w') as f:
+      f.write(text)
+    inputs = ['@' + rspfile]
+    os.environ[wrapper_utils._RSP_CACHE_DIR_ENV] = os.path.join(tmp_dir,
+                                                                'cache')
+    if wrapper_utils.ResolveRspLinks(inputs) != set(expected):
+      print('ResolveRspLinks: tokens differ from shlex.split()')
+      return 1
+    Report('ResolveRspLinks, cached in process',
+           lambda: wrapper_utils.ResolveRspLinks(inputs), shlex_time)
+
+    def FromCacheDir():
+      # Like a new process given the response file ninja just wrote again.
+      wrapper_utils._rsp_cache.clear()
+      os.utime(rspfile, None)
+      wrapper_utils.ResolveRspLinks(inputs)
+
+    Report('ResolveRspLinks, cached in %s' % wrapper_utils._RSP_CACHE_DIR_ENV,
+           FromCacheDir, shlex_time)
+  finally:
+    if saved_cache_dir is None:
+      del os.environ[wrapper_utils._RSP_CACHE_DIR_ENV]
+    else:
+      os.environ[wrapper_utils._RSP_CACHE_DIR_ENV] = saved_cache_dir
+    shutil.rmtree(tmp_dir)
+  return 0
+
+
+def _MakeSources(root, count):
+  """Writes |count| C++ sources sharing a header below |root|.
+
+  Returns:
+    The build directory to compile in and the compile commands, relative to
+    it.
+  """
+  src = os.path.join(root, 'src')
+  out = os.path.join(root, 'out')
+  os.makedirs(src)
+  os.makedirs(os.path.join(out, 'obj'))
+  with open(os.path.join(src, 'common.h'), 'w') as f:
+    f.write('#include <map>\n#include <string>\n#include <vector>\n')
+    for i in range(200):
+      f.write('inline int Common%d(int x) { return x * %d + 1; }\n' % (i, i))
+  commands = []
+  for i in range(count):
+    with open(os.path.join(src, 'source_%d.cc' % i), 'w') as f:
+      f.write('#include "common.h"\n'
+              'std::map<std::string, std::vector<int>> Make%d() {\n'
+              '  return {{"%d", {Common%d(%d)}}};\n}\n' % (i, i, i % 200, i))
+    obj = 'obj/source_%d.o' % i
+    commands.append(['-MMD', '-MF', obj + '.d', '-I../src', '-O1', '-c',
+                     '../src/source_%d.cc' % i, '-o', obj])
+  return out, commands
+
+
+def _BenchmarkRemote(args):
+  tmp_dir = tempfile.mkdtemp()
+  cwd = os.getcwd()
+  try:
+    out, commands = _MakeSources(tmp_dir, args.sources)
+    commands = [[args.cc] + command for command in commands]
+    socket_path = os.path.join(tmp_dir, 'worker.sock')
+    server = remote_exec.MakeServer(socket_path, os.path.join(tmp_dir, 'root'),
+                                    args.jobs)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    os.chdir(out)
+    try:
+      def CompileAll(backend):
+        start = timeit.default_timer()
+        for command in commands:
+          if backend.RunCompile(command):
+            print('Compile failed: %s' % ' '.join(command))
+            return None
+        return timeit.default_timer() - start
+
+      local_time = CompileAll(remote_exec.LocalBackend())
+      if local_time is None:
+        return 1
+      print('local: %d compiles in %.2f s' % (len(commands), local_time))
+      remote = remote_exec.RemoteBackend(socket_path)
+      for name in ('remote, empty worker', 'remote, cached results'):
+        elapsed = CompileAll(remote)
+        if elapsed is None:
+          return 1
+        print('%s: %d compiles in %.2f s (%.2fx the speed of local)' % (
+            name, len(commands), elapsed, local_time / max(elapsed, 1e-9)))
+      stats = remote.Stats()
+      print('worker: %d executions, %d cache hits, %d blobs (%.1f KB) '
+            'uploaded, %d deduplicated' % (
+                stats['executions'], stats['action_cache_hits'],
+                stats['blobs_uploaded'], stats['bytes_uploaded'] / 1024.0,
+                stats['blobs_deduplicated']))
+    finally:
+      os.chdir(cwd)
+      server.shutdown()
+      server.server_close()
+  finally:
+    shutil.rmtree(tmp_dir)
+  return 0
+
+
+def _BenchmarkDaemon(args):
+  script_dir = os.path.dirname(os.path.abspath(__file__))
+  client = os.path.join(script_dir, 'wrapper_daemon_client.py')
+  action = [os.path.join(script_dir, 'gcc_link_wrapper.py'),
+            '--output=/dev/null', '--', 'true']
+  tmp_dir = tempfile.mkdtemp()
+  socket_path = os.path.join(tmp_dir, 'daemon.sock')
+  no_daemon_env = dict(os.environ)
+  no_daemon_env['GN_BUILD_WRAPPER_DAEMON'] = os.path.join(tmp_dir, 'none.sock')
+  daemon_env = dict(os.environ)
+  daemon_env['GN_BUILD_WRAPPER_DAEMON'] = socket_path
+  # Like toolchain.gni runs them.
+  modes = [
+      ('python wrapper', [sys.executable] + action, no_daemon_env),
+      ('client, no daemon', [sys.executable, '-S', client] + action,
+       no_daemon_env),
+      ('client, daemon', [sys.executable, '-S', client] + action, daemon_env),
+  ]
+
+  try:
+    daemon = subprocess.Popen(
+        [sys.executable, os.path.join(script_dir, 'wrapper_daemon.py'),
+         '--socket', socket_path])
+    try:
+      while not os.path.exists(socket_path):
+        if daemon.poll() is not None:
+          print('The daemon failed to start')
+          return 1
+        time.sleep(0.01)
+      # The modes take turns, so that they all see the same load; the medians
+      # leave out the actions that were unlucky.
+      times = dict((name, []) for name, _, _ in modes)
+      for _ in range(args.actions):
+        for name, command, env in modes:
+          start = timeit.default_timer()
+          if subprocess.call(command, env=env):
+            print('%s: action failed' % name)
+            return 1
+          times[name].append(timeit.default_timer() - start)
+    finally:
+      daemon.terminate()
+      daemon.wait()
+  finally:
+    shutil.rmtree(tmp_dir)
+
+  direct = sorted(times[modes[0][0]])[args.actions // 2]
+  for name, _, _ in modes:
+    median = sorted(times[name])[args.actions // 2]
+    print('%s: %.1f ms per action (median), %+.1f ms against the wrapper' % (
+        name, 1000 * median, 1000 * (median - direct)))
+  return 0
+
+
+def _ImportTimes(script, env):
+  """Returns what importing |script| costs in a new interpreter.
+
+  Returns:
+    A tuple of the cumulative time in seconds and a list of (seconds, name)
+    for each module it imports directly.
+  """
+  module = os.path.splitext(os.path.basename(script))[0]
+  code = ('import sys; sys.path[0] = %r; import %s' %
+          (os.path.dirname(os.path.abspath(script)), module))
+  stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                          env=env, stderr=subprocess.PIPE,
+                          universal_newlines=True, check=True).stderr
+  children = []
+  for line in stderr.splitlines():
+    if not line.startswith('import time:'):
+      continue
+    _, cumulative, name = line.split('|')
+    if not cumulative.strip().isdigit():
+      continue  # The header.
+    depth = (len(name) - len(name.lstrip()) - 1) // 2
+    if depth == 0 and name.strip() == module:
+      return int(cumulative) / 1e6, children
+    if depth == 0:
+      children = []
+    elif depth == 1:
+      children.append((int(cumulative) / 1e6, name.strip()))
+  raise ValueError('%s was not imported' % script)
+
+
+def _BenchmarkStartup(args):
+  script_dir = os.path.dirname(os.path.abspath(__file__))
+  scripts = args.scripts or sorted(_STARTUP_BUDGETS)
+  # Builds write bytecode for the wrappers, so measure with it.
+  env = dict(os.environ)
+  env.pop('PYTHONDONTWRITEBYTECODE', None)
+
+  over_budget = []
+  for script in scripts:
+    path = os.path.join(script_dir, script)
+    _ImportTimes(path, env)  # Writes the bytecode.
+    best, children = min(_ImportTimes(path, env) for _ in range(args.repeat))
+    budget = _STARTUP_BUDGETS.get(script)
+    line = '%s: %.1f ms' % (script, 1000 * best)
+    if budget is not None:
+      budget *= args.scale
+      line += ' (budget %.0f ms)' % budget
+    print(line)
+    if budget is not None and 1000 * best > budget:
+      over_budget.append(script)
+      for seconds, name in sorted(children, reverse=True)[:5]:
+        print('  %.1f ms %s' % (1000 * seconds, name))
+
+  if over_budget:
+    print('Over budget: %s' % ', '.join(over_budget))
+    return 1
+  return 0
+
+
+def _MakeObjects(args, root, change=None, variant=0):
+  """Compiles |args.objects| objects below |root| and returns their paths.
+
+  If |change| is given, only recompiles that object, with contents of the
+  same size that differ for each |variant|.
+  """
+  paths = []
+  for i in range(args.objects):
+    path = os.path.join(root, 'obj', 'object_%d.o' % i)
+    paths.append(path)
+    if change is not None and i != change:
+      continue
+    source = ('char blob_%d[%d] = {%d};\n'
+              'int Function%d(int x) { return x * %d; }\n' % (
+                  i, args.object_size * 1024, i % 100 + 1, i,
+                  i + variant + 1))
+    subprocess.run([args.cc, '-x', 'c', '-c', '-', '-o', path],
+                   input=source.encode('ascii'), check=True)
+  return paths
+
+
+def _BenchmarkAr(args):
+  tmp_dir = tempfile.mkdtemp()
+  try:
+    os.makedirs(os.path.join(tmp_dir, 'obj'))
+    objects = _MakeObjects(args, tmp_dir)
+    archive = os.path.join(tmp_dir, 'libobjects.a')
+    reference = os.path.join(tmp_dir, 'libreference.a')
+    print('%d objects, %.1f MB' % (
+        len(objects), sum(os.path.getsize(o) for o in objects) / 1e6))
+
+    def RunAr(output, thin=False):
+      if os.path.exists(output):
+        os.remove(output)
+      subprocess.check_call([args.ar, 'rcsDT' if thin else 'rcsD', output] +
+                            objects)
+
+    def Write(thin=False, incremental=False):
+      if not incremental and os.path.exists(archive):
+        os.remove(archive)
+      ar_writer.WriteArchive(archive, objects, thin=thin,
+                             incremental=incremental)
+
+    def Report(name, func):
+      seconds = _Measure(func, args.repeat)
+      print('%s: %.1f ms' % (name, 1000 * seconds))
+
+    def Compare(thin=False):
+      RunAr(reference, thin)
+      with open(archive, 'rb') as f, open(reference, 'rb') as g:
+        if f.read() != g.read():
+          print('The archives differ%s' % (' (thin)' if thin else ''))
+          return False
+      return True
+
+    for thin in (False, True):
+      suffix = ' (thin)' if thin else ''
+      Report('delete and run ar' + suffix, lambda: RunAr(archive, thin))
+      Report('ar_writer' + suffix, lambda: Write(thin))
+      Write(thin, incremental=True)
+      def TouchAll():
+        for path in objects:
+          os.utime(path)
+      Report('ar_writer, incremental, all touched' + suffix,
+             lambda: (TouchAll(), Write(thin, incremental=True)))
+      # Compiling isn't part of the measurement.
+      seconds = []
+      for variant in range(1, args.repeat + 1):
+        _MakeObjects(args, tmp_dir, change=args.objects // 2, variant=variant)
+        seconds.append(_Measure(lambda: Write(thin, incremental=True), 1))
+      print('ar_writer, incremental, one changed%s: %.1f ms' % (
+          suffix, 1000 * min(seconds)))
+      if not Compare(thin):
+        return 1
+      os.remove(archive)
+  finally:
+    shutil.rmtree(tmp_dir)
+  return 0
+
+
+def _ThreadCounts(value):
+  return [int(count) for count in value.split(',')]
+
+
+def main():
+  parser = argparse.ArgumentParser(
+      description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  subparsers = parser.add_subparsers(dest='benchmark')
+  subparsers.required = True
+
+  toc = subparsers.add_parser('toc', help='.TOC generation for shared objects')
+  toc.add_argument('--repeat', type=int, default=3,
+                   help='Runs per file; the best one is counted')
+  toc.add_argument('--readelf', default='readelf',
+                   help='The readelf binary to run', metavar='PATH')
+  toc.add_argument('--nm', default='nm',
+                   help='The nm binary to run', metavar='PATH')
+  toc.add_argument('paths', nargs='+', metavar='FILE_OR_DIR',
+                   help='Shared objects, or directories to search for them')
+  toc.set_defaults(func=_BenchmarkTOC)
+
+  gzip_parser = subparsers.add_parser('gzip', help='gzipping linker map files')
+  gzip_parser.add_argument('--repeat', type=int, default=3,
+                           help='Runs per configuration; the best is reported')
+  gzip_parser.add_argument('--size', type=float, default=200,
+                           help=('Size of the synthetic map file in MB '
+                                 '(default: %(default)s)'))
+  gzip_parser.add_argument('--input', metavar='FILE',
+                           help='Compress FILE instead of a synthetic map file')
+  gzip_parser.add_argument('--level', type=int, default=1,
+                           help='Compression level (default: %(default)s)')
+  default_threads = [1]
+  while default_threads[-1] * 2 <= (os.cpu_count() or 1):
+    default_threads.append(default_threads[-1] * 2)
+  gzip_parser.add_argument('--threads', type=_ThreadCounts,
+                           default=default_threads,
+                           help=('Comma-separated thread counts to measure '
+                                 '(default: powers of two up to the number of '
+                                 'CPUs)'))
+  gzip_parser.set_defaults(func=_BenchmarkGzip)
+
+  rsp = subparsers.add_parser('rsp', help='tokenizing response files')
+  rsp.add_argument('--repeat', type=int, default=3,
+                   help='Runs per configuration; the best is reported')
+  rsp.add_argument('--size', type=float, default=10,
+                   help=('Size of the synthetic response file in MB '
+                         '(default: %(default)s)'))
+  rsp.add_argument('--input', metavar='FILE',
+                   help='Tokenize FILE instead of a synthetic response file')
+  rsp.set_defaults(func=_BenchmarkRsp)
+
+  remote = subparsers.add_parser('remote',
+                                 help='compiling through a remote_exec worker')
+  remote.add_argument('--sources', type=int, default=20,
+                      help=('Number of sources to compile '
+                            '(default: %(default)s)'))
+  remote.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+                      help='Commands the worker runs at a time')
+  remote.add_argument('--cc', default='g++',
+                      help='The C++ compiler to run', metavar='PATH')
+  remote.set_defaults(func=_BenchmarkRemote)
+
+  daemon = subparsers.add_parser('daemon',
+                                 help='running wrappers in wrapper_daemon.py')
+  daemon.add_argument('--actions', type=int, default=100,
+                      help='Actions to run per configuration '
+                           '(default: %(default)s)')
+  daemon.set_defaults(func=_BenchmarkDaemon)
+
+  startup = subparsers.add_parser('startup',
+                                  help='import time of the wrappers')
+  startup.add_argument('--repeat', type=int, default=5,
+                       help='Runs per script; the best one is counted')
+  startup.add_argument('--scale', type=float, default=1.0,
+                       help=('Multiply the budgets by this '
+                             '(default: %(default)s)'))
+  startup.add_argument('scripts', nargs='*', metavar='SCRIPT',
+                       help=('Scripts to measure, relative to this directory '
+                             '(default: all the wrappers with a budget)'))
+  startup.set_defaults(func=_BenchmarkStartup)
+
+  ar = subparsers.add_parser('ar', help='writing static libraries')
+  ar.add_argument('--repeat', type=int, default=3,
+                  help='Runs per configuration; the best is reported')
+  ar.add_argument('--objects', type=int, default=200,
+                  help='Number of objects to archive (default: %(default)s)')
+  ar.add_argument('--object-size', type=int, default=512,
+                  help='Size of each object in KB (default: %(default)s)')
+  ar.add_argument('--ar', default='ar',
+                  help='The ar binary to run', metavar='PATH')
+  ar.add_argument('--cc', default='gcc',
+                  help='The C compiler to run', metavar='PATH')
+  ar.set_defaults(func=_BenchmarkAr)
+
+  args = parser.parse_args()
+  return args.func(args)
+
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+# Copyright 2026 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""A resident process that runs the toolchain's Python wrappers for clients.
+
+Starting Python and importing argparse, subprocess, gzip and friends takes
+tens of milliseconds per action. This daemon does that once: it imports the
+modules the wrappers use, and then forks a child for each request from
+wrapper_daemon_client.py, which runs the requested script as __main__ with
+the client's arguments, working directory, environment, stdin, stdout and
+stderr. The child exits when the script is done, so nothing a script does
+affects later requests; the fork only costs a couple of milliseconds. Taking
+the client's own start into account, a trivial gcc_link_wrapper.py action
+takes around 9 ms less than running the wrapper directly (see
+`wrapper_benchmark.py daemon`). Without a daemon, the client only adds a
+few milliseconds.
+
+Run with:
+  python wrapper_daemon.py [--socket=PATH] [--idle-timeout=SECONDS]
+
+and build with use_wrapper_daemon = true (or run scripts through
+wrapper_daemon_client.py yourself). The socket defaults to
+$GN_BUILD_WRAPPER_DAEMON, or gn-wrapper-daemon.sock in $XDG_RUNTIME_DIR, or
+gn-wrapper-daemon-$UID/daemon.sock in $TMPDIR. It must be in a directory only
+this user can use, and only processes of this user are served. When no
+daemon is running, the client just runs the script itself.
+
+Modules of this directory are only reused while they are unchanged on disk,
+and only by scripts in this directory; other scripts import their own. This
+needs fork() and Unix sockets, so on Windows the client always runs scripts
+itself.
+"""
+
+import argparse
+import atexit
+import gc
+import importlib
+import marshal
+import os
+import runpy
+import select
+import signal
+import socket
+import struct
+import sys
+import threading
+import time
+import traceback
+
+import peer_credentials
+import wrapper_daemon_client
+
+# Imported before forking, so that the scripts don't have to.
+_PRELOADED_MODULES = (
+    'argparse', 'collections', 'concurrent.futures', 'errno', 'gzip',
+    'hashlib', 'io', 'json', 'locale', 'mmap', 'optparse', 're', 'shlex',
+    'shutil', 'socketserver', 'subprocess', 'tempfile', 'timeit', 'zlib',
+)
+# Modules in this directory that are imported before forking.
+_PRELOADED_LOCAL_MODULES = ('wrapper_utils', 'elf_toc', 'compile_cache',
+                            'peer_credentials', 'remote_exec', 'ar_writer',
+                            'link_admission')
+_HEADER = struct.Struct('>Q')
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _Preload():
+  """Imports the modules the wrappers use.
+
+  Returns:
+    A dict mapping the path of each local module imported to its mtime.
+  """
+  for name in _PRELOADED_MODULES:
+    importlib.import_module(name)
+  local_modules = {}
+  for name in _PRELOADED_LOCAL_MODULES:
+    module = importlib.import_module(name)
+    local_modules[module.__file__] = os.stat(module.__file__).st_mtime_ns
+  return local_modules
+
+
+def _ForgetLocalModules(script, local_modules):
+  """Removes the preloaded local modules that |script| shouldn't use."""
+  reuse = os.path.dirname(os.path.abspath(script)) == _SCRIPT_DIR
+  for path, mtime in local_modules.items():
+    try:
+      reuse = reuse and os.stat(path).st_mtime_ns == mtime
+    except OSError:
+      reuse = False
+  if not reuse:
+    for name in _PRELOADED_LOCAL_MODULES:
+      sys.modules.pop(name, None)
+
+
+def _ReceiveExactly(conn, size):
+  data = b''
+  while len(data) < size:
+    chunk = conn.recv(size - len(data))
+    if not chunk:
+      raise EOFError('The client went away')
+    data += chunk
+  return data
+
+
+def _RunScript(script):
+  """Runs |script| as __main__ and returns its exit code."""
+  try:
+    runpy.run_path(script, run_name='__main__')
+  except SystemExit as e:
+    if e.code is None:
+      return 0
+    if isinstance(e.code, int):
+      return e.code
+    sys.stderr.write('%s\n' % e.code)
+    return 1
+  except BaseException:
+    traceback.print_exc()
+    return 1
+  return 0
+
+
+def _KillJobWhenClientGoesAway(conn):
+  """Kills this process and its children if the client is interrupted."""
+  if not conn.recv(1):
+    os.killpg(0, signal.SIGTERM)
+
+
+def _HandleRequest(conn, local_modules):
+  """Runs the script a client asked for. Called in the forked child."""
+  if not peer_credentials.IsSameUser(conn):
+    return
+  header, fds, _, _ = socket.recv_fds(conn, _HEADER.size, 3)
+  header += _ReceiveExactly(conn, _HEADER.size - len(header))
+  length, = _HEADER.unpack(header)
+  argv, cwd, env, umask = marshal.loads(_ReceiveExactly(conn, length))
+
+  os.setpgid(0, 0)
+  for target, fd in enumerate(fds):
+    os.dup2(fd, target)
+    os.close(fd)
+  watcher = threading.Thread(target=_KillJobWhenClientGoesAway, args=(conn,))
+  watcher.daemon = True
+  watcher.start()
+
+  os.chdir(cwd)
+  os.umask(umask)
+  os.environ.clear()
+  os.environ.update(env)
+  sys.argv = argv
+  sys.path[0] = os.path.dirname(os.path.abspath(argv[0]))
+  _ForgetLocalModules(argv[0], local_modules)
+  signal.signal(signal.SIGTERM, signal.SIG_DFL)
+  signal.signal(signal.SIGINT, signal.default_int_handler)
+
+  returncode = _RunScript(argv[0])
+  atexit._run_exitfuncs()
+  sys.stdout.flush()
+  sys.stderr.flush()
+  conn.sendall(struct.pack('>i', returncode))
+
+
+def Serve(socket_path, idle_timeout=None):
+  """Runs requests from clients until idle for |idle_timeout| seconds."""
+  socket_dir = os.path.dirname(os.path.abspath(socket_path))
+  if not os.path.isdir(socket_dir):
+    os.makedirs(socket_dir, mode=0o700, exist_ok=True)
+  if not wrapper_daemon_client.IsPrivateDirectory(socket_dir):
+    raise ValueError('%s must be a directory only this user can use' %
+                     socket_dir)
+  local_modules = _Preload()
+  # Keep the preloaded objects out of collections in the children, so that
+  # they don't write to (and so copy) the pages they share with us.
+  gc.freeze()
+
+  if os.path.exists(socket_path):
+    os.unlink(socket_path)
+  listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+  old_umask = os.umask(0o177)  # Only this user may run scripts.
+  try:
+    listener.bind(socket_path)
+  finally:
+    os.umask(old_umask)
+  listener.listen(128)
+
+  children = set()
+  last_request = time.time()
+  try:
+    while True:
+      readable, _, _ = select.select([listener], [], [], 1.0)
+      while children:
+        pid, _ = os.waitpid(-1, os.WNOHANG)
+        if not pid:
+          break
+        children.discard(pid)
+      if readable:
+        conn, _ = listener.accept()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+          listener.close()
+          try:
+            _HandleRequest(conn, local_modules)
+          except BaseException:
+            traceback.print_exc()
+          finally:
+            os._exit(0)
+        conn.close()
+        children.add(pid)
+        last_request = time.time()
+      elif idle_timeout and not children and \
+           time.time() - last_request > idle_timeout:
+        return
+  finally:
+    listener.close()
+    os.unlink(socket_path)
+
+
+def main():
+  parser = argparse.ArgumentParser(
+      description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument('--socket',
+                      default=(os.environ.get(wrapper_daemon_client.SOCKET_ENV)
+                               or wrapper_daemon_client.DefaultSocketPath()),
+                      help='Unix socket to listen on', metavar='PATH')
+  parser.add_argument('--idle-timeout', type=float, default=3600,
+                      help=('Exit after this many seconds without requests '
+                            '(default: %(default)s, 0 for never)'))
+  args = parser.parse_args()
+  try:
+    Serve(args.socket, args.idle_timeout)
+  except KeyboardInterrupt:
+    pass
+  except ValueError as e:
+    parser.error(str(e))
+  return 0
+
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# Copyright 2026 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Runs a wrapper script in wrapper_daemon.py, or directly if none is running.
+
+Run with:
+  python wrapper_daemon_client.py SCRIPT [ARGS ...]
+
+The arguments, working directory and environment are sent to the daemon
+listening on $GN_BUILD_WRAPPER_DAEMON (or the default socket, see
+wrapper_daemon.py) along with stdin, stdout and stderr, so the script's
+output (and that of the tools it runs) goes where it would have gone. The
+script's exit code becomes ours.
+
+Since the daemon gets our environment and stdio, the socket has to be in a
+directory only this user can use, and the daemon has to run as this user.
+Otherwise, the script runs without it.
+
+This runs for every action, so it only imports what it needs to talk to the
+daemon, and only once it has found the daemon's socket: without a daemon, it
+costs little more than running the script directly. Run it with python -S,
+as toolchain.gni does, so that Python doesn't import site either.
+"""
+
+import os
+import stat
+import sys
+
+SOCKET_ENV = 'GN_BUILD_WRAPPER_DAEMON'
+
+
+def DefaultSocketPath():
+  """Returns the socket in $XDG_RUNTIME_DIR, or in a directory of our own in
+  $TMPDIR."""
+  runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+  if runtime_dir:
+    return os.path.join(runtime_dir, 'gn-wrapper-daemon.sock')
+  return os.path.join(os.environ.get('TMPDIR', '/tmp'),
+                      'gn-wrapper-daemon-%d' % os.getuid(), 'daemon.sock')
+
+
+def IsPrivateDirectory(path):
+  """Returns whether |path| is a directory only this user can use."""
+  try:
+    st = os.lstat(path)
+  except OSError:
+    return False
+  return (stat.S_ISDIR(st.st_mode) and st.st_uid == os.getuid() and
+          not st.st_mode & 0o077)
+
+
+def _IsDaemonSocket(socket_path):
+  """Returns whether there's a socket at |socket_path| we may talk to.
+
+  Only needs os and stat, so that clients without a daemon don't import the
+  rest.
+  """
+  try:
+    st = os.stat(socket_path)
+  except OSError:
+    return False
+  return (stat.S_ISSOCK(st.st_mode) and
+          IsPrivateDirectory(os.path.dirname(os.path.abspath(socket_path))))
+
+
+def _RunInDaemon(socket_path, argv):
+  """Returns the exit code of running |argv| in the daemon.
+
+  Returns None if no daemon is listening on |socket_path|.
+  """
+  # The socket module takes tens of milliseconds to import; _socket has all
+  # this needs.
+  import _socket
+  import array
+  import marshal
+  import struct
+
+  import peer_credentials
+
+  if not hasattr(_socket, 'SCM_RIGHTS'):
+    return None
+  sock = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+  try:
+    sock.connect(socket_path)
+  except OSError:
+    sock.close()
+    return None
+  if not peer_credentials.IsSameUser(sock):
+    sys.stderr.write('%s is listened on by another user\n' % socket_path)
+    sock.close()
+    return None
+  # There's no other way to read the umask, and no other threads to race.
+  umask = os.umask(0o022)
+  os.umask(umask)
+  data = marshal.dumps((argv, os.getcwd(), dict(os.environ), umask))
+  # Like socket.send_fds().
+  sock.sendmsg([struct.pack('>Q', len(data))],
+               [(_socket.SOL_SOCKET, _socket.SCM_RIGHTS,
+                 array.array('i', [0, 1, 2]))])
+  sock.sendall(data)
+  reply = b''
+  while len(reply) < 4:
+    chunk = sock.recv(4 - len(reply))
+    if not chunk:
+      sys.stderr.write('wrapper daemon exited without running %s\n' % argv[0])
+      return 1
+    reply += chunk
+  return struct.unpack('>i', reply)[0]
+
+
+def _RunDirectly(argv):
+  """Runs |argv| in this process, like `python SCRIPT ARGS` would.
+
+  Doesn't use runpy, which takes milliseconds to import.
+  """
+  script = argv[0]
+  sys.argv = argv
+  sys.path[0] = os.path.dirname(os.path.abspath(script))
+  with open(script, 'rb') as f:
+    code = compile(f.read(), script, 'exec')
+  main_module = type(sys)('__main__')
+  main_module.__file__ = script
+  sys.modules['__main__'] = main_module
+  exec(code, main_module.__dict__)
+  return 0
+
+
+def main():
+  argv = sys.argv[1:]
+  if not argv:
+    sys.stderr.write(__doc__)
+    return 2
+  socket_path = os.environ.get(SOCKET_ENV)
+  if not socket_path and hasattr(os, 'getuid'):
+    socket_path = DefaultSocketPath()
+  returncode = None
+  if socket_path and _IsDaemonSocket(socket_path):
+    returncode = _RunInDaemon(socket_path, argv)
+  if returncode is None:
+    returncode = _RunDirectly(argv)
+  return returncode
+
+
+if __name__ == '__main__':
+  sys.exit(main())
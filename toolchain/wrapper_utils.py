@@ -4,28 +4,153 @@
 
 """Helper functions for gcc_toolchain.gni wrappers."""
 
-import gzip
+# Only modules that are cheap to import, or that subprocess imports anyway, are
+# imported here. The others are imported by the functions that need them, so
+# that wrappers don't pay for code paths they don't take.
+import collections
+import marshal
 import os
 import re
+import struct
 import subprocess
-import shlex
-import shutil
 import sys
 import threading
+import timeit
 
 _BAT_PREFIX = 'cmd /c call '
-_WHITELIST_RE = re.compile('whitelisted_resource_(?P<resource_id>[0-9]+)')
+_WHITELIST_PREFIX = 'whitelisted_resource_'
+_WHITELIST_RE = re.compile(_WHITELIST_PREFIX + '(?P<resource_id>[0-9]+)')
+_WHITELIST_BYTES_PREFIX = _WHITELIST_PREFIX.encode('ascii')
+_WHITELIST_BYTES_RE = re.compile(_WHITELIST_RE.pattern.encode('ascii'))
+# StreamCommandStderr() passes on lines longer than this in several pieces, so
+# that it never holds more than this much of the output.
+_STDERR_PIECE_SIZE = 64 * 1024
+# How much of a line ResourceIdScanner keeps when it's fed in pieces. Enough
+# for a match split between two of them.
+_RESOURCE_ID_SCANNER_TAIL = 64
+# If set, RunPostLinkSteps() appends a line with the time taken by each step
+# to the file named by this environment variable.
+_POST_LINK_TIMINGS_ENV = 'GN_BUILD_POST_LINK_TIMINGS'
+# If set, ResolveRspLinks() caches the tokens of each response file in the
+# directory named by this environment variable, so that other wrappers given
+# a response file with the same contents don't tokenize it again.
+_RSP_CACHE_DIR_ENV = 'GN_BUILD_RSP_CACHE_DIR'
+# The least recently used entries of that cache are evicted once the entries
+# take more than this many bytes, until they take _RSP_CACHE_EVICTION_TARGET
+# of it.
+_RSP_CACHE_MAX_SIZE = 512 * 1024 * 1024
+_RSP_CACHE_EVICTION_TARGET = 0.9
+# gcc_compile_wrapper.py caches compiles (see compile_cache.py) in the
+# directory named by this environment variable unless --cache-dir is given.
+COMPILE_CACHE_DIR_ENV = 'GN_BUILD_COMPILE_CACHE_DIR'
+COMPILE_CACHE_MODES = ('direct', 'preprocessor')
+# The wrappers run their commands on the worker listening on the Unix socket
+# named by this environment variable, see remote_exec.py.
+REMOTE_EXEC_ENV = 'GN_BUILD_REMOTE_EXEC'
+# The link wrappers share a memory budget for links through the directory
+# named by this environment variable, see link_admission.py.
+LINK_ADMISSION_DIR_ENV = 'GN_BUILD_LINK_ADMISSION_DIR'
+
+
+# SetAsideOutputs() moves old outputs to their path with this suffix.
+_SET_ASIDE_SUFFIX = '.restat-old'
+# _FilesAreIdentical() compares files in chunks of this size.
+_COMPARE_CHUNK_SIZE = 1024 * 1024
+
+
+# Size of the blocks ParallelGzip() compresses independently.
+_GZIP_BLOCK_SIZE = 1024 * 1024
+# How far back deflate can refer. Each block is compressed with this much of
+# the preceding input as a preset dictionary, so splitting the input into
+# blocks hardly affects the compression ratio.
+_DEFLATE_WINDOW_SIZE = 32 * 1024
+
+
+def _DeflateBlock(block, dictionary, level, last):
+  """Returns |block| as raw deflate data that can be concatenated with others.
+
+  All but the last block end with a sync flush, which aligns the output to a
+  byte boundary without ending the deflate stream.
+  """
+  import zlib
+
+  if dictionary:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS,
+                                  zlib.DEF_MEM_LEVEL, zlib.Z_DEFAULT_STRATEGY,
+                                  dictionary)
+  else:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+  data = compressor.compress(block)
+  return data + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
 
+def ParallelGzip(f_in, f_out, level=1, threads=None):
+  """Writes the contents of |f_in| to |f_out| in gzip format.
 
-def _GzipThenDelete(src_path, dest_path):
+  Like pigz, this splits the input into blocks and deflates them on a thread
+  pool (zlib releases the GIL while compressing), while the checksum of the
+  input is computed on the calling thread. The result is a regular gzip file
+  with a single member. Unlike GzipFile, it doesn't contain a file name or
+  timestamp, so equal inputs give equal outputs.
+
+  Args:
+    f_in: File object opened for reading bytes.
+    f_out: File object opened for writing bytes.
+    level: Compression level, from 0 (no compression) to 9 (best).
+    threads: Number of compressing threads. Defaults to the number of CPUs.
+        With a single thread, the calling thread compresses the blocks.
+  """
+  import concurrent.futures
+  import zlib
+
+  threads = threads or os.cpu_count() or 1
+  # Extra flags: 4 for the fastest compression, 2 for the best.
+  extra_flags = 4 if level == 1 else 2 if level == 9 else 0
+  # Magic, deflate, no flags, no timestamp, extra flags, unknown OS.
+  f_out.write(struct.pack('<BBBBIBB', 0x1f, 0x8b, 8, 0, 0, extra_flags, 255))
+
+  crc = 0
+  size = 0
+  dictionary = b''
+  # Blocks being compressed; limited so that only a few are kept in memory.
+  pending = collections.deque()
+  executor = None
+  if threads > 1:
+    executor = concurrent.futures.ThreadPoolExecutor(threads)
+  try:
+    block = f_in.read(_GZIP_BLOCK_SIZE)
+    while True:
+      next_block = f_in.read(_GZIP_BLOCK_SIZE)
+      last = not next_block
+      if executor is None:
+        f_out.write(_DeflateBlock(block, dictionary, level, last))
+      else:
+        pending.append(executor.submit(_DeflateBlock, block, dictionary, level,
+                                       last))
+      crc = zlib.crc32(block, crc)
+      size += len(block)
+      dictionary = block[-_DEFLATE_WINDOW_SIZE:]
+      while pending and (last or len(pending) > 2 * threads):
+        f_out.write(pending.popleft().result())
+      if last:
+        break
+      block = next_block
+  finally:
+    if executor is not None:
+      executor.shutdown()
+
+  f_out.write(struct.pack('<II', crc & 0xffffffff, size & 0xffffffff))
+
+
+def _GzipThenDelete(src_path, dest_path, level=1, threads=None):
   # Results for Android map file with GCC on a z620:
   # Uncompressed: 207MB
   # gzip -9: 16.4MB, takes 8.7 seconds.
   # gzip -1: 21.8MB, takes 2.0 seconds.
   # Piping directly from the linker via -print-map (or via -Map with a fifo)
   # adds a whopping 30-45 seconds!
-  with open(src_path, 'rb') as f_in, gzip.GzipFile(dest_path, 'wb', 1) as f_out:
-    shutil.copyfileobj(f_in, f_out)
+  with open(src_path, 'rb') as f_in, open(dest_path, 'wb') as f_out:
+    ParallelGzip(f_in, f_out, level, threads)
   os.unlink(src_path)
 
 
@@ -51,7 +176,43 @@ def CommandToRun(command):
   return command
 
 
-def RunLinkWithOptionalMapFile(command, env=None, map_file=None):
+def ParseSize(value):
+  """Parses a size like '500M' or '5G' (for argparse and the environment)."""
+  units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+  multiplier = units.get(value[-1:].upper())
+  if multiplier:
+    value = value[:-1]
+  return int(float(value) * (multiplier or 1))
+
+
+def ExecutionBackendFromEnvironment():
+  """Returns the remote_exec.py backend set up in the environment, or None.
+
+  remote_exec.py, and the socket modules it needs, are only imported when
+  $GN_BUILD_REMOTE_EXEC is set.
+  """
+  if not os.environ.get(REMOTE_EXEC_ENV):
+    return None
+  import remote_exec
+  return remote_exec.BackendFromEnvironment()
+
+
+def LinkAdmissionFromEnvironment(output):
+  """Returns the link_admission.py admission for |output|, or None.
+
+  link_admission.py is only imported when $GN_BUILD_LINK_ADMISSION_DIR is
+  set.
+  """
+  if not os.environ.get(LINK_ADMISSION_DIR_ENV):
+    return None
+  import link_admission
+  return link_admission.AdmissionFromEnvironment(output)
+
+
+def RunLinkWithOptionalMapFile(command, env=None, map_file=None,
+                               post_link_steps=None, map_gzip_level=1,
+                               map_gzip_threads=None, backend=None,
+                               admission=None):
   """Runs the given command, adding in -Wl,-Map when |map_file| is given.
 
   Also takes care of gzipping when |map_file| ends with .gz.
@@ -60,6 +221,15 @@ def RunLinkWithOptionalMapFile(command, env=None, map_file=None):
     command: List of arguments comprising the command.
     env: Environment variables.
     map_file: Path to output map_file.
+    post_link_steps: Optional list to append the gzipping to as a
+        PostLinkStep, instead of running it on a separate thread.
+    map_gzip_level: Compression level for gzipping |map_file|.
+    map_gzip_threads: Number of threads for gzipping |map_file|, see
+        ParallelGzip().
+    backend: Optional remote_exec.ExecutionBackend to run |command| on.
+    admission: Optional link_admission.LinkAdmission to wait for before
+        running |command|. Ignored with |backend|, as the link then takes
+        the memory of the worker's machine.
 
   Returns:
     The exit code of running |command|.
@@ -71,20 +241,421 @@ def RunLinkWithOptionalMapFile(command, env=None, map_file=None):
   elif map_file:
     command.append('-Wl,-Map,' + map_file)
 
-  result = subprocess.call(command, env=env)
+  if backend is not None:
+    admission = None
+  if admission is not None:
+    admission.Acquire(command)
+  result = None
+  try:
+    if backend is not None:
+      result = backend.RunLink(command, env=env)
+    else:
+      result = subprocess.call(command, env=env)
+  finally:
+    if admission is not None:
+      admission.Release(succeeded=result == 0)
 
   if tmp_map_path and result == 0:
-    threading.Thread(
-        target=lambda: _GzipThenDelete(tmp_map_path, map_file)).start()
+    gzip_map = lambda: _GzipThenDelete(tmp_map_path, map_file, map_gzip_level,
+                                       map_gzip_threads)
+    if post_link_steps is None:
+      threading.Thread(target=gzip_map).start()
+    else:
+      post_link_steps.append(PostLinkStep(
+          'gzip_map', gzip_map, outputs=[map_file, tmp_map_path]))
   elif tmp_map_path and os.path.exists(tmp_map_path):
     os.unlink(tmp_map_path)
 
   return result
 
 
+def _FilesAreIdentical(path1, path2):
+  """Returns whether the files at |path1| and |path2| have the same contents.
+
+  Files of different sizes are told apart without reading them. Others are
+  compared a chunk at a time, up to the first difference.
+  """
+  if os.path.getsize(path1) != os.path.getsize(path2):
+    return False
+  with open(path1, 'rb') as f1, open(path2, 'rb') as f2:
+    while True:
+      chunk = f1.read(_COMPARE_CHUNK_SIZE)
+      if chunk != f2.read(_COMPARE_CHUNK_SIZE):
+        return False
+      if not chunk:
+        return True
+
+
+def SetAsideOutputs(outputs):
+  """Moves the existing |outputs| out of the way of the tool writing them.
+
+  Returns:
+    A dict mapping each output that existed to where it was moved, for
+    RestoreUnchangedOutputs().
+  """
+  set_aside = {}
+  for output in outputs:
+    old = output + _SET_ASIDE_SUFFIX
+    try:
+      os.replace(output, old)
+    except OSError:
+      continue  # There's no old output.
+    set_aside[output] = old
+  return set_aside
+
+
+def RestoreUnchangedOutputs(set_aside, succeeded=True):
+  """Puts back the old outputs that are identical to the new ones.
+
+  The old outputs that are put back keep their mtime, so that with
+  restat = true, ninja doesn't run the actions depending on them again. The
+  others are deleted.
+
+  Args:
+    set_aside: What SetAsideOutputs() returned.
+    succeeded: Whether the tool writing the outputs succeeded. If not, the old
+        outputs are all deleted.
+  """
+  for output, old in set_aside.items():
+    if succeeded and os.path.exists(output) and \
+       _FilesAreIdentical(output, old):
+      os.replace(old, output)
+    else:
+      os.remove(old)
+
+
+class PostLinkStep(object):
+  """A step of the work done after a link, see RunPostLinkSteps().
+
+  Attributes:
+    name: Name of the step, unique among the steps of a link.
+    func: Function that runs the step. Returns an exit code (None means 0).
+    outputs: Files written by the step. They are deleted if the step fails.
+    deps: Names of steps that have to succeed before this one can start.
+  """
+
+  def __init__(self, name, func, outputs=(), deps=()):
+    self.name = name
+    self.func = func
+    self.outputs = list(outputs)
+    self.deps = list(deps)
+    self.result = None
+    self.error = None
+    self.seconds = 0.0
+
+  def Failed(self):
+    return self.error is not None or bool(self.result)
+
+
+def _RunPostLinkStep(step, steps_by_name, finished):
+  try:
+    for dep in step.deps:
+      finished[dep].wait()
+    failed_deps = [dep for dep in step.deps if steps_by_name[dep].Failed()]
+    if failed_deps:
+      # Nothing to clean up, as the step didn't run.
+      step.result = steps_by_name[failed_deps[0]].result or 1
+      return
+    start = timeit.default_timer()
+    try:
+      step.result = step.func()
+    except Exception as e:
+      step.error = e
+    step.seconds = timeit.default_timer() - start
+    if step.Failed():
+      for output in step.outputs:
+        if os.path.exists(output):
+          os.unlink(output)
+  finally:
+    finished[step.name].set()
+
+
+def _WritePostLinkTimings(path, name, steps, wall_seconds):
+  """Appends the times taken by |steps| to |path| as a line of JSON.
+
+  Besides the time of each step, this includes the critical path time: the
+  time of the slowest chain of dependent steps, which is what the steps take
+  when run in parallel.
+  """
+  import json
+
+  critical = {}
+  for step in steps:
+    # Dependencies come first, as RunPostLinkSteps() checks.
+    critical[step.name] = step.seconds + max(
+        [critical[dep] for dep in step.deps] or [0])
+  record = {
+      'output': name,
+      'wall_seconds': wall_seconds,
+      'sequential_seconds': sum(step.seconds for step in steps),
+      'critical_path_seconds': max(critical.values() or [0]),
+      'steps': dict((step.name, {
+          'seconds': step.seconds,
+          'critical_path_seconds': critical[step.name],
+      }) for step in steps),
+  }
+  with open(path, 'a') as f:
+    f.write(json.dumps(record, sort_keys=True) + '\n')
+
+
+def RunPostLinkSteps(steps, name):
+  """Runs the steps following a link, in parallel as far as possible.
+
+  Each step runs on its own thread once the steps it depends on succeeded.
+  Steps depending on a failed step don't run. The outputs of failed steps
+  are deleted, so that no partial outputs are left behind.
+
+  If the GN_BUILD_POST_LINK_TIMINGS environment variable is set, the times
+  taken by the steps are appended to the file it names, see
+  _WritePostLinkTimings().
+
+  Args:
+    steps: List of PostLinkSteps. Steps can only depend on steps before them.
+    name: Name of the link output, for the timings.
+
+  Returns:
+    The first non-zero exit code of the steps, in the order of |steps|, or 0.
+
+  Raises:
+    The first exception raised by a step, in the order of |steps|, once all
+    steps are done.
+  """
+  steps_by_name = {}
+  for step in steps:
+    for dep in step.deps:
+      if dep not in steps_by_name:
+        raise ValueError('Step %s depends on unknown step %s' % (step.name,
+                                                                 dep))
+    steps_by_name[step.name] = step
+  finished = dict((step.name, threading.Event()) for step in steps)
+
+  start = timeit.default_timer()
+  threads = [threading.Thread(target=_RunPostLinkStep,
+                              args=(step, steps_by_name, finished))
+             for step in steps]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  wall_seconds = timeit.default_timer() - start
+
+  timings_path = os.environ.get(_POST_LINK_TIMINGS_ENV)
+  if timings_path:
+    _WritePostLinkTimings(timings_path, name, steps, wall_seconds)
+
+  for step in steps:
+    if step.error is not None:
+      raise step.error
+  for step in steps:
+    if step.result:
+      return step.result
+  return 0
+
+
+# The characters that shlex treats as whitespace (str.split() knows more).
+_RSP_WHITESPACE = ' \t\r\n'
+# A token of a response file: a run of unquoted characters, backslash escapes,
+# and single- or double-quoted strings, like the POSIX shell quoting that GN
+# uses for paths with special characters.
+_RSP_TOKEN_RE = re.compile(
+    r'''(?:[^ \t\r\n\\'"]+|\\.|'[^']*'|"(?:[^"\\]|\\.)*")+''', re.S)
+_RSP_QUOTED_RE = re.compile(r'''\\(.)|'([^']*)'|"((?:[^"\\]|\\.)*)"''', re.S)
+_RSP_DOUBLE_QUOTED_ESCAPE_RE = re.compile(r'\\(["\\])')
+# Changes whenever the format of rsp cache entries changes.
+_RSP_CACHE_VERSION = 2
+# The rsp cache keeps the total size of its entries in this file, and locks
+# this other one to update it.
+_RSP_CACHE_SIZE_FILE = 'size'
+_RSP_CACHE_LOCK_FILE = 'lock'
+# Changes whenever the format of the index kept by CombineResourceWhitelists()
+# changes.
+_WHITELIST_INDEX_VERSION = 1
+# Tokens of the response files read so far, keyed by path. Each value is a
+# tuple of ((mtime, size), tokens).
+_rsp_cache = {}
+
+
+def _CountNonWhitespace(text):
+  return len(text) - sum(text.count(c) for c in _RSP_WHITESPACE)
+
+
+def _Unquote(match):
+  escaped, single_quoted, double_quoted = match.groups()
+  if escaped is not None:
+    return escaped
+  if single_quoted is not None:
+    return single_quoted
+  return _RSP_DOUBLE_QUOTED_ESCAPE_RE.sub(r'\1', double_quoted)
+
+
+def SplitResponseFile(text):
+  """Returns the tokens of the response file contents |text|.
+
+  The result is the same as that of shlex.split(text), but it is found with a
+  few regular expressions rather than character by character. Text that isn't
+  properly quoted is passed to shlex.split() to get the same error.
+  """
+  tokens = _RSP_TOKEN_RE.findall(text)
+  if '\\' not in text and "'" not in text and '"' not in text:
+    return tokens
+  # Tokens can't contain unclosed quotes or a trailing backslash, so those are
+  # left between them.
+  if _CountNonWhitespace(''.join(tokens)) != _CountNonWhitespace(text):
+    import shlex
+    return shlex.split(text)
+  for i, token in enumerate(tokens):
+    if '\\' in token or "'" in token or '"' in token:
+      tokens[i] = _RSP_QUOTED_RE.sub(_Unquote, token)
+  return tokens
+
+
+def _RspCachePath(cache_dir, text):
+  # ninja rewrites response files for every run of their action, so only the
+  # contents can tell whether the tokens are still the same.
+  return os.path.join(cache_dir, _HashText(text) + '.rsp')
+
+
+def _LoadRspCacheEntry(cache_path):
+  """Returns the tokens cached at |cache_path|, or None if there are none.
+
+  Reading an entry marks it as recently used.
+  """
+  try:
+    with open(cache_path, 'rb') as f:
+      version, tokens = marshal.loads(f.read())
+    os.utime(cache_path, None)
+  except (EnvironmentError, EOFError, ValueError, TypeError):
+    return None
+  if version != _RSP_CACHE_VERSION:
+    return None
+  return tokens
+
+
+def WriteFileAtomically(path, data, executable=False):
+  """Writes the bytes |data| to |path| through a temporary file.
+
+  Readers see either the old or the new contents of |path|, never a partially
+  written file. The file gets the permissions of files created with the
+  process's umask, with the executable bits if |executable|.
+  """
+  directory = os.path.dirname(path)
+  if directory:
+    os.makedirs(directory, exist_ok=True)
+  flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+  while True:
+    tmp_path = '%s.%s.tmp' % (path, os.urandom(6).hex())
+    try:
+      fd = os.open(tmp_path, flags, 0o777 if executable else 0o666)
+      break
+    except FileExistsError:
+      continue
+  try:
+    with os.fdopen(fd, 'wb') as f:
+      f.write(data)
+    os.replace(tmp_path, path)
+  finally:
+    if os.path.exists(tmp_path):
+      os.unlink(tmp_path)
+
+
+def _EvictRspCacheEntries(cache_dir):
+  """Removes the least recently used entries of the rsp cache in |cache_dir|
+  until it's small enough, and returns the size of the remaining ones."""
+  entries = []
+  for name in os.listdir(cache_dir):
+    if not name.endswith('.rsp'):
+      continue
+    path = os.path.join(cache_dir, name)
+    try:
+      st = os.stat(path)
+    except OSError:
+      continue
+    entries.append((st.st_mtime, st.st_size, path))
+  entries.sort()
+  size = sum(entry[1] for entry in entries)
+  for _, entry_size, path in entries:
+    if size <= _RSP_CACHE_MAX_SIZE * _RSP_CACHE_EVICTION_TARGET:
+      break
+    try:
+      os.unlink(path)
+    except FileNotFoundError:
+      pass
+    size -= entry_size
+  return size
+
+
+def _UpdateRspCacheSize(cache_dir, added_size):
+  """Adds |added_size| to the size of the rsp cache in |cache_dir|, evicting
+  entries if it grows too large."""
+  try:
+    import fcntl
+  except ImportError:
+    fcntl = None  # The size is updated without locking on Windows.
+  with open(os.path.join(cache_dir, _RSP_CACHE_LOCK_FILE), 'a') as lock:
+    if fcntl:
+      fcntl.flock(lock, fcntl.LOCK_EX)
+    size_path = os.path.join(cache_dir, _RSP_CACHE_SIZE_FILE)
+    try:
+      with open(size_path, 'rb') as f:
+        size = int(f.read())
+    except (EnvironmentError, ValueError):
+      size = 0
+    size += added_size
+    if size > _RSP_CACHE_MAX_SIZE:
+      # Also corrects the size, which entries stored by two processes at
+      # once are counted twice in.
+      size = _EvictRspCacheEntries(cache_dir)
+    WriteFileAtomically(size_path, b'%d' % size)
+
+
+def _StoreRspCacheEntry(cache_dir, cache_path, tokens):
+  """Atomically writes |tokens| to |cache_path| in the cache |cache_dir|.
+
+  Failing to write the entry isn't an error; the tokens are just not shared.
+  """
+  data = marshal.dumps((_RSP_CACHE_VERSION, tokens))
+  try:
+    WriteFileAtomically(cache_path, data)
+    _UpdateRspCacheSize(cache_dir, len(data))
+  except OSError:
+    pass
+
+
+def _ReadRspFile(rspfile):
+  """Returns the tokens of |rspfile|, reusing cached ones when possible.
+
+  Tokens cached in the process are reused for as long as the mtime and size
+  of the file are unchanged, and those in $GN_BUILD_RSP_CACHE_DIR for files
+  with the same contents.
+  """
+  st = os.stat(rspfile)
+  version = (st.st_mtime_ns, st.st_size)
+  cached = _rsp_cache.get(rspfile)
+  if cached is not None and cached[0] == version:
+    return cached[1]
+
+  with open(rspfile, 'r') as f:
+    text = f.read()
+  cache_dir = os.environ.get(_RSP_CACHE_DIR_ENV)
+  cache_path = None
+  tokens = None
+  if cache_dir:
+    cache_path = _RspCachePath(cache_dir, text)
+    tokens = _LoadRspCacheEntry(cache_path)
+  if tokens is None:
+    tokens = tuple(SplitResponseFile(text))
+    if cache_path:
+      _StoreRspCacheEntry(cache_dir, cache_path, tokens)
+  _rsp_cache[rspfile] = (version, tokens)
+  return tokens
+
+
 def ResolveRspLinks(inputs):
   """Return a list of files contained in a response file.
 
+  Response files are tokenized like shlex.split() would. Set
+  GN_BUILD_RSP_CACHE_DIR to share the tokens between wrapper invocations.
+
   Args:
     inputs: A command containing rsp files.
 
@@ -93,29 +664,114 @@ def ResolveRspLinks(inputs):
   rspfiles = [a[1:] for a in inputs if a.startswith('@')]
   resolved = set()
   for rspfile in rspfiles:
-    with open(rspfile, 'r') as f:
-      resolved.update(shlex.split(f.read()))
+    resolved.update(_ReadRspFile(rspfile))
 
   return resolved
 
 
+def ExpandRspFiles(args):
+  """Returns |args| with each @rspfile replaced by the tokens of the file.
+
+  This is how tools like ar read their arguments, except that response files
+  named in response files aren't expanded.
+  """
+  expanded = []
+  for arg in args:
+    if arg.startswith('@'):
+      expanded.extend(_ReadRspFile(arg[1:]))
+    else:
+      expanded.append(arg)
+  return expanded
+
+
+def _HashText(text):
+  import hashlib
+  return hashlib.sha256(text.encode('utf-8', 'surrogateescape')).hexdigest()
+
+
+def _LoadWhitelistIndex(index_path):
+  """Returns the whitelists and output recorded in the index at |index_path|.
+
+  Returns:
+    A tuple of (whitelists, output). |whitelists| maps the path of each
+    whitelist to a tuple of ((mtime, size), digest, lines), and |output| is a
+    tuple of (digests, (mtime, size), digest) for the combined whitelist, where
+    |digests| maps each whitelist it was made from to its digest. Both are
+    empty if there's no usable index.
+  """
+  try:
+    with open(index_path, 'rb') as f:
+      version, whitelists, output = marshal.loads(f.read())
+  except (EnvironmentError, EOFError, ValueError, TypeError):
+    return {}, ()
+  if version != _WHITELIST_INDEX_VERSION:
+    return {}, ()
+  return whitelists, output
+
+
 def CombineResourceWhitelists(whitelist_candidates, outfile):
   """Combines all whitelists for a resource file into a single whitelist.
 
+  The lines of the whitelists are written to |outfile| in sorted order, and
+  only if they differ from what it already contains, so that its mtime only
+  changes when its contents do. An index of the whitelists that were read is
+  kept in |outfile|.index; whitelists whose mtime and size haven't changed
+  since are not read again.
+
   Args:
     whitelist_candidates: List of paths to rsp files containing all targets.
     outfile: Path to save the combined whitelist.
   """
-  whitelists = ('%s.whitelist' % candidate for candidate in whitelist_candidates
-                if os.path.exists('%s.whitelist' % candidate))
-
-  resources = set()
-  for whitelist in whitelists:
-    with open(whitelist, 'r') as f:
-      resources.update(f.readlines())
-
-  with open(outfile, 'w') as f:
-    f.writelines(resources)
+  index_path = outfile + '.index'
+  old_whitelists, old_output = _LoadWhitelistIndex(index_path)
+
+  whitelists = {}
+  for candidate in whitelist_candidates:
+    whitelist = '%s.whitelist' % candidate
+    try:
+      st = os.stat(whitelist)
+    except OSError:
+      continue  # Not every object has a whitelist.
+    version = (st.st_mtime_ns, st.st_size)
+    entry = old_whitelists.get(whitelist)
+    if entry is None or entry[0] != version:
+      with open(whitelist, 'r') as f:
+        lines = tuple(f.readlines())
+      entry = (version, _HashText(''.join(lines)), lines)
+    whitelists[whitelist] = entry
+  digests = dict((path, entry[1]) for path, entry in whitelists.items())
+
+  try:
+    st = os.stat(outfile)
+    output_version = (st.st_mtime_ns, st.st_size)
+  except OSError:
+    output_version = None
+  if old_output and output_version == old_output[1] and \
+     digests == old_output[0]:
+    output = old_output  # Made from the same whitelists; nothing to do.
+  else:
+    resources = set()
+    for entry in whitelists.values():
+      resources.update(entry[2])
+    contents = ''.join(sorted(resources))
+    digest = _HashText(contents)
+    unchanged = (old_output and output_version == old_output[1] and
+                 digest == old_output[2])
+    if not unchanged and output_version is not None:
+      with open(outfile, 'r') as f:
+        unchanged = _HashText(f.read()) == digest
+    if not unchanged:
+      WriteFileAtomically(outfile, contents.encode('utf-8', 'surrogateescape'))
+      st = os.stat(outfile)
+      output_version = (st.st_mtime_ns, st.st_size)
+    output = (digests, output_version, digest)
+
+  if whitelists != old_whitelists or output != old_output:
+    try:
+      WriteFileAtomically(index_path, marshal.dumps(
+          (_WHITELIST_INDEX_VERSION, whitelists, output)))
+    except OSError:
+      pass  # The next run just has to read everything again.
 
 
 def ExtractResourceIdsFromPragmaWarnings(text):
@@ -130,6 +786,8 @@ def ExtractResourceIdsFromPragmaWarnings(text):
   used_resources = set()
   lines = text.splitlines()
   for ln in lines:
+    if _WHITELIST_PREFIX not in ln:
+      continue  # Much cheaper than searching with the regex.
     match = _WHITELIST_RE.search(ln)
     if match:
       resource_id = int(match.group('resource_id'))
@@ -138,6 +796,54 @@ def ExtractResourceIdsFromPragmaWarnings(text):
   return used_resources
 
 
+class ResourceIdScanner(object):
+  """Finds resource IDs in pragma warnings in output read a piece at a time.
+
+  Like ExtractResourceIdsFromPragmaWarnings(), it takes the first ID on each
+  line, but only keeps a short tail of the current line between pieces.
+  """
+
+  def __init__(self):
+    self.resource_ids = set()
+    self._tail = b''
+    self._found_in_line = False
+
+  def Feed(self, piece):
+    """Scans |piece|, a line or part of one, of bytes.
+
+    A line ends with the piece that ends with a newline. Like universal
+    newlines, a lone '\r' ends a line too.
+    """
+    piece = piece.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+    for line in piece.splitlines(True):
+      self._FeedLine(line)
+
+  def _FeedLine(self, piece):
+    end_of_line = piece.endswith(b'\n')
+    if not self._found_in_line:
+      text = self._tail + piece
+      self._tail = b''
+      if _WHITELIST_BYTES_PREFIX in text:
+        match = _WHITELIST_BYTES_RE.search(text)
+        if match is None or match.end() < len(text) or end_of_line:
+          if match is not None:
+            self.resource_ids.add(int(match.group('resource_id')))
+            self._found_in_line = True
+        else:
+          # The next piece may continue the ID.
+          text = text[match.start():]
+      if not self._found_in_line and not end_of_line:
+        self._tail = text[-_RESOURCE_ID_SCANNER_TAIL:]
+    if end_of_line:
+      self._tail = b''
+      self._found_in_line = False
+
+  def Close(self):
+    """Scans what's left of an output that doesn't end with a newline."""
+    if self._tail:
+      self.Feed(b'\n')
+
+
 def CaptureCommandStderr(command, env=None):
   """Returns the stderr of a command.
 
@@ -149,3 +855,30 @@ def CaptureCommandStderr(command, env=None):
                            universal_newlines=True)
   _, stderr = child.communicate()
   return child.returncode, stderr
+
+
+def StreamCommandStderr(command, env=None, scanner=None):
+  """Runs a command, passing its stderr on to ours as it's written.
+
+  Each line is forwarded as soon as the command has written it, and at most
+  _STDERR_PIECE_SIZE bytes of it are held at a time.
+
+  Args:
+    command: A list containing the command and arguments.
+    env: Environment variables for the new process.
+    scanner: Optional ResourceIdScanner to feed the output to.
+
+  Returns:
+    The return code of the command.
+  """
+  child = subprocess.Popen(command, stderr=subprocess.PIPE, env=env)
+  out = sys.stderr.buffer
+  with child.stderr:
+    for piece in iter(lambda: child.stderr.readline(_STDERR_PIECE_SIZE), b''):
+      out.write(piece)
+      out.flush()
+      if scanner is not None:
+        scanner.Feed(piece)
+  if scanner is not None:
+    scanner.Close()
+  return child.wait()
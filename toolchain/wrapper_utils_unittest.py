@@ -0,0 +1,551 @@
+# Copyright 2026 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import gzip
+import io
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import wrapper_utils
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class _TempDirTestCase(unittest.TestCase):
+  def setUp(self):
+    self.root = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, self.root)
+
+  def _Path(self, name):
+    return os.path.join(self.root, name)
+
+  def _Write(self, name, contents):
+    path = self._Path(name)
+    with open(path, 'wb' if isinstance(contents, bytes) else 'w') as f:
+      f.write(contents)
+    return path
+
+  def _Read(self, name):
+    with open(self._Path(name), 'rb') as f:
+      return f.read()
+
+
+class RspCacheTest(_TempDirTestCase):
+  def setUp(self):
+    super(RspCacheTest, self).setUp()
+    self.cache_dir = self._Path('cache')
+    environ = mock.patch.dict(
+        os.environ, {wrapper_utils._RSP_CACHE_DIR_ENV: self.cache_dir})
+    environ.start()
+    self.addCleanup(environ.stop)
+    self.addCleanup(wrapper_utils._rsp_cache.clear)
+
+  def _Resolve(self, rspfile):
+    """Resolves |rspfile| like a new process, and returns whether it had to
+    tokenize it."""
+    wrapper_utils._rsp_cache.clear()
+    with mock.patch.object(wrapper_utils, 'SplitResponseFile',
+                           wraps=wrapper_utils.SplitResponseFile) as split:
+      tokens = wrapper_utils.ResolveRspLinks(['@' + rspfile])
+    return tokens, split.called
+
+  def _Entries(self):
+    return sorted(name for name in os.listdir(self.cache_dir)
+                  if name.endswith('.rsp'))
+
+  def test_RewrittenFileHits(self):
+    rspfile = self._Write('lib.rsp', 'a.o "b c.o"\n')
+    self.assertEqual(self._Resolve(rspfile), ({'a.o', 'b c.o'}, True))
+    # ninja writes the response file again for every run of the action.
+    self._Write('lib.rsp', 'a.o "b c.o"\n')
+    os.utime(rspfile, ns=(1, 1))
+    self.assertEqual(self._Resolve(rspfile), ({'a.o', 'b c.o'}, False))
+    self.assertEqual(len(self._Entries()), 1)
+
+  def test_ChangedFileMisses(self):
+    rspfile = self._Write('lib.rsp', 'a.o\n')
+    self._Resolve(rspfile)
+    self._Write('lib.rsp', 'b.o\n')
+    self.assertEqual(self._Resolve(rspfile), ({'b.o'}, True))
+    self.assertEqual(len(self._Entries()), 2)
+
+  def test_Eviction(self):
+    rspfiles = [self._Write('lib%d.rsp' % i, 'lib%d.o ' % i + 'x' * 1000)
+                for i in range(10)]
+    self._Resolve(rspfiles[0])
+    entry_size = os.path.getsize(
+        os.path.join(self.cache_dir, self._Entries()[0]))
+    max_size = entry_size * 4
+    with mock.patch.object(wrapper_utils, '_RSP_CACHE_MAX_SIZE', max_size):
+      for rspfile in rspfiles:
+        self._Resolve(rspfile)
+    self.assertLessEqual(len(self._Entries()) * entry_size, max_size)
+    self.assertEqual(int(self._Read('cache/size')),
+                     len(self._Entries()) * entry_size)
+    # The most recent ones are still there.
+    self.assertEqual(self._Resolve(rspfiles[-1])[1], False)
+    self.assertEqual(self._Resolve(rspfiles[0])[1], True)
+
+  def test_UnwritableCacheDir(self):
+    self._Write('cache', 'not a directory')
+    rspfile = self._Write('lib.rsp', 'a.o\n')
+    self.assertEqual(self._Resolve(rspfile), ({'a.o'}, True))
+
+
+class ParallelGzipTest(_TempDirTestCase):
+  def _Data(self, size):
+    # Repeated text, which later blocks refer back to across block
+    # boundaries, mixed with incompressible runs.
+    rng = random.Random(size)
+    data = bytearray()
+    while len(data) < size:
+      if rng.random() < 0.5:
+        data += b'.text 0x%08x lib.o\n' % rng.randrange(1 << 16)
+      else:
+        data += rng.getrandbits(512).to_bytes(64, 'little')
+    return bytes(data[:size])
+
+  def _Gzip(self, data, **kwargs):
+    f_out = io.BytesIO()
+    wrapper_utils.ParallelGzip(io.BytesIO(data), f_out, **kwargs)
+    return f_out.getvalue()
+
+  def test_RoundTrip(self):
+    block = wrapper_utils._GZIP_BLOCK_SIZE
+    for size in (0, 1, block - 1, block, block + 1, 3 * block + 5):
+      data = self._Data(size)
+      outputs = set()
+      for threads in (1, 2, 4, 16):
+        compressed = self._Gzip(data, threads=threads)
+        self.assertEqual(gzip.decompress(compressed), data,
+                         'size %d, %d threads' % (size, threads))
+        outputs.add(compressed)
+      # The output doesn't depend on the number of threads.
+      self.assertEqual(len(outputs), 1, 'size %d' % size)
+
+  def test_Levels(self):
+    data = self._Data(wrapper_utils._GZIP_BLOCK_SIZE + 1)
+    for level in (0, 1, 6, 9):
+      self.assertEqual(gzip.decompress(self._Gzip(data, level=level,
+                                                  threads=2)), data)
+
+  def test_GzipThenDelete(self):
+    data = self._Data(1000)
+    self._Write('lib.so.map', data)
+    wrapper_utils._GzipThenDelete(self._Path('lib.so.map'),
+                                  self._Path('lib.so.map.gz'), threads=2)
+    self.assertFalse(os.path.exists(self._Path('lib.so.map')))
+    self.assertEqual(gzip.decompress(self._Read('lib.so.map.gz')), data)
+
+
+def _OldCombineResourceWhitelists(whitelist_candidates, outfile):
+  """CombineResourceWhitelists() before it kept an index."""
+  whitelists = ('%s.whitelist' % candidate for candidate in whitelist_candidates
+                if os.path.exists('%s.whitelist' % candidate))
+
+  resources = set()
+  for whitelist in whitelists:
+    with open(whitelist, 'r') as f:
+      resources.update(f.readlines())
+
+  with open(outfile, 'w') as f:
+    f.writelines(resources)
+
+
+class CombineResourceWhitelistsTest(_TempDirTestCase):
+  def setUp(self):
+    super(CombineResourceWhitelistsTest, self).setUp()
+    self.candidates = [self._Path('obj%d.o' % i) for i in range(4)]
+    self._Write('obj0.o.whitelist', '1\n2\n')
+    self._Write('obj1.o.whitelist', '2\n3\n')
+    # obj2.o has no whitelist.
+    self._Write('obj3.o.whitelist', '')
+    self.output = self._Path('lib.so.whitelist')
+
+  def _Combine(self):
+    """Combines the whitelists, checks the result against the old
+    implementation, and returns the mtime of the output."""
+    wrapper_utils.CombineResourceWhitelists(self.candidates, self.output)
+    _OldCombineResourceWhitelists(self.candidates, self._Path('old'))
+    self.assertEqual(self._Read('lib.so.whitelist'),
+                     b''.join(sorted(self._Read('old').splitlines(True))))
+    return os.stat(self.output).st_mtime_ns
+
+  def _Age(self, name):
+    # Far enough in the past for a rewrite to change the mtime.
+    os.utime(self._Path(name), ns=(10**18, 10**18))
+
+  def test_Combine(self):
+    self._Combine()
+    self.assertEqual(self._Read('lib.so.whitelist'), b'1\n2\n3\n')
+
+  def test_ChangedWhitelists(self):
+    self._Combine()
+    self._Write('obj1.o.whitelist', '4\n')
+    self._Combine()
+    self._Write('obj2.o.whitelist', '5\n')
+    self._Combine()
+    os.remove(self._Path('obj0.o.whitelist'))
+    self._Combine()
+    self.assertEqual(self._Read('lib.so.whitelist'), b'4\n5\n')
+
+  def test_UnchangedOutputIsNotWritten(self):
+    self._Combine()
+    self._Age('lib.so.whitelist')
+    # Same resources from different whitelists.
+    self._Write('obj1.o.whitelist', '3\n')
+    self._Write('obj3.o.whitelist', '2\n')
+    self.assertEqual(self._Combine(), 10**18)
+
+  def test_MissingIndex(self):
+    self._Combine()
+    self._Age('lib.so.whitelist')
+    os.remove(self.output + '.index')
+    self.assertEqual(self._Combine(), 10**18)
+    self.assertTrue(os.path.exists(self.output + '.index'))
+
+  def test_StaleIndex(self):
+    self._Combine()
+    index = self._Read('lib.so.whitelist.index')
+    self._Write('obj1.o.whitelist', '4\n')
+    self._Combine()
+    # An index from before the whitelist changed.
+    self._Write('lib.so.whitelist.index', index)
+    self._Combine()
+    self.assertEqual(self._Read('lib.so.whitelist'), b'1\n2\n4\n')
+
+  def test_BadIndex(self):
+    for contents in (b'garbage', b''):
+      self._Write('lib.so.whitelist.index', contents)
+      self._Combine()
+
+  def test_ModifiedOutput(self):
+    self._Combine()
+    self._Write('lib.so.whitelist', '7\n')
+    self._Combine()
+    os.remove(self.output)
+    self._Combine()
+
+
+# A compiler that writes pragma warnings in pieces.
+_FAKE_COMPILER = r'''
+import sys
+import time
+pieces = [
+    b'a.cc:1: warning: unknown pragma whitelisted_resource_12 [-Wunknown]\n',
+    b'a.cc:2: warning: whitelisted_reso', b'urce_3', b'4 and ',
+    b'whitelisted_resource_56\r\n',
+    b'x' * 100000 + b' whitelisted_resource_78\r',
+    b'whitelisted_resource_9',
+]
+for piece in pieces:
+  sys.stderr.buffer.write(piece)
+  sys.stderr.buffer.flush()
+  time.sleep(0.01)
+sys.exit(3)
+'''
+
+_PRAGMA_WARNINGS = (
+    b'warning: unknown pragma whitelisted_resource_1\n'
+    b'whitelisted_resource_2 whitelisted_resource_3\n'
+    b'whitelisted_resource_ whitelisted_resource_4\r\n'
+    b'no resource here\r'
+    b'whitelisted_resource_56789\n'
+    b'\n' +
+    b'y' * 200 + b'whitelisted_resource_10' + b'z' * 200 + b'\n'
+    b'whitelisted_resource_11'
+)
+
+
+class ResourceIdScannerTest(unittest.TestCase):
+  def _Scan(self, pieces):
+    scanner = wrapper_utils.ResourceIdScanner()
+    for piece in pieces:
+      scanner.Feed(piece)
+    scanner.Close()
+    return scanner.resource_ids
+
+  def _Expected(self, text):
+    return wrapper_utils.ExtractResourceIdsFromPragmaWarnings(
+        text.decode('utf-8'))
+
+  def test_Whole(self):
+    self.assertEqual(self._Scan([_PRAGMA_WARNINGS]),
+                     {1, 2, 4, 56789, 10, 11})
+    self.assertEqual(self._Scan([_PRAGMA_WARNINGS]),
+                     self._Expected(_PRAGMA_WARNINGS))
+
+  def test_SplitAnywhere(self):
+    expected = self._Expected(_PRAGMA_WARNINGS)
+    for i in range(len(_PRAGMA_WARNINGS) + 1):
+      self.assertEqual(
+          self._Scan([_PRAGMA_WARNINGS[:i], _PRAGMA_WARNINGS[i:]]), expected,
+          'split at %d' % i)
+
+  def test_SplitIntoLines(self):
+    # As StreamCommandStderr() feeds it.
+    self.assertEqual(self._Scan(_PRAGMA_WARNINGS.splitlines(True)),
+                     self._Expected(_PRAGMA_WARNINGS))
+
+  def test_RandomPieces(self):
+    rng = random.Random(0)
+    expected = self._Expected(_PRAGMA_WARNINGS)
+    for _ in range(200):
+      cuts = sorted(rng.randrange(len(_PRAGMA_WARNINGS)) for _ in range(8))
+      pieces = [_PRAGMA_WARNINGS[start:end] for start, end in
+                zip([0] + cuts, cuts + [len(_PRAGMA_WARNINGS)])]
+      self.assertEqual(self._Scan(pieces), expected, cuts)
+
+
+class StreamCommandStderrTest(_TempDirTestCase):
+  def setUp(self):
+    super(StreamCommandStderrTest, self).setUp()
+    self.command = [sys.executable, self._Write('cc.py', _FAKE_COMPILER)]
+    self.stderr = tempfile.TemporaryFile()
+    self.addCleanup(self.stderr.close)
+    stderr = mock.patch.object(sys, 'stderr', mock.Mock(buffer=self.stderr))
+    stderr.start()
+    self.addCleanup(stderr.stop)
+
+  def test_MatchesCapture(self):
+    scanner = wrapper_utils.ResourceIdScanner()
+    returncode = wrapper_utils.StreamCommandStderr(self.command,
+                                                   scanner=scanner)
+    old_returncode = subprocess.call(self.command, stderr=self.stderr)
+    self.stderr.seek(0)
+    output = self.stderr.read()
+    # Passed on unchanged.
+    self.assertEqual(output[:len(output) // 2], output[len(output) // 2:])
+    self.assertEqual(returncode, 3)
+    self.assertEqual(old_returncode, 3)
+
+    old_returncode, old_stderr = wrapper_utils.CaptureCommandStderr(
+        self.command)
+    self.assertEqual(old_returncode, 3)
+    self.assertEqual(
+        scanner.resource_ids,
+        wrapper_utils.ExtractResourceIdsFromPragmaWarnings(old_stderr))
+    self.assertEqual(scanner.resource_ids, {12, 34, 78, 9})
+
+  def test_LongLinesAreForwardedInPieces(self):
+    with mock.patch.object(wrapper_utils, '_STDERR_PIECE_SIZE', 1000):
+      self.stderr.write = mock.Mock(wraps=self.stderr.write)
+      wrapper_utils.StreamCommandStderr(self.command)
+    self.assertLessEqual(
+        max(len(call[0][0]) for call in self.stderr.write.call_args_list),
+        1000)
+
+
+# Copies its input to the file given by -o, and fails after writing part of
+# it if the input says so.
+_FAKE_LINKER = '''
+import sys
+args = sys.argv[1:]
+output = args[args.index('-o') + 1]
+with open(args[0], 'rb') as f:
+  contents = f.read()
+with open(output, 'wb') as f:
+  f.write(contents[:4])
+  if contents.startswith(b'fail'):
+    sys.exit(1)
+  f.write(contents[4:])
+'''
+
+
+class RestatTest(_TempDirTestCase):
+  _OLD_MTIME = 10**18
+
+  def _Age(self, name):
+    os.utime(self._Path(name), ns=(self._OLD_MTIME, self._OLD_MTIME))
+
+  def _MTime(self, name):
+    return os.stat(self._Path(name)).st_mtime_ns
+
+  def _SetAsideFiles(self):
+    return [name for name in os.listdir(self.root)
+            if name.endswith(wrapper_utils._SET_ASIDE_SUFFIX)]
+
+  def _Run(self, outputs, contents, succeeded=True):
+    """Sets |outputs| aside, writes them with |contents| and restores them."""
+    set_aside = wrapper_utils.SetAsideOutputs(
+        [self._Path(output) for output in outputs])
+    for output in outputs:
+      self.assertFalse(os.path.exists(self._Path(output)))
+      if contents is not None:
+        self._Write(output, contents)
+    wrapper_utils.RestoreUnchangedOutputs(set_aside, succeeded=succeeded)
+    return set_aside
+
+  def test_IdenticalOutputKeepsMTime(self):
+    self._Write('lib.so', b'\x7fELF same')
+    self._Age('lib.so')
+    self._Run(['lib.so'], b'\x7fELF same')
+    self.assertEqual(self._MTime('lib.so'), self._OLD_MTIME)
+    self.assertEqual(self._SetAsideFiles(), [])
+
+  def test_ChangedOutputIsKept(self):
+    self._Write('lib.so', b'\x7fELF old')
+    self._Age('lib.so')
+    self._Run(['lib.so'], b'\x7fELF new')
+    self.assertEqual(self._Read('lib.so'), b'\x7fELF new')
+    self.assertNotEqual(self._MTime('lib.so'), self._OLD_MTIME)
+    self.assertEqual(self._SetAsideFiles(), [])
+
+  def test_ChangedOutputOfSameSize(self):
+    # Larger than a chunk of _FilesAreIdentical(), with the difference in
+    # the second one.
+    size = wrapper_utils._COMPARE_CHUNK_SIZE + 10
+    self._Write('lib.so', b'a' * size)
+    self._Age('lib.so')
+    self._Run(['lib.so'], b'a' * (size - 1) + b'b')
+    self.assertNotEqual(self._MTime('lib.so'), self._OLD_MTIME)
+
+  def test_FailedToolDeletesOldOutputs(self):
+    self._Write('lib.so', b'\x7fELF same')
+    self._Age('lib.so')
+    self._Run(['lib.so'], b'\x7fELF same', succeeded=False)
+    # Even an identical output isn't trusted; it's left for ninja to see as
+    # the failed tool left it.
+    self.assertEqual(self._SetAsideFiles(), [])
+    self.assertEqual(self._Read('lib.so'), b'\x7fELF same')
+    self.assertNotEqual(self._MTime('lib.so'), self._OLD_MTIME)
+
+    self._Write('lib.so', b'\x7fELF old')
+    self._Run(['lib.so'], None, succeeded=False)
+    self.assertEqual(os.listdir(self.root), [])
+
+  def test_OutputMissingBefore(self):
+    self._Write('lib.so', b'\x7fELF old')
+    set_aside = self._Run(['lib.so', 'lib.so.unstripped'], b'\x7fELF old')
+    self.assertEqual(list(set_aside), [self._Path('lib.so')])
+    self.assertEqual(self._Read('lib.so.unstripped'), b'\x7fELF old')
+    self.assertEqual(self._SetAsideFiles(), [])
+
+  def test_OutputNotWritten(self):
+    self._Write('lib.so', b'\x7fELF old')
+    self._Run(['lib.so'], None)
+    self.assertEqual(os.listdir(self.root), [])
+
+  def _Link(self, contents):
+    self._Write('input.o', contents)
+    return subprocess.call([
+        sys.executable, os.path.join(_SCRIPT_DIR, 'gcc_link_wrapper.py'),
+        '--restat', '--output', self._Path('app'), '--', sys.executable,
+        self._Path('ld.py'), self._Path('input.o'), '-o', self._Path('app')])
+
+  def test_LinkWrapper(self):
+    self._Write('ld.py', _FAKE_LINKER)
+    self.assertEqual(self._Link(b'\x7fELF app'), 0)
+    self._Age('app')
+    self.assertEqual(self._Link(b'\x7fELF app'), 0)
+    self.assertEqual(self._MTime('app'), self._OLD_MTIME)
+
+    self.assertEqual(self._Link(b'\x7fELF changed'), 0)
+    self.assertEqual(self._Read('app'), b'\x7fELF changed')
+    self._Age('app')
+
+    # The partial output of a failed link replaces the old one, which is
+    # cleaned up.
+    self.assertEqual(self._Link(b'fail\x7fELF changed'), 1)
+    self.assertEqual(self._Read('app'), b'fail')
+    self.assertEqual(self._SetAsideFiles(), [])
+    self.assertEqual(self._Link(b'\x7fELF changed'), 0)
+    self.assertNotEqual(self._MTime('app'), self._OLD_MTIME)
+
+
+class RunPostLinkStepsTest(_TempDirTestCase):
+  def setUp(self):
+    super(RunPostLinkStepsTest, self).setUp()
+    self.lock = threading.Lock()
+    self.events = []
+
+  def _Step(self, name, result=0, deps=(), outputs=(), func=None):
+    def Run():
+      with self.lock:
+        self.events.append('start ' + name)
+      if func is not None:
+        func()
+      for output in outputs:
+        self._Write(output, name)
+      with self.lock:
+        self.events.append('end ' + name)
+      return result
+    return wrapper_utils.PostLinkStep(
+        name, Run, outputs=[self._Path(output) for output in outputs],
+        deps=deps)
+
+  def test_DependencyOrder(self):
+    # Independent steps run at the same time: neither could get past the
+    # barrier alone.
+    barrier = threading.Barrier(2, timeout=10)
+    steps = [self._Step('strip', func=barrier.wait),
+             self._Step('toc', func=barrier.wait),
+             self._Step('map', deps=['strip']),
+             self._Step('digest', deps=['toc', 'map'])]
+    self.assertEqual(wrapper_utils.RunPostLinkSteps(steps, 'lib.so'), 0)
+    for before, after in (('strip', 'map'), ('toc', 'digest'),
+                          ('map', 'digest')):
+      self.assertLess(self.events.index('end ' + before),
+                      self.events.index('start ' + after))
+
+  def test_FailedStepStopsDependents(self):
+    steps = [self._Step('strip', result=3, outputs=['lib.so']),
+             self._Step('toc', outputs=['lib.so.TOC']),
+             self._Step('map', deps=['strip']),
+             self._Step('digest', deps=['map'])]
+    self.assertEqual(wrapper_utils.RunPostLinkSteps(steps, 'lib.so'), 3)
+    self.assertNotIn('start map', self.events)
+    self.assertNotIn('start digest', self.events)
+    self.assertEqual(steps[2].result, 3)
+    self.assertEqual(steps[3].result, 3)
+    # The outputs of the failed step are deleted, those of others kept.
+    self.assertFalse(os.path.exists(self._Path('lib.so')))
+    self.assertTrue(os.path.exists(self._Path('lib.so.TOC')))
+
+  def test_FirstFailureInStepOrder(self):
+    steps = [self._Step('strip', result=2, func=lambda: time.sleep(0.1)),
+             self._Step('toc', result=5)]
+    self.assertEqual(wrapper_utils.RunPostLinkSteps(steps, 'lib.so'), 2)
+
+  def test_ExceptionIsRaised(self):
+    def Fail():
+      raise OSError('no space left')
+    steps = [self._Step('strip', func=Fail, outputs=['lib.so']),
+             self._Step('toc', outputs=['lib.so.TOC']),
+             self._Step('map', deps=['strip'])]
+    with self.assertRaises(OSError) as raised:
+      wrapper_utils.RunPostLinkSteps(steps, 'lib.so')
+    self.assertEqual(str(raised.exception), 'no space left')
+    # The other steps finished before it was raised.
+    self.assertIn('end toc', self.events)
+    self.assertNotIn('start map', self.events)
+    self.assertEqual(steps[2].result, 1)
+
+  def test_UnknownDependency(self):
+    with self.assertRaises(ValueError):
+      wrapper_utils.RunPostLinkSteps([self._Step('map', deps=['strip'])],
+                                     'lib.so')
+
+  def test_Timings(self):
+    timings = self._Path('timings.json')
+    with mock.patch.dict(os.environ,
+                         {wrapper_utils._POST_LINK_TIMINGS_ENV: timings}):
+      wrapper_utils.RunPostLinkSteps(
+          [self._Step('strip'), self._Step('toc', deps=['strip'])], 'lib.so')
+    record = json.loads(self._Read('timings.json'))
+    self.assertEqual(record['output'], 'lib.so')
+    self.assertEqual(sorted(record['steps']), ['strip', 'toc'])
+
+
+if __name__ == '__main__':
+  unittest.main()